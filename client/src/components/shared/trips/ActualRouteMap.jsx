@@ -5,14 +5,10 @@ import CustomModal from "@/components/shared/CustomModal"; // Importing custom m
 import { useDispatch } from "react-redux"; // Redux dispatch hook
 import { toggleLoading } from "@/redux/features/sharedSlice"; // Action to toggle loading state in the app
 import API from "@/utils/API"; // API utility to interact with backend
-import { showError } from "@/utils"; // Function to handle errors
-import axios from "axios"; // Importing axios for making HTTP requests
-
-// API key for OpenRouteService (ORS) from environment variables
-const ORS_API_KEY = import.meta.env.VITE_ORS_API_KEY;
+import { decodePolyline, showError } from "@/utils"; // Functions to handle errors and decode polylines
 
 /**
- * ActualRouteMap component displays a route map with stops, fetched from the server and OpenRouteService API.
+ * ActualRouteMap component displays a route map with stops, fetched from the server along with the routed line.
  *
  * @param {Object} props - The component props.
  * @param {boolean} props.openActualRouteMap - State that determines whether the modal is open or closed.
@@ -31,9 +27,18 @@ const ActualRouteMap = ({ openActualRouteMap, setOpenActualRouteMap, selectedTri
       dispatch(toggleLoading(true)); // Show loading indicator
       try {
         // Fetch trip route data from the backend
-        const res = await API.get(`/logbook/get-trip-route/${selectedTripId}/`);
-        const stops = res?.data?.route_map_data?.trip_stops || []; // Extract trip stop data
+        // Coordinates are requested as encoded polylines to keep the payload small on cellular data
+        const res = await API.get(`/logbook/get-trip-route/${selectedTripId}/?encoding=polyline&zoom=12`);
+        const { trip_stops, route, precision } = res?.data?.route_map_data || {};
+
+        // Rebuild the stop list from the parallel start time, name and coordinate lists
+        const stopCoords = trip_stops ? decodePolyline(trip_stops.polyline, precision) : [];
+        const stops = stopCoords.map(([lat, lng], index) => ({
+          start_time: trip_stops.start_times[index],
+          stop_location: { name: trip_stops.names[index], coords: { lat, lng } },
+        }));
         setTripStopsData(stops); // Update state with trip stop data
+        setRoute(route ? decodePolyline(route, precision) : null); // [lat, lng] points routed by the server
 
         if (stops.length > 0) {
           // Calculate the middle stop to center the map
@@ -49,37 +54,6 @@ const ActualRouteMap = ({ openActualRouteMap, setOpenActualRouteMap, selectedTri
     fetchData(); // Execute the fetchData function
   }, [selectedTripId, dispatch]); // Re-run the effect when `selectedTripId` changes
 
-  // Fetch route from OpenRouteService when tripStopsData is available (at least two stops)
-  useEffect(() => {
-    if (tripStopsData.length < 2) return; // Ensure there are at least two stops for a route
-
-    const fetchRoute = async () => {
-      // Map trip stop data to coordinates (lng, lat) format required by ORS API
-      const coordinates = tripStopsData.map((stop) => [stop.stop_location.coords.lng, stop.stop_location.coords.lat]);
-
-      try {
-        // Fetch route data from OpenRouteService API
-        const response = await axios.post(
-          `https://api.openrouteservice.org/v2/directions/driving-car/geojson`,
-          { coordinates },
-          { headers: { Authorization: `Bearer ${ORS_API_KEY}`, "Content-Type": "application/json" } }
-        );
-
-        // Extract route coordinates from the response and set them to the state
-        const routeCoords = response.data.features[0].geometry.coordinates.map(([lng, lat]) => ({
-          lat,
-          lng,
-        }));
-        setRoute(routeCoords);
-      } catch (error) {
-        console.error("Error fetching route from ORS:", error); // Log the error
-        setRoute(null); // Reset the route if there’s an error
-      }
-    };
-
-    fetchRoute(); // Execute the fetchRoute function
-  }, [tripStopsData]); // Re-run the effect when `tripStopsData` changes
-
   return (
     <CustomModal isOpen={openActualRouteMap}>
       <div className="dialog">
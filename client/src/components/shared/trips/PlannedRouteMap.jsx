@@ -4,10 +4,8 @@ import { MapContainer, TileLayer, Polyline, Marker, Popup } from "react-leaflet"
 import "leaflet/dist/leaflet.css";
 import CustomModal from "@/components/shared/CustomModal";
 import L from "leaflet"; // Leaflet for map features like markers and polylines
-import axios from "axios"; // For API requests
-
-// OpenRouteService API key (stored in environment variables)
-const ORS_API_KEY = import.meta.env.VITE_ORS_API_KEY;
+import API from "@/utils/API"; // API utility to interact with backend
+import { decodePolyline } from "@/utils"; // Decodes the route polyline sent by the server
 
 // Custom function to create a marker with a specified color
 const createMarkerIcon = (color) =>
@@ -36,34 +34,20 @@ const PlannedRouteMap = ({ openPlannedRouteMap, setOpenPlannedRouteMap, currentT
   // Set the center of the map to the pickup location or the first available location
   const mapCenter = pickup_location?.coords || locations[0].coords;
 
-  // Fetch the actual route from OpenRouteService API
+  // Fetch the planned route, routed and stored by the server
   useEffect(() => {
     const fetchRoute = async () => {
       if (locations.length < 2) return;
 
-      // Prepare coordinates in [longitude, latitude] format for OpenRouteService
-      const coordinates = locations.map((loc) => [loc.coords.lng, loc.coords.lat]);
-
       try {
-        // Make the API request to get the route data
-        const response = await axios.post(
-          `https://api.openrouteservice.org/v2/directions/driving-car/geojson`,
-          { coordinates },
-          { headers: { Authorization: `Bearer ${ORS_API_KEY}`, "Content-Type": "application/json" } }
-        );
-
-        // Extract the route coordinates from the response and format for Leaflet
-        const routeCoords = response.data.features[0].geometry.coordinates.map(([lng, lat]) => ({
-          lat,
-          lng,
-        }));
-
-        // Update the state with the fetched route coordinates
-        setRoute(routeCoords);
+        const res = await API.get(`/logbook/get-trip-route/${currentTrip.id}/?routeKind=planned&encoding=polyline&zoom=12`);
+        // The route is an encoded polyline, decoded into [lat, lng] points that Leaflet accepts as positions
+        const { route, precision } = res?.data?.route_map_data || {};
+        setRoute(route ? decodePolyline(route, precision) : null);
       } catch (error) {
-        // Log any errors and reset route state if API fails
-        console.error("Error fetching route from ORS:", error);
-        setRoute(null); // Fallback if API request fails
+        // Log any errors and reset route state if the request fails
+        console.error("Error fetching the planned route:", error);
+        setRoute(null); // Fallback if the request fails
       }
     };
 
@@ -21,6 +21,7 @@ const Trips = () => {
 
   // Local state to store trips list and manage selected trip
   const [tripsList, setTripsList] = useState([]); // List of trips
+  const [nextCursor, setNextCursor] = useState(null); // Cursor of the next page of trips, null on the last page
   const [selectedTripId, setSelectedTripId] = useState(null); // Selected trip ID for actions
   const [currentTrip, setCurrentTrip] = useState({}); // Currently selected trip details
   const [logbookIndex, setLogbookIndex] = useState(0); // Index for the logbook
@@ -43,6 +44,7 @@ const Trips = () => {
       await API.get(`/logbook/carrier-get-trips/`) // Fetch trips data
         .then((res) => {
           setTripsList(res?.data?.trips_data); // Set trips list in state
+          setNextCursor(res?.data?.next_cursor); // Keep the cursor for loading older trips
         })
         .catch((err) => {
           showError(err);
@@ -52,6 +54,20 @@ const Trips = () => {
     fetchData(); // Call fetch function
   }, [dispatch]); // Dependency array ensures this runs on initial mount
 
+  // Fetch the next page of older trips and append it to the list
+  const handleLoadMore = async () => {
+    dispatch(toggleLoading(true));
+    await API.get(`/logbook/carrier-get-trips/`, { params: { cursor: nextCursor } })
+      .then((res) => {
+        setTripsList((previousTrips) => [...previousTrips, ...res?.data?.trips_data]);
+        setNextCursor(res?.data?.next_cursor);
+      })
+      .catch((err) => {
+        showError(err);
+      })
+      .finally(() => dispatch(toggleLoading(false)));
+  };
+
   // Handlers to open modals with respective data
   const handleOpenELDLog = (tripId, logbookIndex) => {
     setSelectedTripId(tripId); // Set selected trip ID
@@ -149,6 +165,14 @@ const Trips = () => {
         // Message when no trips are available
         <h4 className="not-available">No trips created yet</h4>
       )}
+      {/* Button to load older trips when there are more pages */}
+      {nextCursor && (
+        <div className="table-parent-buttons">
+          <button type="button" className="add-button" onClick={handleLoadMore}>
+            Load More
+          </button>
+        </div>
+      )}
 
       {/* Modal for viewing ELD Log */}
       {openELDLog && (
@@ -4,7 +4,7 @@ import { useDispatch } from "react-redux"; // Redux hook to dispatch actions
 import AddStop from "./components/AddStop"; // Importing component to add a stop
 import ChangeStatus from "./components/ChangeStatus"; // Importing component to change the status of a trip
 import Timer from "./components/Timer"; // Importing Timer component for trip tracking
-import { showError } from "@/utils"; // Utility function for showing error messages
+import { showError, syncQueuedOperations } from "@/utils"; // Utility functions for showing error messages and syncing queued operations
 import { toggleLoading } from "@/redux/features/sharedSlice"; // Action to toggle loading state in Redux
 import API from "@/utils/API"; // API utility for making HTTP requests
 import moment from "moment"; // Moment.js library for formatting dates
@@ -35,7 +35,9 @@ const CurrentTrip = () => {
   useEffect(() => {
     const fetchData = async () => {
       dispatch(toggleLoading(true)); // Set loading state to true
-      await API.get(`/logbook/get-current-trip/`) // API request to fetch current trip data
+      // Send the operations queued while offline first, so the snapshot includes them
+      await syncQueuedOperations().catch((err) => err?.response && showError(err));
+      await API.get(`/logbook/get-driver-snapshot/`) // API request to fetch current trip data, revalidated with its ETag
         .then((res) => {
           // If the data is received, set the trip-related state variables
           setCurrentTrip(res?.data?.current_trip_data);
@@ -48,6 +50,25 @@ const CurrentTrip = () => {
     fetchData(); // Call fetchData on component mount
   }, [dispatch]); // Dependency array ensures fetchData runs only once
 
+  // useEffect hook to send the operations queued while offline in one request whenever the app is back online
+  useEffect(() => {
+    const syncOperations = async () => {
+      await syncQueuedOperations()
+        .then((data) => {
+          if (!data) return;
+          // Replace the local state with the driver's reconciled state
+          setCurrentTrip(data.current_trip_data);
+          setCurrentDriverLogbook(data.driver_logbook_data);
+          setCurrentLogbookItem(data.current_logbook_item_data);
+        })
+        .catch((err) => {
+          if (err?.response) showError(err); // Still offline otherwise, the operations stay queued
+        });
+    };
+    window.addEventListener("online", syncOperations);
+    return () => window.removeEventListener("online", syncOperations);
+  }, []);
+
   // Function to handle ending the trip
   const handleEndTrip = async () => {
     // If no trip day, prompt user for confirmation to end the trip
@@ -166,6 +187,7 @@ const CurrentTrip = () => {
           openRecordMileageToday={openRecordMileageToday}
           setOpenRecordMileageToday={setOpenRecordMileageToday}
           currentDriverLogbookId={currentDriverLogbook?.id}
+          gpsMilesDriven={currentDriverLogbook?.gps_miles_driven}
         />
       )}
 
@@ -2,8 +2,7 @@ import React, { useState, useEffect } from "react"; // Import React and hooks (u
 import CustomModal from "@/components/shared/CustomModal"; // Import CustomModal component
 import { useDispatch } from "react-redux"; // Import useDispatch hook for Redux state management
 import { toggleLoading } from "@/redux/features/sharedSlice"; // Import toggleLoading action from Redux slice
-import API from "@/utils/API"; // Import API utility for HTTP requests
-import { fetchLocationName } from "@/utils"; // Import utility functions for location and error handling
+import { fetchLocationName, postDriverOperation } from "@/utils"; // Import utility functions for location and driver operations
 import LocationMap from "@/components/shared/trips/LocationMap"; // Import LocationMap component to display a map
 import LocationSearch from "@/components/shared/trips/LocationSearch"; // Import LocationSearch component for searching locations
 
@@ -76,9 +75,10 @@ const AddStop = ({ openAddStop, setOpenAddStop, currentTripId }) => {
       end_time: new Date(), // End time of the stop
     };
 
-    // Send a POST request to the API to record the stop
-    await API.post(`/logbook/record-stop/`, body)
+    // Send a POST request to the API to record the stop, queued while offline
+    await postDriverOperation("record_stop", `/logbook/record-stop/`, body)
       .then((res) => {
+        if (!res) window.alert("You are offline, the stop will be recorded once you are back online");
         // Reset stop state after successful submission
         setStop({
           type: "",
@@ -1,7 +1,6 @@
 import CustomModal from "@/components/shared/CustomModal"; // Import CustomModal component for displaying modal dialog
 import { toggleLoading } from "@/redux/features/sharedSlice"; // Import toggleLoading action for Redux state management
-import { showError } from "@/utils"; // Import showError utility for error handling
-import API from "@/utils/API"; // Import API utility for making HTTP requests
+import { postDriverOperation, showError } from "@/utils"; // Import utilities for posting driver operations and error handling
 import React, { useState } from "react"; // Import React and useState hook
 import { useDispatch } from "react-redux"; // Import useDispatch hook for dispatching actions to Redux store
 import Timer from "./Timer"; // Import Timer component to display a timer for the current logbook item
@@ -18,17 +17,23 @@ const ChangeStatus = (props) => {
     e.preventDefault(); // Prevent default form submission behavior
     dispatch(toggleLoading(true)); // Dispatch loading state to Redux store
 
-    // API request to update the status
-    await API.post(`/logbook/change-status/`, {
-      item_type: selectedStatus, // Pass selected driver status
-      remarks, // Pass remarks entered by the user
-      currentLogbookItemId: currentLogbookItem?.id || null, // Pass logbook item data
-      is_current: true,
-    })
+    // API request to update the status, queued with its time of change while offline
+    await postDriverOperation(
+      "change_status",
+      `/logbook/change-status/`,
+      {
+        item_type: selectedStatus, // Pass selected driver status
+        remarks, // Pass remarks entered by the user
+        currentLogbookItemId: currentLogbookItem?.id || null, // Pass logbook item data
+        is_current: true,
+      },
+      { item_type: selectedStatus, remarks }
+    )
       .then((res) => {
         // Reset form state upon successful response
         setRemarks(""); // Clear remarks input
         setSelectedStatus(""); // Clear selected status
+        if (!res) return window.alert("You are offline, the status change will be sent once you are back online");
         setCurrentLogbookItem(res?.data?.new_logbook_item_data); // Update current logbook item with new data
         setCurrentDriverLogbook(res?.data?.driver_logbook_data);
         window.alert(res?.data?.message); // Display success message
@@ -1,13 +1,22 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import { MapContainer, TileLayer, Polyline, Marker, Popup } from "react-leaflet";
 import "leaflet/dist/leaflet.css";
 import CustomModal from "@/components/shared/CustomModal";
 import L from "leaflet";
 import axios from "axios";
+import API from "@/utils/API";
+import { isNetworkError } from "@/utils";
 
 // OpenRouteService API key
 const ORS_API_KEY = import.meta.env.VITE_ORS_API_KEY;
 
+// Positions are sent to the server in batches, when this many are buffered or every flush interval
+const BREADCRUMB_BATCH_SIZE = 100;
+const BREADCRUMB_FLUSH_INTERVAL = 30000; // milliseconds
+
+// Most positions sent in one request, the server rejects larger batches
+const MAX_BREADCRUMBS_PER_BATCH = 2000;
+
 // Custom marker icons
 const createMarkerIcon = (color) =>
   new L.Icon({
@@ -24,6 +33,32 @@ const Directions = ({ openDirections, setOpenDirections, currentTrip }) => {
   const [distance, setDistance] = useState(null);
   const [duration, setDuration] = useState(null);
   const [watchId, setWatchId] = useState(null);
+  const breadcrumbs = useRef([]); // Positions not sent to the server yet
+  const flushing = useRef(false); // Whether buffered positions are being sent
+
+  // Send the buffered positions in batches the server accepts. A batch that failed on the network stays
+  // buffered for the next attempt, a batch the server rejected is dropped so it cannot hold back the rest
+  const flushBreadcrumbs = async () => {
+    if (flushing.current) return;
+    flushing.current = true;
+    try {
+      while (breadcrumbs.current.length > 0) {
+        const points = breadcrumbs.current.slice(0, MAX_BREADCRUMBS_PER_BATCH);
+        breadcrumbs.current = breadcrumbs.current.slice(points.length);
+        try {
+          await API.post("/logbook/record-breadcrumbs/", { points });
+        } catch (error) {
+          console.error("Error recording positions:", error);
+          if (isNetworkError(error)) {
+            breadcrumbs.current = points.concat(breadcrumbs.current);
+            return;
+          }
+        }
+      }
+    } finally {
+      flushing.current = false;
+    }
+  };
 
   // Destination options
   const destinations = [
@@ -44,6 +79,14 @@ const Directions = ({ openDirections, setOpenDirections, currentTrip }) => {
           lat: position.coords.latitude,
           lng: position.coords.longitude,
         });
+        breadcrumbs.current.push({
+          lat: position.coords.latitude,
+          lng: position.coords.longitude,
+          recordedAt: new Date(position.timestamp).toISOString(),
+          accuracy: position.coords.accuracy,
+          speed: position.coords.speed,
+        });
+        if (breadcrumbs.current.length >= BREADCRUMB_BATCH_SIZE) flushBreadcrumbs();
       },
       (error) => {
         console.error("Error getting location:", error);
@@ -52,9 +95,12 @@ const Directions = ({ openDirections, setOpenDirections, currentTrip }) => {
     );
 
     setWatchId(id);
+    const flushInterval = setInterval(flushBreadcrumbs, BREADCRUMB_FLUSH_INTERVAL);
 
     return () => {
       if (watchId) navigator.geolocation.clearWatch(watchId);
+      clearInterval(flushInterval);
+      flushBreadcrumbs();
     };
   }, [openDirections]);
 
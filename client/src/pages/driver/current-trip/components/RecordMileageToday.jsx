@@ -1,32 +1,37 @@
 import CustomModal from "@/components/shared/CustomModal"; // Import CustomModal component for modal dialog
 import { toggleLoading } from "@/redux/features/sharedSlice"; // Import toggleLoading action for Redux state management
-import { showError } from "@/utils"; // Import showError utility for handling errors
-import API from "@/utils/API"; // Import API utility for making HTTP requests
+import { postDriverOperation, showError } from "@/utils"; // Import utilities for posting driver operations and handling errors
 import React, { useState } from "react"; // Import React and useState hook
 import { useDispatch } from "react-redux"; // Import useDispatch hook for dispatching actions to Redux store
 
 const RecordMileageToday = (props) => {
-  const { openRecordMileageToday, setOpenRecordMileageToday, currentDriverLogbookId } = props; // Destructure props passed to the component
+  const { openRecordMileageToday, setOpenRecordMileageToday, currentDriverLogbookId, gpsMilesDriven } = props; // Destructure props passed to the component
 
   const dispatch = useDispatch(); // Initialize dispatch for Redux actions
 
-  const [totalMilesDrivingToday, setTotalMilesDrivingToday] = useState(""); // State to manage total miles driven today
+  // State to manage total miles driven today, prefilled with the miles measured from the GPS positions
+  const [totalMilesDrivingToday, setTotalMilesDrivingToday] = useState(gpsMilesDriven ? gpsMilesDriven.toFixed(1) : "");
   const [mileageCoveredToday, setMileageCoveredToday] = useState(""); // State to manage total mileage covered today
 
   const handleRecordMileageCoveredToday = async (e) => {
     e.preventDefault(); // Prevent default form submission behavior
     dispatch(toggleLoading(true)); // Dispatch loading state to Redux store
 
-    // API request to close the trip day
-    await API.post(`/logbook/record-mileage-covered-today/`, {
-      mileage_covered_today: mileageCoveredToday, // Pass mileage covered today
-      total_miles_driving_today: totalMilesDrivingToday, // Pass total miles driven today
-      currentDriverLogbookId, // Pass the current logbook item ID
-    })
+    // API request to close the trip day, queued while offline
+    await postDriverOperation(
+      "record_mileage_covered_today",
+      `/logbook/record-mileage-covered-today/`,
+      {
+        mileage_covered_today: mileageCoveredToday, // Pass mileage covered today
+        total_miles_driving_today: totalMilesDrivingToday, // Pass total miles driven today
+        currentDriverLogbookId, // Pass the current logbook item ID
+      },
+      { mileage_covered_today: mileageCoveredToday, total_miles_driving_today: totalMilesDrivingToday }
+    )
       .then((res) => {
         // On success, reset states and show success message
         setOpenRecordMileageToday(false); // Close the modal
-        window.alert(res?.data?.message); // Show success message
+        window.alert(res ? res.data?.message : "You are offline, the mileage will be recorded once you are back online");
       })
       .catch((err) => showError(err)) // Handle errors by calling showError utility
       .finally(() => dispatch(toggleLoading(false))); // Dispatch loading state (false) once request completes
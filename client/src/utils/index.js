@@ -1,3 +1,5 @@
+import API from "@/utils/API";
+
 // Helper function to toggle the sidebar and button states when the menu button is clicked
 const navbarDisplayHelper = () => {
   // Get the body section element
@@ -82,18 +84,110 @@ export const showError = (err) => {
   }
 };
 
-// Function to fetch location name based on latitude and longitude using reverse geocoding
+// Function to fetch location name based on latitude and longitude, resolved and cached by the server
 export const fetchLocationName = async (lat, lng) => {
   try {
-    // Perform reverse geocoding using OpenStreetMap API
-    const response = await fetch(`https://nominatim.openstreetmap.org/reverse?format=json&lat=${lat}&lon=${lng}`);
-    const data = await response.json();
+    const response = await API.get("/logbook/get-place-name/", { params: { lat, lng } });
 
-    // Return the location name if found, otherwise return 'Unknown Location'
-    return data.display_name || "Unknown Location";
+    // Return the location name if found, otherwise return 'Unknown Location' (the server names it when it is saved)
+    return response.data.name || "Unknown Location";
   } catch (error) {
-    // If reverse geocoding fails, log the error and return 'Unknown Location'
+    // If the lookup fails, log the error and return 'Unknown Location'
     console.error("Reverse geocoding failed:", error);
     return "Unknown Location";
   }
 };
+
+// Function to decode an encoded polyline (as returned by the server with encoding=polyline) into [lat, lng] points
+export const decodePolyline = (encoded, precision = 5) => {
+  const points = [];
+  const factor = 10 ** precision;
+  let index = 0;
+  let lat = 0;
+  let lng = 0;
+
+  // Read one zigzag encoded delta made of 5 bit chunks
+  const readDelta = () => {
+    let result = 0;
+    let shift = 0;
+    let chunk;
+    do {
+      chunk = encoded.charCodeAt(index++) - 63;
+      result |= (chunk & 0x1f) << shift;
+      shift += 5;
+    } while (chunk >= 0x20);
+    return result & 1 ? ~(result >> 1) : result >> 1;
+  };
+
+  // Each point is stored as the difference from the previous one
+  while (index < encoded.length) {
+    lat += readDelta();
+    lng += readDelta();
+    points.push([lat / factor, lng / factor]);
+  }
+  return points;
+};
+
+// Key under which the operations made while offline are kept in local storage until they are synced
+const OFFLINE_OPERATIONS_KEY = "offlineOperations";
+
+// Function to read the operations queued while offline, oldest first
+export const getQueuedOperations = () => JSON.parse(localStorage.getItem(OFFLINE_OPERATIONS_KEY) || "[]");
+
+// Function to tell whether a request failed for lack of network rather than being rejected by the server
+export const isNetworkError = (err) => !err?.response;
+
+// Function to queue an operation ("change_status", "record_stop" or "record_mileage_covered_today") made while offline
+// The operation keeps the Idempotency-Key it was made with, the server skips it if its online request went through
+export const queueOperation = (type, data, idempotencyKey = crypto.randomUUID()) => {
+  const operations = [...getQueuedOperations(), { idempotencyKey, type, recordedAt: new Date().toISOString(), data }];
+  localStorage.setItem(OFFLINE_OPERATIONS_KEY, JSON.stringify(operations));
+};
+
+// Most queued operations sent in one sync request, as accepted by the server (MAX_SYNC_OPERATIONS)
+const MAX_SYNCED_OPERATIONS = 500;
+
+// Function to send every queued operation to the server, returns the driver's reconciled state
+export const syncQueuedOperations = async () => {
+  const operations = getQueuedOperations().slice(0, MAX_SYNCED_OPERATIONS);
+  if (operations.length === 0) return null;
+
+  let response;
+  try {
+    // Operations resent after a lost response are skipped by the server from their own Idempotency-Keys
+    response = await API.post("/logbook/sync-driver-operations/", { operations });
+  } catch (err) {
+    // The whole batch was rolled back, keep it queued unless the server named the operation it could not apply
+    const failedIndex = err?.response?.data?.failed_operation_index;
+    if (!(failedIndex >= 0 && failedIndex < operations.length)) throw err;
+
+    // That operation can never be applied, drop it, tell the driver and send the rest again
+    // Operations are only added at the end of the queue, so the batch is still at its start
+    const queuedOperations = getQueuedOperations();
+    queuedOperations.splice(failedIndex, 1);
+    localStorage.setItem(OFFLINE_OPERATIONS_KEY, JSON.stringify(queuedOperations));
+    showError(err);
+    return syncQueuedOperations();
+  }
+
+  // Keep the operations queued while the request was in flight, and send any left over
+  const remainingOperations = getQueuedOperations().slice(operations.length);
+  localStorage.setItem(OFFLINE_OPERATIONS_KEY, JSON.stringify(remainingOperations));
+  return remainingOperations.length > 0 ? syncQueuedOperations() : response.data;
+};
+
+// Function to post a driver operation, queued instead when offline or behind operations still waiting to be synced
+// Resolves with the response, or null when the operation was queued
+export const postDriverOperation = async (type, url, body, data = body) => {
+  // One key for the operation, whether it is sent now, retried or queued and synced later
+  const idempotencyKey = crypto.randomUUID();
+  if (getQueuedOperations().length === 0) {
+    try {
+      return await API.post(url, body, { headers: { "Idempotency-Key": idempotencyKey } });
+    } catch (err) {
+      if (!isNetworkError(err)) throw err;
+    }
+  }
+  queueOperation(type, data, idempotencyKey);
+  return null;
+};
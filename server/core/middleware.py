@@ -0,0 +1,114 @@
+import logging
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger("core.requests")
+
+# Metrics of the request being handled, so get_serializer_data can add the serialization time to it
+current_request_metrics = ContextVar("current_request_metrics", default=None)
+
+
+class RequestMetrics:
+    """SQL query count, database time, serialization time and rendering time of one request."""
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.render_seconds = 0.0
+        self.started_at = perf_counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # Used as a database execute wrapper, so every query run while handling the request goes through here
+        query_started_at = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.db_seconds += perf_counter() - query_started_at
+
+    def as_dict(self):
+        return {
+            "query_count": self.query_count,
+            "db_ms": round(self.db_seconds * 1000, 2),
+            "serialization_ms": round(self.serialization_seconds * 1000, 2),
+            "render_ms": round(self.render_seconds * 1000, 2),
+            "total_ms": round((perf_counter() - self.started_at) * 1000, 2),
+        }
+
+
+def get_serializer_data(serializer):
+    """
+    Returns a serializer's data, adding the time spent building it to the current request's metrics.
+
+    Used by the API views instead of `.data`, for a single object or with many=True alike. Outside
+    an instrumented request the data is only built.
+    """
+    request_metrics = current_request_metrics.get()
+    if request_metrics is None:
+        return serializer.data
+
+    started_at = perf_counter()
+    try:
+        return serializer.data
+    finally:
+        request_metrics.serialization_seconds += perf_counter() - started_at
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Records the SQL query count, database time, serialization time and rendering time of every API request.
+
+    The numbers are logged as one structured line per request on the "core.requests" logger,
+    attached to the response as `request_metrics` (used by the query budget test helper) and,
+    for staff users only, returned in X-Query-Count, X-DB-Time-Ms, X-Serialization-Time-Ms and
+    X-Render-Time-Ms headers. Serialization time is the time spent building serializers' data in
+    get_serializer_data (queries they run included), rendering time the time spent rendering the response body.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith(settings.REQUEST_INSTRUMENTATION_PATH_PREFIX):
+            return self.get_response(request)
+
+        request.request_metrics = RequestMetrics()
+        metrics_token = current_request_metrics.set(request.request_metrics)
+        try:
+            with connection.execute_wrapper(request.request_metrics):
+                response = self.get_response(request)
+        finally:
+            current_request_metrics.reset(metrics_token)
+
+        request_metrics = request.request_metrics.as_dict()
+        response.request_metrics = request_metrics
+        # key=value message for plain log files, and the same fields as attributes for structured handlers
+        log_fields = {"method": request.method, "path": request.path, "status": response.status_code, **request_metrics}
+        logger.info(
+            "api_request %s", " ".join(f"{name}={value}" for name, value in log_fields.items()), extra=log_fields
+        )
+
+        user = getattr(request, "user", None)
+        if user and user.is_staff:
+            response["X-Query-Count"] = request_metrics["query_count"]
+            response["X-DB-Time-Ms"] = request_metrics["db_ms"]
+            response["X-Serialization-Time-Ms"] = request_metrics["serialization_ms"]
+            response["X-Render-Time-Ms"] = request_metrics["render_ms"]
+
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook, so time the rendering from here to its callback
+        request_metrics = getattr(request, "request_metrics", None)
+        if request_metrics:
+            render_started_at = perf_counter()
+
+            def record_render_time(rendered_response):
+                request_metrics.render_seconds += perf_counter() - render_started_at
+
+            response.add_post_render_callback(record_render_time)
+        return response
@@ -0,0 +1,29 @@
+from django.urls import resolve
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin that fails a test when an endpoint runs more SQL queries than its declared budget.
+
+    Budgets are declared per URL name in `query_budgets`, e.g. {"carrier_get_trips": 4}, and are checked
+    against the query count recorded by RequestInstrumentationMiddleware, so a regression such as a new
+    N+1 shows up as a failed test with the actual count.
+    """
+
+    query_budgets = {}
+
+    def assertWithinQueryBudget(self, response):
+        """
+        Asserts that the request behind `response` stayed within the query budget of its endpoint.
+
+        Args:
+            response: A response returned by the test client for an instrumented (api/v1) URL.
+        """
+        url_name = resolve(response.wsgi_request.path).url_name
+        self.assertIn(url_name, self.query_budgets, f"No query budget declared for {url_name}")
+        query_count = response.request_metrics["query_count"]
+        self.assertLessEqual(
+            query_count,
+            self.query_budgets[url_name],
+            f"{url_name} ran {query_count} queries, its budget is {self.query_budgets[url_name]}",
+        )
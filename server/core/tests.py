@@ -1,3 +1,61 @@
+from itertools import count
+from unittest.mock import patch
+
 from django.test import TestCase
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.testing import QueryBudgetMixin
+from logbook.models import DriverLogbook
+from users.models import User
+
+
+class RequestInstrumentationTests(QueryBudgetMixin, TestCase):
+    query_budgets = {"get_current_trip": 1}
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="driver@example.com", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_metrics_are_logged_and_attached_to_the_response(self):
+        with self.assertLogs("core.requests", level="INFO") as logs:
+            response = self.client.get("/api/v1/logbook/get-current-trip/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.request_metrics["query_count"], 1)
+        self.assertIn("path=/api/v1/logbook/get-current-trip/ status=200 query_count=1", logs.output[0])
+        self.assertEqual(logs.records[0].query_count, 1)
+
+    def test_headers_are_only_sent_to_staff_users(self):
+        response = self.client.get("/api/v1/logbook/get-current-trip/")
+        self.assertNotIn("X-Query-Count", response)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get("/api/v1/logbook/get-current-trip/")
+        self.assertEqual(response["X-Query-Count"], "1")
+        self.assertIn("X-DB-Time-Ms", response)
+        self.assertIn("X-Serialization-Time-Ms", response)
+        self.assertIn("X-Render-Time-Ms", response)
+
+    def test_serializer_time_is_recorded_apart_from_rendering(self):
+        # A driver's current trip view serializes today's logbook
+        self.user.is_driver = True
+        self.user.save()
+        DriverLogbook.objects.create(driver=self.user, logbook_date=now().date())
+        # Every clock read moves half a second on
+        with patch("core.middleware.perf_counter", side_effect=count(step=0.5)):
+            response = self.client.get("/api/v1/logbook/get-current-trip/")
+
+        self.assertGreater(response.request_metrics["serialization_ms"], 0)
+        self.assertGreater(response.request_metrics["render_ms"], 0)
+
+    def test_query_budget_fails_when_exceeded(self):
+        response = self.client.get("/api/v1/logbook/get-current-trip/")
+        self.assertWithinQueryBudget(response)
 
-# Create your tests here.
+        self.query_budgets = {"get_current_trip": 0}
+        with self.assertRaisesMessage(AssertionError, "get_current_trip ran 1 queries, its budget is 0"):
+            self.assertWithinQueryBudget(response)
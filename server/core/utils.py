@@ -1,8 +1,14 @@
+import hashlib
+import json
+
 from django.utils.timezone import now, make_aware
 from datetime import datetime, timedelta
 from django.db import transaction
+from django.db.models import F
 
-from logbook.models import DriverLogbook, LogbookItem
+from logbook.duty import update_daily_duty_total, update_daily_duty_totals
+from logbook.hours_of_service import evaluate_closed_logbook_items
+from logbook.models import DriverLogbook, LogbookItem, TripDetail
 
 
 def get_object_or_none(model_name, **kwargs):
@@ -23,6 +29,81 @@ def get_object_or_none(model_name, **kwargs):
         return None  # Return None if the object does not exist
 
 
+def get_content_etag(data):
+    """
+    Returns a strong ETag for response data, which changes whenever anything in the data changes.
+
+    Args:
+        data: JSON serializable response data, dates and times are compared as strings.
+
+    Returns:
+        str: The quoted ETag header value.
+    """
+    content = json.dumps(data, sort_keys=True, default=str)
+    return f'"{hashlib.sha1(content.encode()).hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    """Checks whether the request's If-None-Match header lists the given ETag (or *)."""
+    if_none_match = request.headers.get("If-None-Match", "")
+    return any(value.strip() in (etag, f"W/{etag}", "*") for value in if_none_match.split(","))
+
+
+def bump_versions(model, object_ids):
+    """
+    Increments the version counter of the given TripDetail or DriverLogbook rows in one update.
+
+    Called by every write path, so that read views stop answering 304 to ETags of the old version.
+    """
+    model.objects.filter(id__in=object_ids).update(version=F("version") + 1)
+
+
+def get_version_etag(model, object_id):
+    """
+    Returns the ETag of a TripDetail or DriverLogbook from its version counter alone.
+
+    Returns:
+        str: The quoted ETag header value, or None if the object does not exist.
+    """
+    version = model.objects.filter(id=object_id).values_list("version", flat=True).first()
+    if version is None:
+        return None
+    return f'"{model._meta.model_name}-{object_id}-{version}"'
+
+
+def get_or_create_todays_driver_logbook(driver):
+    """
+    Retrieves or creates the driver's logbook for today.
+
+    Returns:
+        DriverLogbook: Today's logbook of the driver.
+    """
+    return get_or_create_driver_logbook(driver, now().date())
+
+
+def get_or_create_driver_logbook(driver, logbook_date):
+    """
+    Retrieves or creates the driver's logbook for a day.
+
+    A new logbook takes the truck of the driver's current trip, so reads never have to fill it in later.
+
+    Returns:
+        DriverLogbook: The logbook of the driver for that day.
+    """
+    driver_logbook, _ = DriverLogbook.objects.get_or_create(
+        logbook_date=logbook_date,
+        driver=driver,
+        defaults={
+            # Only looked up when the logbook is created
+            "truck_id": lambda: TripDetail.objects.filter(is_current=True, driver=driver)
+            .order_by("-trip_start_date")
+            .values_list("truck_id", flat=True)
+            .first()
+        },
+    )
+    return driver_logbook
+
+
 def update_logbook_item_over_multiple_days(request):
     """Updates the logbook item, handling multi-day spans properly."""
     logbook_item_id = request.data.get("currentLogbookItemId")
@@ -30,8 +111,11 @@ def update_logbook_item_over_multiple_days(request):
         return  # No logbook item to update
 
     logbook_item = LogbookItem.objects.get(id=logbook_item_id)
-    end_time = now()  # Assume current time as end time
+    end_logbook_item(logbook_item, now())  # Assume current time as end time
+
 
+def end_logbook_item(logbook_item, end_time):
+    """Closes a logbook item at a given time, splitting it over every day it spans."""
     if logbook_item.start_time.date() == end_time.date():
         # Simple case: Same-day logbook item
         close_logbook_item(logbook_item, end_time)
@@ -42,9 +126,13 @@ def update_logbook_item_over_multiple_days(request):
 
 def close_logbook_item(logbook_item, end_time):
     """Closes a logbook item by setting its end_time and marking it inactive."""
+    previous_end_time = logbook_item.end_time
     logbook_item.end_time = end_time
     logbook_item.is_current = False
     logbook_item.save()
+    update_daily_duty_total(logbook_item, previous_end_time)
+    evaluate_closed_logbook_items([logbook_item])
+    bump_versions(DriverLogbook, [logbook_item.driver_logbook_id])
 
 
 def handle_multi_day_logbook_item(logbook_item, end_time):
@@ -59,40 +147,69 @@ def handle_multi_day_logbook_item(logbook_item, end_time):
 
 
 def create_logbook_entries_for_missing_days(logbook_item, first_day_end, end_time):
-    """Creates logbook items for each missing day and ensures DriverLogbook exists."""
-    current_start = first_day_end + timedelta(seconds=1)  # Next day starts at 12:00 AM
-    last_driver_logbook = None  # Track the last created driver logbook
+    """
+    Creates logbook items for each missing day and ensures DriverLogbook exists.
 
+    All days are written in bulk, so the number of queries stays the same however many days the item spans.
+    """
+    # Work out the logbook date, start and end of the item on every following day
+    day_spans = []
+    current_start = first_day_end + timedelta(seconds=1)  # Next day starts at 12:00 AM
     while current_start.date() < end_time.date():
-        last_driver_logbook = get_or_create_driver_logbook(logbook_item, current_start.date())
         next_end = make_aware(datetime.combine(current_start.date(), datetime.max.time()))  # 11:59 PM
-
-        create_logbook_item(logbook_item, last_driver_logbook, current_start, next_end)
+        day_spans.append((current_start.date(), current_start, next_end))
         current_start = next_end + timedelta(seconds=1)  # Move to next day
 
     # Handle the last day's entry, ensuring the end time is now
-    last_driver_logbook = get_or_create_driver_logbook(logbook_item, now().date())
-    create_logbook_item(logbook_item, last_driver_logbook, current_start, end_time)  # Use correct logbook and end time
-
-
-def get_or_create_driver_logbook(logbook_item, log_date):
-    """Retrieves or creates a DriverLogbook entry for a given date."""
-    return DriverLogbook.objects.get_or_create(
-        driver=logbook_item.driver_logbook.driver,
-        logbook_date=log_date,
-        defaults={"truck": logbook_item.driver_logbook.truck},
-    )[
-        0
-    ]  # Return only the instance
-
-
-def create_logbook_item(logbook_item, driver_logbook, start_time, end_time):
-    """Creates a new logbook item entry for a given period."""
-    LogbookItem.objects.create(
-        driver_logbook=driver_logbook,
-        item_type=logbook_item.item_type,
-        start_time=start_time,
-        end_time=end_time,
-        remarks=logbook_item.remarks,
-        is_current=False,
+    day_spans.append((end_time.date(), current_start, end_time))
+
+    driver_logbooks = get_or_create_driver_logbooks(logbook_item, [log_date for log_date, _, _ in day_spans])
+    new_logbook_items = LogbookItem.objects.bulk_create(
+        [
+            LogbookItem(
+                driver_logbook=driver_logbooks[log_date],
+                item_type=logbook_item.item_type,
+                start_time=start_time,
+                end_time=day_end_time,
+                remarks=logbook_item.remarks,
+                is_current=False,
+            )
+            for log_date, start_time, day_end_time in day_spans
+        ]
     )
+    update_daily_duty_totals(new_logbook_items)
+    evaluate_closed_logbook_items(new_logbook_items)
+    bump_versions(DriverLogbook, [driver_logbook.id for driver_logbook in driver_logbooks.values()])
+
+
+def get_or_create_driver_logbooks(logbook_item, log_dates):
+    """
+    Retrieves or creates the driver's DriverLogbook entries for the given dates.
+
+    Existing logbooks are fetched in one query and the missing ones are created in one bulk insert.
+    A logbook created by a concurrent request in the meantime is skipped by the insert and read back
+    with the ones just created, as get_or_create would.
+
+    Returns:
+        dict: {logbook_date: DriverLogbook} for every date in `log_dates`.
+    """
+    driver_id = logbook_item.driver_logbook.driver_id
+    driver_logbooks = {
+        driver_logbook.logbook_date: driver_logbook
+        for driver_logbook in DriverLogbook.objects.filter(driver__id=driver_id, logbook_date__in=log_dates)
+    }
+
+    missing_driver_logbooks = [
+        DriverLogbook(driver_id=driver_id, logbook_date=log_date, truck_id=logbook_item.driver_logbook.truck_id)
+        for log_date in dict.fromkeys(log_dates)
+        if log_date not in driver_logbooks
+    ]
+    if missing_driver_logbooks:
+        DriverLogbook.objects.bulk_create(missing_driver_logbooks, ignore_conflicts=True)
+        for driver_logbook in DriverLogbook.objects.filter(
+            driver__id=driver_id,
+            logbook_date__in=[driver_logbook.logbook_date for driver_logbook in missing_driver_logbooks],
+        ):
+            driver_logbooks[driver_logbook.logbook_date] = driver_logbook
+
+    return driver_logbooks
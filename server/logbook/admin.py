@@ -1,6 +1,20 @@
 from django.contrib.admin import register, ModelAdmin
 
-from logbook.models import TripDetail, DriverLogbook, LogbookItem, StopRest, Carrier, Truck
+from logbook.models import (
+    TripDetail,
+    DriverLogbook,
+    LogbookItem,
+    StopRest,
+    Carrier,
+    Truck,
+    DailyDutyTotal,
+    DriverDutyState,
+    HosViolation,
+    RouteGeometry,
+    Breadcrumb,
+    PlaceName,
+    IdempotencyKey,
+)
 
 
 @register(Carrier)
@@ -34,3 +48,41 @@ class LogbookItemAdmin(ModelAdmin):
 @register(StopRest)
 class StopRestAdmin(ModelAdmin):
     list_display = ["trip_detail", "stop_type"]
+
+
+@register(DailyDutyTotal)
+class DailyDutyTotalAdmin(ModelAdmin):
+    list_display = ["driver", "duty_date", "driving_seconds", "on_duty_not_driving_seconds"]
+
+
+@register(DriverDutyState)
+class DriverDutyStateAdmin(ModelAdmin):
+    list_display = ["driver", "shift_start", "shift_driving_seconds", "processed_until"]
+
+
+@register(HosViolation)
+class HosViolationAdmin(ModelAdmin):
+    list_display = ["driver", "rule", "shift_start", "occurred_at"]
+    list_filter = ["rule"]
+
+
+@register(RouteGeometry)
+class RouteGeometryAdmin(ModelAdmin):
+    list_display = ["trip_detail", "route_kind", "provider", "distance_meters", "created_at"]
+    list_filter = ["route_kind", "provider"]
+
+
+@register(Breadcrumb)
+class BreadcrumbAdmin(ModelAdmin):
+    list_display = ["trip_detail", "driver", "recorded_at", "latitude", "longitude"]
+
+
+@register(PlaceName)
+class PlaceNameAdmin(ModelAdmin):
+    list_display = ["name", "lat_key", "lng_key", "provider", "created_at"]
+    list_filter = ["provider"]
+
+
+@register(IdempotencyKey)
+class IdempotencyKeyAdmin(ModelAdmin):
+    list_display = ["user", "status_code", "created_at"]
@@ -1,11 +1,12 @@
 from collections import defaultdict
-from datetime import timedelta
 
-from django.db.models import Sum, F, ExpressionWrapper, DurationField
-from django.utils.timezone import now, make_aware, make_naive
+from django.utils.timezone import make_naive
 from rest_framework.serializers import ModelSerializer
 
-from logbook.models import Carrier, Truck, TripDetail, StopRest, DriverLogbook, LogbookItem
+from logbook.duty import get_recap_hours, get_rolling_duty_totals
+from logbook.duty_grid import get_logbook_duty_grid
+from logbook.geocoding import fill_location_names_on_commit
+from logbook.models import Carrier, Truck, TripDetail, StopRest, DriverLogbook, LogbookItem, HosViolation
 
 
 class CarrierViewSerializer(ModelSerializer):
@@ -79,6 +80,12 @@ class TripDetailSerializer(ModelSerializer):
         # These are the fields to be included in the serialized output.
         fields = ("current_location", "pickup_location", "dropoff_location", "cycle_used", "carrier")
 
+    def save(self, **kwargs):
+        """Saves the trip, and names the locations the app could not name once it is committed."""
+        trip_detail = super().save(**kwargs)
+        fill_location_names_on_commit(trip_detail)
+        return trip_detail
+
 
 class TripDetailViewSerializer(ModelSerializer):
     """
@@ -182,7 +189,8 @@ class SingleTripDetailViewSerializer(ModelSerializer):
 class DriverLogbookViewSerializer(ModelSerializer):
     class Meta:
         model = DriverLogbook  # Specifies the model being serialized, which is DriverLogbook.
-        fields = ("id", "logbook_date")  # These are the fields that will be included in the serialized output.
+        fields = ("id", "logbook_date", "gps_miles_driven")
+        # These are the fields that will be included in the serialized output.
 
 
 class LogbookItemSerializer(ModelSerializer):
@@ -204,6 +212,20 @@ class LogbookItemViewSerializer(ModelSerializer):
         return data
 
 
+class HosViolationViewSerializer(ModelSerializer):
+    class Meta:
+        model = HosViolation
+        fields = ("id", "driver", "rule", "shift_start", "occurred_at", "logbook_item")
+
+    def to_representation(self, hos_violation):
+        data = super().to_representation(hos_violation)
+        # The driver is expected to be loaded with select_related
+        data["driver_name"] = f"{hos_violation.driver.first_name} {hos_violation.driver.last_name}"
+        data["rule_name"] = hos_violation.get_rule_display()
+
+        return data
+
+
 class StopRestSerializer(ModelSerializer):
     """
     Serializer for the StopRest model.
@@ -217,6 +239,12 @@ class StopRestSerializer(ModelSerializer):
         fields = ("trip_detail", "stop_location", "stop_type", "start_time", "end_time")
         # Defines the fields to be included in the serialization
 
+    def save(self, **kwargs):
+        """Saves the stop, and names its location once it is committed if the app could not, e.g. a stop on the map."""
+        stop = super().save(**kwargs)
+        fill_location_names_on_commit(stop)
+        return stop
+
 
 class TripRouteViewSerializer(ModelSerializer):
     """
@@ -305,20 +333,17 @@ class LogbookDetailViewSerializer(ModelSerializer):
 
         # Carrer
 
-        # Trip items
-        data["logbook_items"] = self.get_logbook_items(logbook.id)
+        # Trip items, fetched once (or taken from a prefetch) for both the hourly chart and the per-minute duty grid
+        logbook_items = sorted(logbook.logbookitem_set.all(), key=lambda item: item.start_time)
+        data["logbook_items"] = self.get_logbook_items([item for item in logbook_items if item.end_time])
+        data["duty_grid"] = get_logbook_duty_grid(logbook, logbook_items)
 
-        # On-duty hours calculations
-        data["on_duty_hours"] = self.get_on_duty_hours_today(logbook)
-        data["on_duty_hours_last_seven_days"] = self.get_on_duty_hours_last_number_of_days(
-            self.context.get("driver_id"), 7
-        )
-        data["on_duty_hours_last_five_days"] = self.get_on_duty_hours_last_number_of_days(
-            self.context.get("driver_id"), 5
-        )
-        data["on_duty_hours_last_eight_days"] = self.get_on_duty_hours_last_number_of_days(
-            self.context.get("driver_id"), 8
+        # On-duty hours for the day and the rolling recap windows, read from the daily rollup
+        # unless they were already computed for a whole date range
+        duty_windows = self.context.get("duty_windows", {}).get(logbook.logbook_date) or get_rolling_duty_totals(
+            self.context.get("driver_id"), logbook.logbook_date
         )
+        data.update(get_recap_hours(duty_windows))
 
         # Truck and trailer number
         data["truck_trailer_number"] = (
@@ -327,7 +352,16 @@ class LogbookDetailViewSerializer(ModelSerializer):
 
         return data
 
-    def get_logbook_items(self, logbookId):
+    def get_logbook_items(self, logbook_items):
+        """
+        Groups a day's closed logbook items into hourly chart segments, merging adjacent items of the same type.
+
+        Args:
+            logbook_items (list): The day's closed LogbookItem instances, ordered by start time.
+
+        Returns:
+            dict: Chart segments keyed by the grid row of their item type.
+        """
         ITEM_TYPE_MAPPING = {
             "Off Duty": 1,
             "Sleeper Berth": 2,
@@ -335,10 +369,6 @@ class LogbookDetailViewSerializer(ModelSerializer):
             "On Duty (not driving)": 4,
         }
 
-        logbook_items = LogbookItem.objects.filter(driver_logbook__id=logbookId, end_time__isnull=False).order_by(
-            "start_time"
-        )
-
         grouped_items = defaultdict(list)
         previous_item = None  # Keep track of the previous item
 
@@ -370,43 +400,3 @@ class LogbookDetailViewSerializer(ModelSerializer):
             sorted_items[i]["nextRow"] = sorted_items[i + 1]["item_type"]
 
         return {k: grouped_items[k] for k in sorted(grouped_items)}
-
-    def get_on_duty_hours_today(self, logbook):
-        on_duty_items = logbook.logbookitem_set.filter(item_type__in=["driving", "on-duty-not-driving"])
-
-        # Annotate and sum the duration (end_time - start_time)
-        total_duration = on_duty_items.aggregate(
-            total=Sum(ExpressionWrapper(F("end_time") - F("start_time"), output_field=DurationField()))
-        )["total"]
-
-        # Convert duration to hours if not None, otherwise return 0
-        return round(total_duration.total_seconds() / 3600, 2) if total_duration else 0
-
-    def get_on_duty_hours_last_number_of_days(self, driver_id, number_of_days):
-        """
-        Calculates total on-duty hours for the past given number of days.
-
-        Args:
-            request_user (User): The user making the request.
-            number_of_days (int): The number of days to calculate on-duty hours.
-
-        Returns:
-            float: Total on-duty hours over the specified period.
-        """
-        # Define the time range (last n days)
-        n_days_ago = now() - timedelta(days=number_of_days)
-
-        # Filter only the relevant logbook items for the past days
-        on_duty_items = LogbookItem.objects.filter(
-            driver_logbook__driver__id=driver_id,
-            item_type__in=["driving", "on-duty-not-driving"],
-            end_time__gte=n_days_ago,  # Ensures all included items have a valid end_time
-        )
-
-        # Annotate and sum the duration (end_time - start_time)
-        total_duration = on_duty_items.aggregate(
-            total=Sum(ExpressionWrapper(F("end_time") - F("start_time"), output_field=DurationField()))
-        )["total"]
-
-        # Convert duration to hours if not None, otherwise return 0
-        return round(total_duration.total_seconds() / 3600, 2) if total_duration else 0
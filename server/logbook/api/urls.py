@@ -12,14 +12,48 @@ urlpatterns = [
     path("assign-trip-driver/", views.assign_trip_driver, name="assign_trip_driver"),  # Assign a driver to a trip
     path("get-trip-summary/<int:tripId>/", views.get_trip_summary, name="get_trip_summary"),  # Fetch trip summary
     path("get-current-trip/", views.get_current_trip, name="get_current_trip"),  # Fetch the current active trip
+    path(
+        "get-driver-snapshot/", views.get_driver_snapshot, name="get_driver_snapshot"
+    ),  # Current trip, logbook and status of the driver, read only and with an ETag
     path("change-status/", views.change_status, name="change_status"),  # Modify driver status
     path("record-stop/", views.record_stop, name="record_stop"),  # Record a stop during the trip
+    path(
+        "record-breadcrumbs/", views.record_breadcrumbs, name="record_breadcrumbs"
+    ),  # Record a batch of GPS positions on the current trip
+    path(
+        "sync-driver-operations/", views.sync_driver_operations, name="sync_driver_operations"
+    ),  # Apply the operations the driver app queued while offline, in one transaction
     path("get-trip-route/<int:tripId>/", views.get_trip_route, name="get_trip_route"),  # Fetch trip route details
     path("driver-get-trips/", views.driver_get_trips, name="driver_get_trips"),  # Retrieve driver trips
     path("get-driver-logbooks/", views.get_driver_logbooks, name="get_driver_logbooks"),
+    path(
+        "get-driver-logbooks-detail/", views.get_driver_logbooks_detail, name="get_driver_logbooks_detail"
+    ),  # Retrieve full details for every logbook of a driver in a date range
     path(
         "get-logbook-detail/<int:logbookId>/", views.get_logbook_detail, name="get_logbook_detail"
     ),  # Retrieve details for a specific logbook entry
+    path(
+        "get-logbook-sheet/<int:logbookId>/", views.get_logbook_sheet, name="get_logbook_sheet"
+    ),  # Printable SVG log sheet for a specific logbook
+    path(
+        "get-driver-logbook-sheets/", views.get_driver_logbook_sheets, name="get_driver_logbook_sheets"
+    ),  # Printable log sheets for every logbook of a driver in a date range
+    path(
+        "export-carrier-logbook-items/", views.export_carrier_logbook_items, name="export_carrier_logbook_items"
+    ),  # Stream all logbook items of the carrier for a period as NDJSON or CSV
+    path(
+        "get-carrier-hos-violations/", views.get_carrier_hos_violations, name="get_carrier_hos_violations"
+    ),  # Hours-of-service violations of the carrier's drivers for a period
+    path(
+        "search-carrier-stops/", views.search_carrier_stops, name="search_carrier_stops"
+    ),  # Stops of the carrier's trips within a bounding box or radius
+    path(
+        "search-carrier-trips/", views.search_carrier_trips, name="search_carrier_trips"
+    ),  # Trips of the carrier with a location within a bounding box or radius
+    path(
+        "get-carrier-fleet-positions/", views.get_carrier_fleet_positions, name="get_carrier_fleet_positions"
+    ),  # Latest position of each of the carrier's trucks on a current trip
+    path("get-place-name/", views.get_place_name, name="get_place_name"),  # Name of the place at a point
     path("driver-end-trip/", views.driver_end_trip, name="driver_end_trip"),  # Mark a trip as completed
     path("record-mileage-covered-today/", views.record_mileage_covered_today, name="record_mileage_covered_today"),
 ]
@@ -1,8 +1,11 @@
-from datetime import datetime
+from datetime import date, datetime
 
 from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery
 from django.conf import settings
 from django.contrib.auth.models import Group
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
 from django.utils.timezone import make_aware, now
 
 from rest_framework.views import APIView
@@ -10,10 +13,33 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 
-from core.utils import get_object_or_none, update_logbook_item_over_multiple_days
+from core.utils import (
+    bump_versions,
+    etag_matches,
+    get_content_etag,
+    get_object_or_none,
+    get_or_create_todays_driver_logbook,
+    get_version_etag,
+    update_logbook_item_over_multiple_days,
+)
+from logbook.breadcrumbs import MAX_BREADCRUMBS_PER_BATCH, get_track_version, parse_breadcrumbs, store_breadcrumbs
+from logbook.duty import get_recap_hours, get_rolling_duty_totals, get_rolling_duty_totals_for_range
+from logbook.export import EXPORT_CONTENT_TYPES, EXPORT_FORMATS, stream_carrier_logbook_items
+from logbook.fleet import fleet_positions
+from logbook.geocoding import resolve_place_name
+from logbook.idempotency import idempotent
+from logbook.mileage import add_breadcrumbs_mileage, get_latest_breadcrumb
+from logbook.log_sheet import get_rendered_log_sheet, render_log_sheets_document
+from logbook.polyline import encode_route_map_data
+from logbook.proximity import find_in_area, parse_bounding_box, parse_search_area
+from logbook.routing import RouteProviderError, get_location_waypoints, get_trip_route_geometry
+from logbook.simplify import get_simplified_trip_route
+from logbook.sync import MAX_SYNC_OPERATIONS, SyncOperationError, apply_operations, parse_operations
 from core.exceptions import RequestFailedError, MissingItemError
+from core.middleware import get_serializer_data
+from logbook.choices import route_kinds
 from users.models import User
-from logbook.models import Carrier, Truck, TripDetail, DriverLogbook, LogbookItem
+from logbook.models import Breadcrumb, Carrier, Truck, TripDetail, DriverLogbook, LogbookItem, HosViolation, StopRest
 from logbook.api.serializers import (
     CarrierViewSerializer,
     TruckSerializer,
@@ -29,13 +55,39 @@ from logbook.api.serializers import (
     TripRouteViewSerializer,
     MultipleTripDetailViewSerializer,
     LogbookDetailViewSerializer,
+    HosViolationViewSerializer,
 )
 
+# Number of logbooks returned per page by get_driver_logbooks_detail, and the most a client may ask for
+DEFAULT_LOGBOOKS_PAGE_SIZE = 31
+MAX_LOGBOOKS_PAGE_SIZE = 100
+
+# Number of trips returned per page by carrier_get_trips, and the most a client may ask for
+DEFAULT_TRIPS_PAGE_SIZE = 50
+MAX_TRIPS_PAGE_SIZE = 200
+
+# Trip filters for each tripStatus accepted by carrier_get_trips
+TRIP_STATUS_FILTERS = {
+    "pending": {"is_current": False, "is_done": False},  # Created but not started yet
+    "current": {"is_current": True},  # Assigned and in progress
+    "done": {"is_done": True},  # Completed
+}
+
+# Coordinate encodings accepted by get_trip_route, "polyline" is the compact opt-in format
+ROUTE_ENCODINGS = ("json", "polyline")
+
+# Most detailed map zoom level accepted by get_trip_route
+MAX_ROUTE_ZOOM = 22
+
+# Most stops or trips returned by one proximity search
+MAX_SEARCH_RESULTS = 500
+
 
 class MaintainCarriers(APIView):
     # Define the permission class to ensure that only authenticated users can access this view
     permission_classes = [IsAuthenticated]
 
+    @method_decorator(idempotent)  # Replays the stored response of a request retried with the same Idempotency-Key
     @transaction.atomic
     def post(self, request):
         """
@@ -81,11 +133,12 @@ class MaintainCarriers(APIView):
         carrier_admin.save()
 
         # Serialize the new carrier data
-        new_carrier_data = CarrierViewSerializer(new_carrier).data
+        new_carrier_data = get_serializer_data(CarrierViewSerializer(new_carrier))
 
         # Return a successful response with the new carrier data
         return Response({"message": "Carrier added successfully", "new_carrier_data": new_carrier_data}, status=201)
 
+    @method_decorator(idempotent)  # Replays the stored response of a request retried with the same Idempotency-Key
     @transaction.atomic
     def patch(self, request):
         """
@@ -109,7 +162,7 @@ class MaintainCarriers(APIView):
         carrier.admin.save()  # Save the updated carrier admin
 
         # Serialize the updated carrier data
-        updated_carrier_data = CarrierViewSerializer(carrier).data
+        updated_carrier_data = get_serializer_data(CarrierViewSerializer(carrier))
 
         # Return a successful response with the updated carrier data
         return Response(
@@ -122,11 +175,11 @@ class MaintainCarriers(APIView):
 
         Returns the data of all carriers serialized in the response.
         """
-        # Retrieve all carriers from the database
-        carriers = Carrier.objects.all()
+        # Retrieve all carriers from the database, with the admin whose email is listed
+        carriers = Carrier.objects.select_related("admin")
 
         # Serialize the carriers data
-        carriers_data = CarrierViewSerializer(carriers, many=True).data
+        carriers_data = get_serializer_data(CarrierViewSerializer(carriers, many=True))
 
         # Return a successful response with the list of carriers
         return Response({"message": "success", "carriers_data": carriers_data}, status=200)
@@ -135,6 +188,7 @@ class MaintainCarriers(APIView):
 class MaintainTrucks(APIView):
     permission_classes = (IsAuthenticated,)  # Ensures that only authenticated users can access this view
 
+    @method_decorator(idempotent)  # Replays the stored response of a request retried with the same Idempotency-Key
     @transaction.atomic  # Ensures all database changes are committed atomically
     def post(self, request):
         """
@@ -153,11 +207,12 @@ class MaintainTrucks(APIView):
         new_truck = serializer.save()
 
         # Serialize the saved truck data to return in the response
-        new_truck_data = TruckViewSerializer(new_truck).data
+        new_truck_data = get_serializer_data(TruckViewSerializer(new_truck))
 
         # Return a successful response with the truck data
         return Response({"message": "Truck added successfully", "new_truck_data": new_truck_data}, status=201)
 
+    @method_decorator(idempotent)  # Replays the stored response of a request retried with the same Idempotency-Key
     @transaction.atomic  # Ensures all database changes are committed atomically
     def patch(self, request):
         """
@@ -183,7 +238,7 @@ class MaintainTrucks(APIView):
         updated_truck = serializer.save()
 
         # Serialize the updated truck data to return in the response
-        updated_truck_data = TruckViewSerializer(updated_truck).data
+        updated_truck_data = get_serializer_data(TruckViewSerializer(updated_truck))
 
         # Return a successful response with the updated truck data
         return Response({"message": "Truck updated successfully", "updated_truck_data": updated_truck_data}, status=200)
@@ -199,7 +254,7 @@ class MaintainTrucks(APIView):
         trucks = Truck.objects.filter(carrier=request.user.carrier, truck_assigned=False)
 
         # Serialize the trucks data
-        trucks_data = TruckViewSerializer(trucks, many=True).data
+        trucks_data = get_serializer_data(TruckViewSerializer(trucks, many=True))
 
         # Return a successful response with the serialized truck data
         return Response({"message": "success", "trucks_data": trucks_data}, status=200)
@@ -207,6 +262,7 @@ class MaintainTrucks(APIView):
 
 @api_view(["POST"])  # This decorator indicates that this view only accepts POST requests
 @permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+@idempotent  # Replays the stored response of a request retried with the same Idempotency-Key
 @transaction.atomic  # Ensures that the entire transaction is atomic (either fully complete or fully rollback on failure)
 def add_trip(request):
     """
@@ -226,7 +282,7 @@ def add_trip(request):
     new_trip = serializer.save()
 
     # Serialize the new trip data to be included in the response
-    new_trip_data = TripDetailViewSerializer(new_trip).data
+    new_trip_data = get_serializer_data(TripDetailViewSerializer(new_trip))
 
     # Return a successful response with the newly created trip data
     return Response({"message": "Trip added successfully", "new_trip_data": new_trip_data}, status=201)
@@ -236,23 +292,91 @@ def add_trip(request):
 @permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
 def carrier_get_trips(request):
     """
-    Retrieves all trips associated with the authenticated user's carrier.
+    Retrieves the trips of the authenticated user's carrier, most recent first, one page at a time.
 
-    This view filters trips based on the carrier ID of the authenticated user, orders them by
-    the trip start date in descending order, and then returns the serialized data of the trips.
+    Trips without a start date (not assigned yet) come first, then trips by start date in descending order,
+    with the trip id breaking ties. Pages use keyset pagination: passing the returned `next_cursor` back as
+    `cursor` returns the next page, so each page costs the same however many trips the carrier has.
+    Optional filters: tripStatus (pending, current or done), driverId, truckId, startDate and endDate.
     """
-    # Filter trips that belong to the authenticated user's carrier, ordered by trip start date in descending order
-    trips = TripDetail.objects.filter(carrier=request.user.carrier).order_by("-trip_start_date")
+    try:
+        limit = min(int(request.query_params.get("limit", DEFAULT_TRIPS_PAGE_SIZE)), MAX_TRIPS_PAGE_SIZE)
+    except (TypeError, ValueError):
+        raise RequestFailedError("Error, invalid limit submitted", status_code=400)
+    if limit < 1:
+        raise RequestFailedError("Error, invalid limit submitted", status_code=400)
+
+    # Filter trips that belong to the authenticated user's carrier
+    trips = TripDetail.objects.filter(carrier_id=request.user.carrier_id)
+
+    trip_status = request.query_params.get("tripStatus")
+    if trip_status:
+        if trip_status not in TRIP_STATUS_FILTERS:
+            raise RequestFailedError("Error, invalid trip status selected", status_code=400)
+        trips = trips.filter(**TRIP_STATUS_FILTERS[trip_status])
+    if request.query_params.get("driverId"):
+        trips = trips.filter(driver__id=request.query_params["driverId"])
+    if request.query_params.get("truckId"):
+        trips = trips.filter(truck__id=request.query_params["truckId"])
+    if request.query_params.get("startDate"):
+        trips = trips.filter(trip_start_date__gte=request.query_params["startDate"])
+    if request.query_params.get("endDate"):
+        trips = trips.filter(trip_start_date__lte=request.query_params["endDate"])
+
+    # The cursor is "<trip start date>,<trip id>" of the last trip of the previous page, the date is empty if not set
+    if request.query_params.get("cursor"):
+        try:
+            cursor_date, cursor_id = request.query_params["cursor"].split(",")
+            cursor_date, cursor_id = (date.fromisoformat(cursor_date) if cursor_date else None), int(cursor_id)
+        except ValueError:
+            raise RequestFailedError("Error, invalid cursor submitted", status_code=400)
+        if cursor_date:
+            trips = trips.filter(Q(trip_start_date__lt=cursor_date) | Q(trip_start_date=cursor_date, id__lt=cursor_id))
+        else:
+            trips = trips.filter(Q(trip_start_date__isnull=False) | Q(id__lt=cursor_id))
+
+    trips = trips.order_by(F("trip_start_date").desc(nulls_first=True), "-id")
+
+    # Fetch one extra trip to know whether there is a next page, with driver and truck joined in
+    trips = list(trips.select_related("driver", "truck")[: limit + 1])
+
+    # The page is unchanged while the same trips are listed at the same versions, with the same driver and
+    # truck names and locations, which can change without bumping the trip's version
+    etag = get_content_etag(
+        [
+            (
+                trip.id,
+                trip.version,
+                trip.current_location,
+                trip.pickup_location,
+                trip.dropoff_location,
+                trip.driver and (trip.driver.first_name, trip.driver.last_name),
+                trip.truck and (trip.truck.truck_number, trip.truck.trailer_number),
+            )
+            for trip in trips
+        ]
+    )
+    if etag_matches(request, etag):
+        return Response(status=304, headers={"ETag": etag})
 
-    # Serialize the filtered trips to include in the response
-    trips_data = TripDetailViewSerializer(trips, many=True).data
+    next_cursor = None
+    if len(trips) > limit:
+        last_trip = trips[limit - 1]
+        next_cursor = f"{last_trip.trip_start_date or ''},{last_trip.id}"
+        trips = trips[:limit]
+
+    # Serialize the trips to include in the response
+    trips_data = get_serializer_data(TripDetailViewSerializer(trips, many=True))
 
     # Return a successful response with the serialized trip data
-    return Response({"message": "success", "trips_data": trips_data}, status=200)
+    return Response(
+        {"message": "success", "trips_data": trips_data, "next_cursor": next_cursor}, status=200, headers={"ETag": etag}
+    )
 
 
 @api_view(["POST"])  # This view handles POST requests
 @permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+@idempotent  # Replays the stored response of a request retried with the same Idempotency-Key
 @transaction.atomic  # Ensures all database changes are committed atomically
 def assign_trip_driver(request):
     """
@@ -289,6 +413,7 @@ def assign_trip_driver(request):
     trip_detail.is_current = True  # Mark the trip as current
     trip_detail.trip_start_date = request.data["tripStartDate"]  # Set the trip start date
     trip_detail.save()  # Save the updated trip details
+    bump_versions(TripDetail, [trip_detail.id])
 
     # Mark the driver as assigned
     driver.driver_assigned = True
@@ -299,7 +424,7 @@ def assign_trip_driver(request):
     truck.save()  # Save the updated truck status
 
     # Serialize the updated trip details to return in the response
-    updated_trip_data = TripDetailViewSerializer(trip_detail).data
+    updated_trip_data = get_serializer_data(TripDetailViewSerializer(trip_detail))
 
     # Return a success response with the updated trip data
     return Response({"message": "Driver assigned successfully", "updated_trip_data": updated_trip_data}, status=200)
@@ -312,8 +437,14 @@ def get_trip_summary(request, tripId):
     Retrieves the summary data for a specific trip.
 
     This view fetches the summary data associated with the given trip ID and returns it.
-    If the provided trip ID is invalid, it raises an error.
+    If the provided trip ID is invalid, it raises an error. An unchanged trip is answered with 304
+    from its version counter alone.
     """
+    # Compare the client's ETag with the trip's version before loading anything else
+    etag = get_version_etag(TripDetail, tripId)
+    if etag and etag_matches(request, etag):
+        return Response(status=304, headers={"ETag": etag})
+
     # Fetch the trip detail using the provided trip ID
     trip_detail = get_object_or_none(TripDetail, id=tripId)
 
@@ -322,69 +453,111 @@ def get_trip_summary(request, tripId):
         raise MissingItemError("Error, invalid trip selected", status_code=400)
 
     # Serialize the trip summary data for the trip detail
-    trip_summary_data = TripSummaryViewSerializer(trip_detail).data
+    trip_summary_data = get_serializer_data(TripSummaryViewSerializer(trip_detail))
 
     # Return a successful response with the serialized trip summary data
-    return Response({"trip_summary_data": trip_summary_data}, status=200)
+    return Response({"trip_summary_data": trip_summary_data}, status=200, headers={"ETag": etag})
 
 
 @api_view(["GET"])  # This decorator indicates that this view only accepts GET requests
 @permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
 def get_current_trip(request):
     """
-    Retrieves the current trip for the authenticated driver.
+    Retrieves the current trip for the authenticated driver, with today's logbook and current logbook item.
 
-    This view filters trips based on the 'is_current' flag and the driver ID of the authenticated user.
-    If a current trip exists, it returns the serialized data of the most recent current trip.
-    If no current trip exists, it returns None.
+    Reads the same data as get_driver_snapshot, without writing anything: today's logbook is None until a
+    status change or mileage record creates it, and takes the truck of the current trip then.
     """
-    # Filter trips that are marked as current for the authenticated driver, ordered by trip start date in descending order
-    current_trips = TripDetail.objects.filter(is_current=True, driver=request.user).order_by("-trip_start_date")
+    # Return a successful response with the current trip data (or None if no current trip exists)
+    return Response(get_driver_snapshot_data(request.user), status=200)
 
-    # Check if there is a current trip
-    if current_trips.exists():
-        # If a current trip exists, serialize the first (most recent) current trip
-        current_trip_data = SingleTripDetailViewSerializer(current_trips[0]).data
-    else:
-        # If no current trip exists, set the data to None
-        current_trip_data = None
 
-    current_logbook_item_data = None
+def get_driver_snapshot_data(driver):
+    """
+    Reads a driver's current trip, today's (UTC) logbook and current logbook item, as returned by get_driver_snapshot.
+
+    The trip is read in one query and the logbook and item in another, as subqueries of the driver's own row.
+    """
+    current_trip = TripDetail.objects.filter(is_current=True, driver=driver).order_by("-trip_start_date").first()
+    current_trip_data = get_serializer_data(SingleTripDetailViewSerializer(current_trip)) if current_trip else None
+
     driver_logbook_data = None
-    if request.user.is_driver:
-        driver_logbook, _ = DriverLogbook.objects.get_or_create(
-            driver=request.user, logbook_date=make_aware(datetime.now()).date()
-        )
-        if current_trips.exists():
-            driver_logbook.truck = current_trips[0].truck
-            driver_logbook.save()
-        driver_logbook_data = DriverLogbookViewSerializer(driver_logbook).data
-        logbook_items = LogbookItem.objects.filter(driver_logbook__driver=request.user, is_current=True).order_by(
+    current_logbook_item_data = None
+    if driver.is_driver:
+        todays_logbooks = DriverLogbook.objects.filter(driver=OuterRef("pk"), logbook_date=now().date())
+        current_items = LogbookItem.objects.filter(driver_logbook__driver=OuterRef("pk"), is_current=True).order_by(
             "-start_time"
         )
-        if logbook_items.exists():
-            current_logbook_item = logbook_items[0]
-            current_logbook_item_data = LogbookItemViewSerializer(current_logbook_item).data
+        snapshot = User.objects.filter(id=driver.id).values(
+            driver_logbook_id=Subquery(todays_logbooks.values("id")[:1]),
+            driver_logbook_gps_miles_driven=Subquery(todays_logbooks.values("gps_miles_driven")[:1]),
+            current_item_id=Subquery(current_items.values("id")[:1]),
+            current_item_type=Subquery(current_items.values("item_type")[:1]),
+            current_item_start_time=Subquery(current_items.values("start_time")[:1]),
+        )[0]
+
+        if snapshot["driver_logbook_id"]:
+            driver_logbook_data = get_serializer_data(
+                DriverLogbookViewSerializer(
+                    DriverLogbook(
+                        id=snapshot["driver_logbook_id"],
+                        logbook_date=now().date(),
+                        gps_miles_driven=snapshot["driver_logbook_gps_miles_driven"],
+                    )
+                )
+            )
+        if snapshot["current_item_id"]:
+            current_logbook_item_data = get_serializer_data(
+                LogbookItemViewSerializer(
+                    LogbookItem(
+                        id=snapshot["current_item_id"],
+                        item_type=snapshot["current_item_type"],
+                        start_time=snapshot["current_item_start_time"],
+                    )
+                )
+            )
+
+    return {
+        "message": "success",
+        "current_trip_data": current_trip_data,
+        "driver_logbook_data": driver_logbook_data,
+        "current_logbook_item_data": current_logbook_item_data,
+    }
 
-    # Return a successful response with the current trip data (or None if no current trip exists)
-    return Response(
-        {
-            "message": "success",
-            "current_trip_data": current_trip_data,
-            "driver_logbook_data": driver_logbook_data,
-            "current_logbook_item_data": current_logbook_item_data,
-        },
-        status=200,
-    )
+
+@api_view(["GET"])  # This decorator indicates that this view only accepts GET requests
+@permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+def get_driver_snapshot(request):
+    """
+    Retrieves the authenticated driver's current trip, today's logbook and current logbook item.
+
+    Returns the same data as get_current_trip from two queries and without writing anything: one for the
+    trip and one for the logbook and item, read as subqueries of the driver's own row. Today is the UTC
+    date of now(), as for every logbook day, and today's logbook is None until something creates it (a
+    status change or mileage record). The response carries an ETag, and a request whose If-None-Match
+    matches it gets an empty 304 instead.
+    """
+    snapshot_data = get_driver_snapshot_data(request.user)
+    etag = get_content_etag(snapshot_data)
+    if etag_matches(request, etag):
+        response = Response(status=304)
+    else:
+        response = Response(snapshot_data, status=200)
+    response["ETag"] = etag
+    # Let clients keep the snapshot, but always check with the server before using it
+    response["Cache-Control"] = "private, no-cache"
+
+    return response
 
 
 @api_view(["POST"])  # This decorator indicates that this view only accepts POST requests
 @permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+@idempotent  # Replays the stored response of a request retried with the same Idempotency-Key
 @transaction.atomic  # Ensures that the transaction is atomic, meaning all changes will be committed or none at all
 def change_status(request):
     if request.data["currentLogbookItemId"]:
         update_logbook_item_over_multiple_days(request)
-    driver_logbook, _ = DriverLogbook.objects.get_or_create(logbook_date=now().date(), driver=request.user)
+    driver_logbook = get_or_create_todays_driver_logbook(request.user)
     # Serialize the incoming data and add the start time for the new logbook item
     serializer = LogbookItemSerializer(
         data={**request.data, "start_time": make_aware(datetime.now()), "driver_logbook": driver_logbook.id}
@@ -395,12 +568,13 @@ def change_status(request):
 
     # Save the new logbook item to the database
     new_logbook_item = serializer.save()
+    bump_versions(DriverLogbook, [driver_logbook.id])
 
     # Serialize the newly created logbook item for the response
-    new_logbook_item_data = LogbookItemViewSerializer(new_logbook_item).data
+    new_logbook_item_data = get_serializer_data(LogbookItemViewSerializer(new_logbook_item))
 
     # driver logbook may be different i change status is happening on a different date
-    driver_logbook_data = DriverLogbookViewSerializer(driver_logbook).data
+    driver_logbook_data = get_serializer_data(DriverLogbookViewSerializer(driver_logbook))
 
     # Return a successful response with the serialized logbook item data
     return Response(
@@ -415,6 +589,7 @@ def change_status(request):
 
 @api_view(["POST"])  # This decorator indicates that this view only accepts POST requests
 @permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+@idempotent  # Replays the stored response of a request retried with the same Idempotency-Key
 @transaction.atomic  # Ensures that the transaction is atomic, meaning all changes will be committed or none at all
 def record_stop(request):
     """
@@ -431,20 +606,137 @@ def record_stop(request):
 
     # Save the new stop to the database
     new_stop = serializer.save()
+    bump_versions(TripDetail, [new_stop.trip_detail_id])
 
     # Return a successful response indicating the stop was recorded
     return Response({"message": "Stop recorded successfully"}, status=201)
 
 
+@api_view(["POST"])  # This decorator indicates that this view only accepts POST requests
+@permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+@idempotent  # Replays the stored response of a request retried with the same Idempotency-Key
+@transaction.atomic  # Ensures that all database changes are committed atomically (all or none)
+def record_breadcrumbs(request):
+    """
+    Records a batch of GPS positions on the driver's current trip.
+
+    The app buffers the positions it watches and sends them in batches under "points", each with
+    "lat", "lng", "recordedAt" and optionally "accuracy" and "speed". Positions already stored for
+    the same time, e.g. resent after a failed request, are dropped.
+    """
+    points = request.data.get("points")
+    if not isinstance(points, list) or not points:
+        raise RequestFailedError("Error, no positions submitted", status_code=400)
+    if len(points) > MAX_BREADCRUMBS_PER_BATCH:
+        raise RequestFailedError(
+            f"Error, at most {MAX_BREADCRUMBS_PER_BATCH} positions can be submitted at once", status_code=400
+        )
+
+    try:
+        parsed_points = parse_breadcrumbs(points)
+    except ValueError:
+        raise RequestFailedError("Error, invalid position submitted", status_code=400)
+
+    # Positions are only recorded on the trip the driver is currently on
+    trip_detail = (
+        TripDetail.objects.filter(is_current=True, driver=request.user)
+        .select_related("truck")
+        .order_by("-trip_start_date")
+        .first()
+    )
+    if not trip_detail:
+        raise MissingItemError("Error, no current trip to record positions on", status_code=400)
+
+    # Read before storing the batch, the mileage is added on from it
+    latest_breadcrumb = get_latest_breadcrumb(request.user)
+    # The trip's version is left alone, the track has its own version (see get_track_version)
+    new_breadcrumbs = store_breadcrumbs(trip_detail, request.user, parsed_points)
+    if new_breadcrumbs:
+        # Add the distance of the new positions to the GPS mileage of the driver's logbooks
+        add_breadcrumbs_mileage(request.user, new_breadcrumbs, latest_breadcrumb)
+        # Move the driver on the live fleet map, once the positions are committed
+        fleet_positions.record(trip_detail, request.user, new_breadcrumbs)
+
+    return Response({"message": "success", "received": len(points), "recorded": len(new_breadcrumbs)}, status=201)
+
+
+@api_view(["POST"])  # This decorator indicates that this view only accepts POST requests
+@permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+def sync_driver_operations(request):
+    """
+    Applies the status changes, stops and mileage records the driver app queued while offline.
+
+    The app sends them in the order they were made under "operations", each with its "type"
+    ("change_status", "record_stop" or "record_mileage_covered_today"), the device time it was made
+    at ("recordedAt") and the body of the operation's own endpoint ("data"). They are applied at
+    their device times in a single transaction, so either the whole batch is applied or none of it,
+    and the driver's reconciled current trip, logbook and status are returned as by get_driver_snapshot.
+    A batch with an operation that cannot be applied is answered with 400 and the operation's index in
+    the batch ("failed_operation_index"), so the app can drop it and send the rest again. Each operation
+    carries the Idempotency-Key the app made it with ("idempotencyKey"), and operations already applied
+    under their key, online or by an earlier sync whose response was lost, are skipped.
+    """
+    operations = request.data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        raise RequestFailedError("Error, no operations submitted", status_code=400)
+    if len(operations) > MAX_SYNC_OPERATIONS:
+        raise RequestFailedError(
+            f"Error, at most {MAX_SYNC_OPERATIONS} operations can be submitted at once", status_code=400
+        )
+
+    try:
+        applied = apply_operations(request.user, parse_operations(operations))
+    except SyncOperationError as error:
+        failed = RequestFailedError(f"Error, {error}", status_code=400)
+        # The app drops the failing operation and sends the rest again
+        failed.detail["failed_operation_index"] = error.index
+        raise failed from error
+
+    return Response({**get_driver_snapshot_data(request.user), "applied": applied}, status=200)
+
+
 @api_view(["GET"])  # This decorator indicates that this view only accepts GET requests
 @permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
 def get_trip_route(request, tripId):
     """
     Retrieves the route map details for a specific trip.
 
-    This view fetches the route map data associated with the given trip ID and returns it.
-    If the provided trip ID is invalid, it raises an error.
+    This view fetches the route map data associated with the given trip ID and returns it, with the
+    road geometry of either the recorded stops (routeKind "actual", the default) or the planned
+    current, pickup and dropoff locations (routeKind "planned"), or the GPS track recorded by the driver
+    app (routeKind "track"). The route is simplified for the map "zoom" level, or to a "tolerance" in
+    meters, when given. With encoding "polyline" the stops and the route line are sent as compact encoded
+    polylines instead of coordinate lists. If the provided trip ID is invalid, it raises an error. An
+    unchanged trip is answered with 304 from its version counter, and for routeKind "track" from the
+    version of its recorded track as well.
     """
+    route_kind = request.query_params.get("routeKind", "actual")
+    if route_kind not in dict(route_kinds):
+        raise RequestFailedError("Error, invalid route kind selected", status_code=400)
+
+    encoding = request.query_params.get("encoding", "json")
+    if encoding not in ROUTE_ENCODINGS:
+        raise RequestFailedError("Error, invalid encoding selected", status_code=400)
+
+    # The route can be simplified to a map zoom level or to a tolerance in meters
+    try:
+        zoom = int(request.query_params["zoom"]) if "zoom" in request.query_params else None
+        tolerance = float(request.query_params["tolerance"]) if "tolerance" in request.query_params else None
+    except ValueError:
+        raise RequestFailedError("Error, invalid zoom or tolerance selected", status_code=400)
+    if (zoom is not None and not 0 <= zoom <= MAX_ROUTE_ZOOM) or (tolerance is not None and tolerance < 0):
+        raise RequestFailedError("Error, invalid zoom or tolerance selected", status_code=400)
+
+    # Compare the client's ETag with the trip's version before loading anything else
+    etag = get_version_etag(TripDetail, tripId)
+    track_version = None
+    if etag and route_kind == "track":
+        # Positions are stored without bumping the trip's version
+        track_version = get_track_version(tripId)
+        etag = f'{etag[:-1]}-track-{track_version}"'
+    if etag and etag_matches(request, etag):
+        return Response(status=304, headers={"ETag": etag})
+
     # Fetch the trip detail using the provided trip ID
     trip_detail = get_object_or_none(TripDetail, id=tripId)
 
@@ -453,10 +745,40 @@ def get_trip_route(request, tripId):
         raise MissingItemError("Error, invalid trip selected", status_code=400)
 
     # Serialize the route map data for the trip detail
-    route_map_data = TripRouteViewSerializer(trip_detail).data
+    route_map_data = get_serializer_data(TripRouteViewSerializer(trip_detail))
+
+    # Add the road geometry, routed once per set of stops and then read from storage, or the recorded track
+    def load_route():
+        if route_kind == "track":
+            return [
+                list(position)
+                for position in Breadcrumb.objects.filter(trip_detail=trip_detail)
+                .order_by("recorded_at")
+                .values_list("latitude", "longitude")
+            ]
+        if route_kind == "planned":
+            locations = [trip_detail.current_location, trip_detail.pickup_location, trip_detail.dropoff_location]
+        else:
+            locations = [trip_stop["stop_location"] for trip_stop in route_map_data["trip_stops"]]
+        return get_trip_route_geometry(trip_detail, route_kind, get_location_waypoints(locations))
+
+    try:
+        route_map_data["route"] = get_simplified_trip_route(
+            trip_detail, route_kind, load_route, zoom=zoom, tolerance=tolerance, track_version=track_version
+        )
+    except RouteProviderError:
+        route_map_data["route"] = None
+        # Without an ETag the client asks again, instead of revalidating a response without the route
+        etag = None
+
+    if encoding == "polyline":
+        route_map_data = encode_route_map_data(route_map_data)
 
     # Return a successful response with the serialized route map data
-    return Response({"message": "success", "route_map_data": route_map_data}, status=200)
+    response = Response({"message": "success", "route_map_data": route_map_data}, status=200)
+    if etag:
+        response["ETag"] = etag
+    return response
 
 
 @api_view(["GET"])  # This decorator indicates that this view only accepts GET requests
@@ -471,13 +793,20 @@ def driver_get_trips(request):
     """
     # Filter trips that belong to the authenticated driver, ordered by trip start date in descending order,
     # and limit the results to the most recent 5 trips
-    trips = TripDetail.objects.filter(driver=request.user, is_done=True).order_by("-trip_start_date")[:5]
+    trips = list(TripDetail.objects.filter(driver=request.user, is_done=True).order_by("-trip_start_date")[:5])
+
+    # The list is unchanged while the same trips are listed at the same versions and location names
+    etag = get_content_etag(
+        [(trip.id, trip.version, trip.pickup_location["name"], trip.dropoff_location["name"]) for trip in trips]
+    )
+    if etag_matches(request, etag):
+        return Response(status=304, headers={"ETag": etag})
 
     # Serialize the filtered trips to include in the response
-    trips_data = MultipleTripDetailViewSerializer(trips, many=True).data
+    trips_data = get_serializer_data(MultipleTripDetailViewSerializer(trips, many=True))
 
     # Return a successful response with the serialized trip data
-    return Response({"message": "success", "trips_data": trips_data}, status=200)
+    return Response({"message": "success", "trips_data": trips_data}, status=200, headers={"ETag": etag})
 
 
 @api_view(["POST"])
@@ -497,23 +826,340 @@ def get_driver_logbooks(request):
     return Response({"message": "success", "logbooks_data": logbooks_data}, status=200)
 
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def get_driver_logbooks_detail(request):
+    """
+    Retrieves the full detail of every logbook of a driver in a date range.
+
+    Logbooks are returned newest first, `limit` at a time. Passing the returned `next_cursor` back as
+    `cursor` returns the next page. Driver, carrier, truck and logbook items are loaded with a fixed
+    number of queries, and the rolling duty totals are read once for the whole page.
+    """
+    try:
+        limit = min(int(request.data.get("limit", DEFAULT_LOGBOOKS_PAGE_SIZE)), MAX_LOGBOOKS_PAGE_SIZE)
+    except (TypeError, ValueError):
+        raise RequestFailedError("Error, invalid limit submitted", status_code=400)
+    if limit < 1:
+        raise RequestFailedError("Error, invalid limit submitted", status_code=400)
+
+    logbooks = DriverLogbook.objects.filter(
+        driver__id=request.data["driverId"],
+        logbook_date__gte=request.data["startDate"],
+        logbook_date__lte=request.data["endDate"],
+    )
+    # The cursor is the date of the last logbook of the previous page, dates are unique per driver
+    if request.data.get("cursor"):
+        logbooks = logbooks.filter(logbook_date__lt=request.data["cursor"])
+
+    # Fetch one extra logbook to know whether there is a next page
+    logbooks = list(
+        logbooks.select_related("driver__carrier", "truck")
+        .prefetch_related("logbookitem_set")
+        .order_by("-logbook_date")[: limit + 1]
+    )
+    if not logbooks and not request.data.get("cursor"):
+        raise MissingItemError("No logbooks available for the selected period", status_code=400)
+
+    next_cursor = logbooks[limit - 1].logbook_date if len(logbooks) > limit else None
+    logbooks = logbooks[:limit]
+
+    # Rolling duty totals for every day of the page, read from the daily rollup in one query
+    duty_windows = (
+        get_rolling_duty_totals_for_range(request.data["driverId"], logbooks[-1].logbook_date, logbooks[0].logbook_date)
+        if logbooks
+        else {}
+    )
+
+    logbooks_data = get_serializer_data(
+        LogbookDetailViewSerializer(
+            logbooks, many=True, context={"driver_id": request.data["driverId"], "duty_windows": duty_windows}
+        )
+    )
+
+    return Response({"message": "success", "logbooks_data": logbooks_data, "next_cursor": next_cursor}, status=200)
+
+
 @api_view(["GET"])  # This decorator indicates that this view only accepts GET requests
 @permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
 def get_logbook_detail(request, logbookId):
-    logbook = get_object_or_none(DriverLogbook, id=logbookId)
+    """
+    Retrieves the full detail of a logbook, with its duty grid and rolling recap.
+
+    A closed logbook is answered with 304 while its version, its driver, carrier and truck and the recap
+    windows (which also depend on the driver's other days) are unchanged. A logbook with an item in
+    progress has no ETag, its duty grid runs up to now and changes on every request.
+    """
+    logbook = (
+        DriverLogbook.objects.filter(id=logbookId)
+        .select_related("driver__carrier", "truck")
+        .annotate(has_open_item=Exists(LogbookItem.objects.filter(driver_logbook=OuterRef("pk"), end_time=None)))
+        .first()
+    )
 
     if not logbook:
         raise MissingItemError("Error, invalid logbook selected", status_code=400)
 
+    duty_windows = get_rolling_duty_totals(logbook.driver_id, logbook.logbook_date)
+    etag = None
+    if not logbook.has_open_item:
+        etag = get_content_etag(
+            [
+                logbook.id,
+                logbook.version,
+                logbook.driver.driver_number,
+                logbook.driver.driver_initials,
+                logbook.driver.carrier and logbook.driver.carrier.name,
+                logbook.truck and (logbook.truck.truck_number, logbook.truck.trailer_number),
+                get_recap_hours(duty_windows),
+            ]
+        )
+        if etag_matches(request, etag):
+            return Response(status=304, headers={"ETag": etag})
+
     # Serialize the logbook data using the TripDayLogbookView serializer
-    logbook_data = LogbookDetailViewSerializer(logbook, context={"driver_id": logbook.driver.id}).data
+    logbook_data = get_serializer_data(
+        LogbookDetailViewSerializer(
+            logbook, context={"driver_id": logbook.driver_id, "duty_windows": {logbook.logbook_date: duty_windows}}
+        )
+    )
 
     # Return a successful response with the serialized logbook data
-    return Response({"message": "success", "logbook_data": logbook_data}, status=200)
+    response = Response({"message": "success", "logbook_data": logbook_data}, status=200)
+    if etag:
+        response["ETag"] = etag
+    return response
+
+
+@api_view(["GET"])  # This decorator indicates that this view only accepts GET requests
+@permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+def get_logbook_sheet(request, logbookId):
+    """
+    Returns the printable log sheet of a logbook as an SVG image.
+
+    Sheets are cached on disk by content version, so an unchanged logbook is never drawn twice.
+    """
+    logbook = (
+        DriverLogbook.objects.select_related("driver__carrier", "truck")
+        .prefetch_related("logbookitem_set")
+        .filter(id=logbookId)
+        .first()
+    )
+    if not logbook:
+        raise MissingItemError("Error, invalid logbook selected", status_code=400)
+
+    return HttpResponse(get_rendered_log_sheet(logbook), content_type="image/svg+xml")
+
+
+@api_view(["POST"])  # This decorator indicates that this view only accepts POST requests
+@permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+def get_driver_logbook_sheets(request):
+    """
+    Returns the printable log sheets of a driver's logbooks in a date range as one HTML document.
+
+    Each sheet is taken from the render cache when its content has not changed since it was last drawn.
+    """
+    # Fetch one extra logbook to know whether the range has too many logbooks to print at once
+    logbooks = list(
+        DriverLogbook.objects.filter(
+            driver__id=request.data["driverId"],
+            logbook_date__gte=request.data["startDate"],
+            logbook_date__lte=request.data["endDate"],
+        )
+        .select_related("driver__carrier", "truck")
+        .prefetch_related("logbookitem_set")
+        .order_by("logbook_date")[: MAX_LOGBOOKS_PAGE_SIZE + 1]
+    )
+    if not logbooks:
+        raise MissingItemError("No logbooks available for the selected period", status_code=400)
+    if len(logbooks) > MAX_LOGBOOKS_PAGE_SIZE:
+        raise RequestFailedError(
+            f"Error, at most {MAX_LOGBOOKS_PAGE_SIZE} logbooks can be printed at once", status_code=400
+        )
+
+    # Rolling duty totals for every sheet, read from the daily rollup in one query
+    duty_windows = get_rolling_duty_totals_for_range(
+        request.data["driverId"], logbooks[0].logbook_date, logbooks[-1].logbook_date
+    )
+    svgs = [get_rendered_log_sheet(logbook, duty_windows[logbook.logbook_date]) for logbook in logbooks]
+
+    return HttpResponse(
+        render_log_sheets_document(svgs, f"Logbooks {request.data['startDate']} to {request.data['endDate']}"),
+        content_type="text/html",
+    )
+
+
+@api_view(["GET"])  # This decorator indicates that this view only accepts GET requests
+@permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+def export_carrier_logbook_items(request):
+    """
+    Streams every logbook item of the authenticated user's carrier between two logbook dates.
+
+    The export is written as NDJSON (default) or CSV while it is read from the database,
+    so memory use stays flat however many items the period contains.
+    """
+    export_format = request.query_params.get("exportFormat", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        raise RequestFailedError("Error, invalid export format selected", status_code=400)
+    if not request.user.carrier:
+        raise MissingItemError("Error, no carrier linked to this account", status_code=400)
+
+    try:
+        start_date = date.fromisoformat(request.query_params["startDate"])
+        end_date = date.fromisoformat(request.query_params["endDate"])
+    except (KeyError, ValueError):
+        raise RequestFailedError("Error, invalid startDate or endDate submitted", status_code=400)
+    if start_date > end_date:
+        raise RequestFailedError("Error, startDate must not be after endDate", status_code=400)
+
+    response = StreamingHttpResponse(
+        stream_carrier_logbook_items(request.user.carrier.id, start_date, end_date, export_format),
+        content_type=EXPORT_CONTENT_TYPES[export_format],
+    )
+    response["Content-Disposition"] = f'attachment; filename="logbook-items-{start_date}-{end_date}.{export_format}"'
+
+    return response
+
+
+@api_view(["POST"])  # This decorator indicates that this view only accepts POST requests
+@permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+def get_carrier_hos_violations(request):
+    """
+    Retrieves the hours-of-service violations of the authenticated user's carrier's drivers in a date range.
+
+    Violations are recorded as logbook items are closed, so this is a plain indexed read.
+    An optional driverId narrows the listing to one driver.
+    """
+    if not request.user.carrier:
+        raise MissingItemError("Error, no carrier linked to this account", status_code=400)
+
+    hos_violations = HosViolation.objects.filter(
+        driver__carrier=request.user.carrier,
+        occurred_at__date__gte=request.data["startDate"],
+        occurred_at__date__lte=request.data["endDate"],
+    )
+    if request.data.get("driverId"):
+        hos_violations = hos_violations.filter(driver__id=request.data["driverId"])
+
+    hos_violations_data = get_serializer_data(
+        HosViolationViewSerializer(hos_violations.select_related("driver").order_by("-occurred_at"), many=True)
+    )
+
+    return Response({"message": "success", "hos_violations_data": hos_violations_data}, status=200)
+
+
+@api_view(["GET"])  # This decorator indicates that this view only accepts GET requests
+@permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+def search_carrier_stops(request):
+    """
+    Finds the stops recorded on the authenticated user's carrier's trips within an area.
+
+    The area is either a bounding box (minLat, minLng, maxLat, maxLng) or a circle (lat, lng, radiusKm),
+    in which case the stops are returned nearest first with their distance. Stops are found through
+    their indexed grid cell and coordinate columns, without reading the location JSON of other stops.
+    """
+    if not request.user.carrier:
+        raise MissingItemError("Error, no carrier linked to this account", status_code=400)
+    try:
+        bounds, circle = parse_search_area(request.query_params)
+    except (KeyError, ValueError):
+        raise RequestFailedError("Error, invalid search area submitted", status_code=400)
+
+    found = find_in_area(
+        StopRest.objects.filter(trip_detail__carrier=request.user.carrier), "", bounds, circle, MAX_SEARCH_RESULTS
+    )
+    stops = StopRest.objects.filter(id__in=[stop_id for stop_id, _ in found]).values(
+        "id", "trip_detail", "stop_type", "stop_location", "start_time", "end_time"
+    )
+    stops_by_id = {stop["id"]: stop for stop in stops}
+    stops_data = [
+        {**stops_by_id[stop_id], "distance_km": round(distance / 1000, 3) if distance is not None else None}
+        for stop_id, distance in found
+    ]
+
+    return Response({"message": "success", "stops_data": stops_data}, status=200)
+
+
+@api_view(["GET"])  # This decorator indicates that this view only accepts GET requests
+@permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+def search_carrier_trips(request):
+    """
+    Finds the authenticated user's carrier's trips whose current, pickup or dropoff location lies within an area.
+
+    locationType selects the location searched (pickup by default), the area is given as for
+    search_carrier_stops.
+    """
+    if not request.user.carrier:
+        raise MissingItemError("Error, no carrier linked to this account", status_code=400)
+    location_type = request.query_params.get("locationType", "pickup")
+    if location_type not in TripDetail.location_types:
+        raise RequestFailedError("Error, invalid location type selected", status_code=400)
+    try:
+        bounds, circle = parse_search_area(request.query_params)
+    except (KeyError, ValueError):
+        raise RequestFailedError("Error, invalid search area submitted", status_code=400)
+
+    found = find_in_area(
+        TripDetail.objects.filter(carrier=request.user.carrier),
+        f"{location_type}_",
+        bounds,
+        circle,
+        MAX_SEARCH_RESULTS,
+    )
+    trips_by_id = TripDetail.objects.select_related("driver", "truck").in_bulk([trip_id for trip_id, _ in found])
+    trips_data = get_serializer_data(
+        TripDetailViewSerializer([trips_by_id[trip_id] for trip_id, _ in found], many=True)
+    )
+    for trip_data, (_, distance) in zip(trips_data, found):
+        trip_data["distance_km"] = round(distance / 1000, 3) if distance is not None else None
+
+    return Response({"message": "success", "trips_data": trips_data}, status=200)
+
+
+@api_view(["GET"])  # This decorator indicates that this view only accepts GET requests
+@permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+def get_carrier_fleet_positions(request):
+    """
+    Retrieves the latest GPS position of each of the authenticated user's carrier's drivers on a current trip.
+
+    Positions, with the driver's truck, are served from the in-memory fleet position cache instead of
+    looking up the latest position of every truck, and can be narrowed down to a bounding box
+    (minLat, minLng, maxLat, maxLng) of any size, e.g. the area shown on the map.
+    """
+    if not request.user.carrier:
+        raise MissingItemError("Error, no carrier linked to this account", status_code=400)
+    try:
+        bounds = parse_bounding_box(request.query_params)
+    except ValueError:
+        raise RequestFailedError("Error, invalid bounding box submitted", status_code=400)
+
+    positions_data = fleet_positions.get_carrier_positions(request.user.carrier.id, bounds)
+
+    return Response({"message": "success", "positions_data": positions_data}, status=200)
+
+
+@api_view(["GET"])  # This decorator indicates that this view only accepts GET requests
+@permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+def get_place_name(request):
+    """
+    Names the place at a point (lat, lng), e.g. a stop picked on the map.
+
+    Names are resolved once per rounded coordinates and then served from the server's cache, the
+    name is null when the place is unknown or the place name backend cannot be reached.
+    """
+    try:
+        lat, lng = float(request.query_params["lat"]), float(request.query_params["lng"])
+    except (KeyError, ValueError):
+        raise RequestFailedError("Error, invalid coordinates submitted", status_code=400)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise RequestFailedError("Error, invalid coordinates submitted", status_code=400)
+
+    return Response({"message": "success", "name": resolve_place_name(lat, lng)}, status=200)
 
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@idempotent
 @transaction.atomic
 def driver_end_trip(request):
     trip = get_object_or_none(TripDetail, id=request.data["tripId"])
@@ -526,6 +1172,9 @@ def driver_end_trip(request):
     trip.is_done = True
     trip.trip_end_date = now().date()
     trip.save()
+    bump_versions(TripDetail, [trip.id])
+    if trip.driver_id:
+        fleet_positions.forget(trip.driver_id)
 
     request.user.driver_assigned = False
     request.user.save()
@@ -535,9 +1184,14 @@ def driver_end_trip(request):
 
 @api_view(["POST"])  # This decorator indicates that this view only accepts POST requests
 @permission_classes([IsAuthenticated])  # Ensures that only authenticated users can access this view
+@idempotent  # Replays the stored response of a request retried with the same Idempotency-Key
 @transaction.atomic  # Ensures that all database changes are committed atomically (all or none)
 def record_mileage_covered_today(request):
-    driver_logbook = get_object_or_none(DriverLogbook, id=request.data["currentDriverLogbookId"])
+    # Without a logbook yet today (nothing recorded since midnight), mileage goes into a new one
+    if request.data.get("currentDriverLogbookId"):
+        driver_logbook = get_object_or_none(DriverLogbook, id=request.data["currentDriverLogbookId"])
+    else:
+        driver_logbook = get_or_create_todays_driver_logbook(request.user)
 
     # If the logbook is not found, raise an error
     if not driver_logbook:
@@ -553,6 +1207,7 @@ def record_mileage_covered_today(request):
         else request.data["total_miles_driving_today"]
     )
     driver_logbook.save()
+    bump_versions(DriverLogbook, [driver_logbook.id])
 
     # Return a successful response indicating that the mileage was recorded
     return Response({"message": "Mileage recorded successfully"}, status=200)
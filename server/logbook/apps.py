@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LogbookConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'logbook'
+
+    def ready(self):
+        # Connects the receiver dropping deleted place names from the cache
+        import logbook.geocoding  # noqa: F401
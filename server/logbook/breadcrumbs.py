@@ -0,0 +1,105 @@
+from datetime import datetime
+
+from django.db.models import Count, Max
+from django.utils.timezone import is_naive, make_aware
+
+from logbook.models import Breadcrumb
+
+# Most points accepted in one ingestion request, about half an hour of positions at one per second
+MAX_BREADCRUMBS_PER_BATCH = 2000
+
+# Rows written per INSERT statement
+BREADCRUMB_INSERT_BATCH_SIZE = 1000
+
+
+def parse_breadcrumbs(points):
+    """
+    Validates a batch of positions sent by the driver app.
+
+    Args:
+        points (list): Dicts with "lat", "lng" and "recordedAt" (ISO 8601), and optionally "accuracy"
+            (meters) and "speed" (meters per second).
+
+    Returns:
+        dict: The parsed (lat, lng, accuracy, speed) of each point keyed by its recorded time. A point
+              sent twice in the batch is only kept once.
+
+    Raises:
+        ValueError: If a point is malformed or out of range.
+    """
+    parsed_points = {}
+    for point in points:
+        try:
+            recorded_at = datetime.fromisoformat(point["recordedAt"])
+            lat, lng = float(point["lat"]), float(point["lng"])
+            accuracy, speed = point.get("accuracy"), point.get("speed")
+            accuracy = float(accuracy) if accuracy is not None else None
+            speed = float(speed) if speed is not None else None
+        except (KeyError, TypeError, ValueError, AttributeError) as error:
+            raise ValueError(f"Invalid position {point!r}") from error
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValueError(f"Position out of range {point!r}")
+
+        if is_naive(recorded_at):
+            recorded_at = make_aware(recorded_at)
+        parsed_points[recorded_at] = (lat, lng, accuracy, speed)
+
+    return parsed_points
+
+
+def store_breadcrumbs(trip_detail, driver, parsed_points):
+    """
+    Stores a batch of positions of a trip, leaving out the ones already stored.
+
+    The positions already stored between the earliest and latest time of the batch are read in one
+    query, the remaining ones are written with bulk inserts, and a point resent concurrently by a
+    retried request is dropped by the unique (trip, recorded time) constraint.
+
+    Args:
+        trip_detail (TripDetail): The trip the positions were recorded on.
+        driver (User): The driver who sent them.
+        parsed_points (dict): Points returned by parse_breadcrumbs.
+
+    Returns:
+        list: The newly stored Breadcrumb objects, in recorded order.
+    """
+    if not parsed_points:
+        return []
+
+    stored_times = set(
+        Breadcrumb.objects.filter(
+            trip_detail=trip_detail, recorded_at__range=(min(parsed_points), max(parsed_points))
+        ).values_list("recorded_at", flat=True)
+    )
+    new_breadcrumbs = [
+        Breadcrumb(
+            trip_detail=trip_detail,
+            driver=driver,
+            recorded_at=recorded_at,
+            latitude=lat,
+            longitude=lng,
+            accuracy=accuracy,
+            speed=speed,
+        )
+        for recorded_at, (lat, lng, accuracy, speed) in sorted(parsed_points.items())
+        if recorded_at not in stored_times
+    ]
+    Breadcrumb.objects.bulk_create(new_breadcrumbs, batch_size=BREADCRUMB_INSERT_BATCH_SIZE, ignore_conflicts=True)
+
+    return new_breadcrumbs
+
+
+def get_track_version(trip_id):
+    """
+    Returns the version of a trip's recorded track, which changes whenever a position is stored on it.
+
+    Positions are stored without bumping the trip's version, so the trip summary and lists are not
+    invalidated by every batch. The track version is the number of positions and the latest recorded
+    time, both read from the (trip, recorded time) index, so a late position stored before the latest
+    one changes it as well.
+    """
+    track = Breadcrumb.objects.filter(trip_detail_id=trip_id).aggregate(
+        count=Count("recorded_at"), latest=Max("recorded_at")
+    )
+    latest = int(track["latest"].timestamp() * 1000) if track["latest"] else 0
+    return f"{track['count']}-{latest}"
@@ -5,3 +5,16 @@ logbook_item_types = (
     ("on-duty-not-driving", "On Duty (not driving)"),  # Represents on-duty but not driving time
     ("sleeper-berth", "Sleeper Berth"),  # Represents rest time in sleeper berth
 )
+
+hos_violation_rules = (
+    ("driving-limit", "11 Hour Driving Limit"),  # Driving beyond 11 hours after a 10 hour break
+    ("duty-window", "14 Hour Duty Window"),  # Driving beyond the 14th hour after coming on duty
+    ("rest-break", "30 Minute Break"),  # Driving 8 hours without a 30 minute interruption
+    ("cycle-limit", "70 Hour / 8 Day Limit"),  # Driving after 70 hours on duty in 8 days
+)
+
+route_kinds = (
+    ("planned", "Planned Route"),  # Through the trip's current, pickup and dropoff locations
+    ("actual", "Actual Route"),  # Through the stops recorded during the trip
+    ("track", "GPS Track"),  # Along the positions recorded by the driver app, never routed or stored
+)
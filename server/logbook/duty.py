@@ -0,0 +1,420 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone
+
+from django.db.models import Q, F, Sum, ExpressionWrapper, DurationField
+from django.utils.timezone import make_aware, now
+
+from logbook.models import LogbookItem, DailyDutyTotal
+
+# Item types that count towards on-duty time (lines 3 & 4 of the log sheet)
+ON_DUTY_ITEM_TYPES = ("driving", "on-duty-not-driving")
+
+# DailyDutyTotal column that each logbook item type is rolled up into
+DAILY_TOTAL_FIELDS = {
+    "off-duty": "off_duty_seconds",
+    "sleeper-berth": "sleeper_berth_seconds",
+    "driving": "driving_seconds",
+    "on-duty-not-driving": "on_duty_not_driving_seconds",
+}
+
+# Rolling windows shown on the log sheet recap (5, 7 and 8 days including the logbook day)
+RECAP_WINDOW_DAYS = (5, 7, 8)
+
+# Hours-of-service limits for property-carrying drivers
+DRIVING_LIMIT = timedelta(hours=11)  # Driving allowed after a reset break
+DUTY_WINDOW_LIMIT = timedelta(hours=14)  # Window after coming on duty in which driving is allowed
+RESET_BREAK = timedelta(hours=10)  # Consecutive time off duty that starts a new shift
+CYCLE_LIMIT = timedelta(hours=70)  # On-duty time allowed in CYCLE_DAYS days
+CYCLE_DAYS = 8
+
+# How far back the available hours look for the driver's last reset break
+SHIFT_LOOKBACK = timedelta(hours=48)
+
+
+def get_day_bounds(day):
+    """
+    Returns the aware start (12:00 AM) and end (12:00 AM of the next day) of a calendar day.
+
+    Args:
+        day (date): The calendar day.
+
+    Returns:
+        tuple: (start, end) datetimes, end being exclusive.
+    """
+    day_start = make_aware(datetime.combine(day, time.min))
+    return day_start, day_start + timedelta(days=1)
+
+
+def get_utc_day_bounds(day):
+    """
+    Returns the start and end of a logbook day in UTC.
+
+    Logbook days are UTC dates (see get_or_create_todays_driver_logbook), so the items and mileage
+    written to a driver's logbook for a day fall within these bounds.
+
+    Args:
+        day (date): The logbook day.
+
+    Returns:
+        tuple: (start, end) datetimes, end being exclusive.
+    """
+    day_start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return day_start, day_start + timedelta(days=1)
+
+
+def seconds_to_hours(seconds):
+    """Converts a duration in seconds to hours rounded to 2 decimal places, as shown on the log sheet."""
+    return round(seconds / 3600, 2) if seconds else 0
+
+
+def get_recap_hours(duty_windows):
+    """
+    Converts a day's rolling duty totals to the on-duty hours shown in the log sheet recap.
+
+    Args:
+        duty_windows (dict): {"today": seconds, 5: seconds, 7: seconds, 8: seconds}, see get_rolling_duty_totals.
+
+    Returns:
+        dict: The on-duty hours of the day and of the last 5, 7 and 8 days.
+    """
+    return {
+        "on_duty_hours": seconds_to_hours(duty_windows["today"]),
+        "on_duty_hours_last_seven_days": seconds_to_hours(duty_windows[7]),
+        "on_duty_hours_last_five_days": seconds_to_hours(duty_windows[5]),
+        "on_duty_hours_last_eight_days": seconds_to_hours(duty_windows[8]),
+    }
+
+
+def update_daily_duty_total(logbook_item, previous_end_time=None):
+    """
+    Adds a closed logbook item's duration to the driver's rollup row for the logbook day.
+
+    When the item had already been closed before (`previous_end_time` is set), only the
+    difference between the old and the new duration is applied, so closing an item twice
+    does not count it twice.
+
+    Args:
+        logbook_item (LogbookItem): The item that has just been written with an end time.
+        previous_end_time (datetime): The end time the item had before this write, if any.
+    """
+    field = DAILY_TOTAL_FIELDS.get(logbook_item.item_type)
+    driver_logbook = logbook_item.driver_logbook
+    if not field or not logbook_item.end_time or not driver_logbook or not driver_logbook.driver_id:
+        return
+
+    seconds = (logbook_item.end_time - logbook_item.start_time).total_seconds()
+    if previous_end_time:
+        seconds -= (previous_end_time - logbook_item.start_time).total_seconds()
+    if not seconds:
+        return
+
+    daily_total, _ = DailyDutyTotal.objects.get_or_create(
+        driver_id=driver_logbook.driver_id, duty_date=driver_logbook.logbook_date
+    )
+    # Increment in the database so concurrent writes for the same day do not overwrite each other
+    DailyDutyTotal.objects.filter(id=daily_total.id).update(**{field: F(field) + seconds})
+
+
+def update_daily_duty_totals(logbook_items):
+    """
+    Adds the durations of newly created, closed logbook items to their drivers' rollup rows.
+
+    Used for items written in bulk. The affected rows are locked and read in one query, missing rows
+    are created empty with one bulk insert, skipping any a concurrent request created in the meantime,
+    and locked and read back, then every row is updated with one bulk update, so the number of queries
+    does not depend on how many items or days are involved.
+
+    Args:
+        logbook_items (list): LogbookItem instances with their driver_logbook set.
+    """
+    # Seconds to add, per (driver, day) and rollup column
+    added_seconds = defaultdict(lambda: defaultdict(float))
+    for logbook_item in logbook_items:
+        field = DAILY_TOTAL_FIELDS.get(logbook_item.item_type)
+        driver_logbook = logbook_item.driver_logbook
+        if not field or not logbook_item.end_time or not driver_logbook or not driver_logbook.driver_id:
+            continue
+        key = (driver_logbook.driver_id, driver_logbook.logbook_date)
+        added_seconds[key][field] += (logbook_item.end_time - logbook_item.start_time).total_seconds()
+    if not added_seconds:
+        return
+
+    daily_totals = lock_daily_duty_totals(added_seconds)
+    missing_keys = [key for key in added_seconds if key not in daily_totals]
+    if missing_keys:
+        DailyDutyTotal.objects.bulk_create(
+            [DailyDutyTotal(driver_id=driver_id, duty_date=duty_date) for driver_id, duty_date in missing_keys],
+            ignore_conflicts=True,
+        )
+        daily_totals.update(lock_daily_duty_totals(missing_keys))
+
+    for key, seconds_per_field in added_seconds.items():
+        for field, seconds in seconds_per_field.items():
+            setattr(daily_totals[key], field, getattr(daily_totals[key], field) + seconds)
+    DailyDutyTotal.objects.bulk_update([daily_totals[key] for key in added_seconds], list(DAILY_TOTAL_FIELDS.values()))
+
+
+def lock_daily_duty_totals(keys):
+    """
+    Locks and reads the rollup rows of (driver_id, duty_date) keys in one query.
+
+    Returns:
+        dict: {(driver_id, duty_date): DailyDutyTotal} for the keys that have a row.
+    """
+    driver_ids = {driver_id for driver_id, _ in keys}
+    duty_dates = {duty_date for _, duty_date in keys}
+    return {
+        (daily_total.driver_id, daily_total.duty_date): daily_total
+        for daily_total in DailyDutyTotal.objects.select_for_update().filter(
+            driver__id__in=driver_ids, duty_date__in=duty_dates
+        )
+        if (daily_total.driver_id, daily_total.duty_date) in keys
+    }
+
+
+def get_rolling_duty_totals(driver_id, day, window_days=RECAP_WINDOW_DAYS):
+    """
+    Reads on-duty seconds for a day and rolling N-day windows from the daily rollup.
+
+    Only the rollup rows of the widest window are read (at most 8 rows for the recap windows),
+    so the cost does not depend on how much history the driver has. Items still in progress
+    are not included until they are closed.
+
+    Args:
+        driver_id (int): The driver whose totals are being read.
+        day (date): The last day (inclusive) of every window.
+        window_days (iterable): Window lengths in days, e.g. (5, 7, 8).
+
+    Returns:
+        dict: {"today": seconds, N: seconds, ...} with one key per requested window length.
+    """
+    return get_rolling_duty_totals_for_range(driver_id, day, day, window_days)[day]
+
+
+def get_rolling_duty_totals_for_range(driver_id, first_day, last_day, window_days=RECAP_WINDOW_DAYS):
+    """
+    Reads the rolling duty totals of every day in a date range from a single rollup query.
+
+    Args:
+        driver_id (int): The driver whose totals are being read.
+        first_day (date): The first day of the range.
+        last_day (date): The last day of the range (inclusive).
+        window_days (iterable): Window lengths in days, e.g. (5, 7, 8).
+
+    Returns:
+        dict: {day: {"today": seconds, N: seconds, ...}} for every day of the range.
+    """
+    earliest_date = first_day - timedelta(days=max(window_days, default=1) - 1)
+    on_duty_seconds = {
+        duty_date: driving_seconds + on_duty_not_driving_seconds
+        for duty_date, driving_seconds, on_duty_not_driving_seconds in DailyDutyTotal.objects.filter(
+            driver_id=driver_id, duty_date__range=(earliest_date, last_day)
+        ).values_list("duty_date", "driving_seconds", "on_duty_not_driving_seconds")
+    }
+
+    totals = {}
+    for day_offset in range((last_day - first_day).days + 1):
+        day = first_day + timedelta(days=day_offset)
+        totals[day] = {"today": on_duty_seconds.get(day, 0)}
+        for number_of_days in window_days:
+            totals[day][number_of_days] = sum(
+                on_duty_seconds.get(day - timedelta(days=days_back), 0) for days_back in range(number_of_days)
+            )
+
+    return totals
+
+
+def compute_daily_duty_totals(driver_ids):
+    """
+    Builds unsaved DailyDutyTotal rows for the given drivers from their closed logbook items.
+
+    The durations are summed in the database, grouped by driver, logbook day and item type.
+
+    Args:
+        driver_ids (list): The drivers to compute rollups for.
+
+    Returns:
+        dict: {(driver_id, duty_date): DailyDutyTotal} for every day that has closed items.
+    """
+    grouped_durations = (
+        LogbookItem.objects.filter(
+            driver_logbook__driver__id__in=driver_ids,
+            item_type__in=DAILY_TOTAL_FIELDS,
+            end_time__isnull=False,
+        )
+        .values("driver_logbook__driver_id", "driver_logbook__logbook_date", "item_type")
+        .annotate(total=Sum(ExpressionWrapper(F("end_time") - F("start_time"), output_field=DurationField())))
+        .order_by()
+    )
+
+    daily_totals = {}
+    for row in grouped_durations:
+        key = (row["driver_logbook__driver_id"], row["driver_logbook__logbook_date"])
+        if key not in daily_totals:
+            daily_totals[key] = DailyDutyTotal(driver_id=key[0], duty_date=key[1])
+        setattr(daily_totals[key], DAILY_TOTAL_FIELDS[row["item_type"]], row["total"].total_seconds())
+
+    return daily_totals
+
+
+def get_available_hours(drivers, as_of=None):
+    """
+    Computes the remaining driving, duty window and cycle time of many drivers at once.
+
+    Cycle time is read from the daily rollup with one grouped query. Driving and duty window time
+    come from one query over the drivers' items of the last SHIFT_LOOKBACK hours. Any time not
+    covered by an on-duty item counts as off duty, and the shift starts after the last break of
+    at least RESET_BREAK, looked for further back for drivers who had none in the lookback. The
+    query count is the same however many drivers are included.
+
+    Args:
+        drivers (QuerySet): The drivers to compute hours for, used as a subquery.
+        as_of (datetime): The time the hours are computed at, defaults to now.
+
+    Returns:
+        dict: {driver_id: {"driving": seconds, "duty_window": seconds, "cycle": seconds}} of remaining time,
+              for every driver with any logbook activity. Drivers without any are fully available.
+    """
+    as_of = as_of or now()
+    # The cycle is made of the logbook days, which are UTC dates like the rollup's duty dates
+    today = as_of.astimezone(timezone.utc).date()
+    cycle_start = get_utc_day_bounds(today - timedelta(days=CYCLE_DAYS - 1))[0]
+    lookback_start = as_of - SHIFT_LOOKBACK
+
+    # On-duty seconds of closed items in the cycle, per driver
+    cycle_seconds = dict(
+        DailyDutyTotal.objects.filter(driver__in=drivers, duty_date__gte=cycle_start.date(), duty_date__lte=today)
+        .values("driver_id")
+        .annotate(on_duty=Sum(F("driving_seconds") + F("on_duty_not_driving_seconds")))
+        .values_list("driver_id", "on_duty")
+        .order_by()
+    )
+
+    on_duty_items = defaultdict(list)
+    for driver_id, item_type, start_time, end_time in (
+        LogbookItem.objects.filter(
+            Q(end_time__gt=lookback_start) | Q(end_time__isnull=True),
+            driver_logbook__driver__in=drivers,
+            item_type__in=ON_DUTY_ITEM_TYPES,
+        )
+        .values_list("driver_logbook__driver_id", "item_type", "start_time", "end_time")
+        .order_by("driver_logbook__driver_id", "start_time")
+    ):
+        on_duty_items[driver_id].append((item_type, start_time, end_time))
+        if end_time is None:
+            # Open items are not in the rollup yet
+            cycle_seconds[driver_id] = (
+                cycle_seconds.get(driver_id, 0) + (as_of - max(start_time, cycle_start)).total_seconds()
+            )
+
+    shift_starts = find_shift_starts(on_duty_items, lookback_start, cycle_start, as_of)
+
+    available_hours = {}
+    for driver_id in cycle_seconds.keys() | on_duty_items.keys():
+        shift_start = shift_starts.get(driver_id, lookback_start)
+        rest_start = max((end_time or as_of for _, _, end_time in on_duty_items[driver_id]), default=lookback_start)
+
+        if as_of - rest_start >= RESET_BREAK:
+            # Currently on a reset break, the next shift starts fresh
+            driving, duty_window = timedelta(0), timedelta(0)
+        else:
+            driving = sum(
+                (
+                    (end_time or as_of) - max(start_time, shift_start)
+                    for item_type, start_time, end_time in on_duty_items[driver_id]
+                    if item_type == "driving" and (end_time or as_of) > shift_start
+                ),
+                timedelta(0),
+            )
+            duty_window = as_of - shift_start
+
+        available_hours[driver_id] = {
+            "driving": max((DRIVING_LIMIT - driving).total_seconds(), 0),
+            "duty_window": max((DUTY_WINDOW_LIMIT - duty_window).total_seconds(), 0),
+            "cycle": max(CYCLE_LIMIT.total_seconds() - cycle_seconds.get(driver_id, 0), 0),
+        }
+
+    return available_hours
+
+
+def find_shift_starts(on_duty_items, lookback_start, cycle_start, as_of):
+    """
+    Finds when each driver's current shift started, after their last break of at least RESET_BREAK.
+
+    The break is first looked for in the items already read for the lookback. Drivers with no such
+    break there worked into the lookback from an earlier shift, so their earlier items are read
+    SHIFT_LOOKBACK at a time, with one query for all of them, until a break is found or the start
+    of the cycle is reached. The earlier items are added to `on_duty_items`, so the driving of the
+    whole shift is counted.
+
+    Args:
+        on_duty_items (dict): {driver_id: [(item_type, start_time, end_time), ...]} of on-duty items
+            ending after `lookback_start`, ordered by start time.
+        lookback_start (datetime): Start of the lookback the items were read for.
+        cycle_start (datetime): Start of the current cycle, no break is looked for before it.
+        as_of (datetime): The time the hours are computed at.
+
+    Returns:
+        dict: {driver_id: shift start} for every driver with on-duty items.
+    """
+    shift_starts = {}
+    unresolved_driver_ids = set()
+    for driver_id, items in on_duty_items.items():
+        shift_start = get_shift_start(items, lookback_start, as_of)
+        if shift_start is None:
+            unresolved_driver_ids.add(driver_id)
+        else:
+            shift_starts[driver_id] = shift_start
+
+    window_end = lookback_start
+    while unresolved_driver_ids and window_end > cycle_start:
+        window_start = window_end - SHIFT_LOOKBACK
+        earlier_items = defaultdict(list)
+        for driver_id, item_type, start_time, end_time in (
+            LogbookItem.objects.filter(
+                driver_logbook__driver__id__in=unresolved_driver_ids,
+                item_type__in=ON_DUTY_ITEM_TYPES,
+                end_time__gt=window_start,
+                end_time__lte=window_end,
+            )
+            .values_list("driver_logbook__driver_id", "item_type", "start_time", "end_time")
+            .order_by("driver_logbook__driver_id", "start_time")
+        ):
+            earlier_items[driver_id].append((item_type, start_time, end_time))
+
+        for driver_id in list(unresolved_driver_ids):
+            on_duty_items[driver_id][:0] = earlier_items[driver_id]
+            shift_start = get_shift_start(on_duty_items[driver_id], window_start, as_of)
+            if shift_start is None and earlier_items[driver_id]:
+                continue
+            # Without earlier on-duty items, the driver was off duty before their first item
+            shift_starts[driver_id] = shift_start or on_duty_items[driver_id][0][1]
+            unresolved_driver_ids.discard(driver_id)
+        window_end = window_start
+
+    # On duty since before the cycle started, the shift is counted from the driver's earliest item read
+    for driver_id in unresolved_driver_ids:
+        shift_starts[driver_id] = on_duty_items[driver_id][0][1]
+
+    return shift_starts
+
+
+def get_shift_start(items, window_start, as_of):
+    """
+    Returns the start of the first item after the last break of at least RESET_BREAK in a window.
+
+    Args:
+        items (list): A driver's (item_type, start_time, end_time) on-duty items, ordered by start time,
+            including every item ending after `window_start`.
+        window_start (datetime): Start of the window, time before it is not known to be off duty.
+        as_of (datetime): End time used for items still in progress.
+
+    Returns:
+        datetime: The shift start, or None if no break was found since `window_start`.
+    """
+    shift_start, rest_start = None, window_start
+    for _, start_time, end_time in items:
+        if start_time - rest_start >= RESET_BREAK:
+            shift_start = start_time
+        rest_start = max(rest_start, end_time or as_of)
+    return shift_start
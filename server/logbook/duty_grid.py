@@ -0,0 +1,135 @@
+import numpy as np
+from django.utils.timezone import now
+
+from logbook.duty import get_day_bounds
+from logbook.models import LogbookItem
+
+MINUTES_PER_DAY = 24 * 60
+
+# Grid row of each duty status, matching the rows drawn by the log sheet chart (0 means nothing recorded)
+DUTY_STATUS_ROWS = {
+    "off-duty": 1,
+    "sleeper-berth": 2,
+    "driving": 3,
+    "on-duty-not-driving": 4,
+}
+
+
+def build_duty_grids(days, items, as_of=None):
+    """
+    Builds a per-minute duty status grid for each of the given days.
+
+    Every item is converted to minute offsets from the start of its logbook day and painted onto a
+    flat timeline of len(days) * 1440 slots with a single difference array and cumulative sum, so the
+    cost does not grow with a Python loop over minutes or hours. Where items overlap, the earlier one wins.
+
+    Args:
+        days (list): The logbook days to build, one grid row per day in this order.
+        items (iterable): (logbook_date, item_type, start_time, end_time) tuples. Items still in
+            progress (no end time) run until `as_of`.
+        as_of (datetime): End time used for items still in progress, defaults to now.
+
+    Returns:
+        numpy.ndarray: A (len(days), 1440) uint8 array of DUTY_STATUS_ROWS values.
+    """
+    as_of = as_of or now()
+    day_indexes = {day: index for index, day in enumerate(days)}
+    day_start_timestamps = np.array([get_day_bounds(day)[0].timestamp() for day in days])
+
+    items = [item for item in items if item[0] in day_indexes and item[1] in DUTY_STATUS_ROWS]
+    item_days = np.fromiter((day_indexes[item[0]] for item in items), dtype=np.int64, count=len(items))
+    statuses = np.fromiter((DUTY_STATUS_ROWS[item[1]] for item in items), dtype=np.int16, count=len(items))
+    start_timestamps = np.fromiter((item[2].timestamp() for item in items), dtype=np.float64, count=len(items))
+    end_timestamps = np.fromiter(((item[3] or as_of).timestamp() for item in items), dtype=np.float64, count=len(items))
+
+    # Minute offsets within each item's own day, clipped to the day so every item stays on its row
+    day_offsets = item_days * MINUTES_PER_DAY
+    day_start_timestamps = day_start_timestamps[item_days]
+    start_minutes = np.rint((start_timestamps - day_start_timestamps) / 60)
+    end_minutes = np.rint((end_timestamps - day_start_timestamps) / 60)
+    starts = day_offsets + np.clip(start_minutes, 0, MINUTES_PER_DAY).astype(np.int64)
+    ends = day_offsets + np.clip(end_minutes, 0, MINUTES_PER_DAY).astype(np.int64)
+
+    # Trim overlaps so that each minute only ever carries one status
+    order = np.argsort(starts, kind="stable")
+    starts, ends, statuses = starts[order], ends[order], statuses[order]
+    previous_ends = np.concatenate(([0], np.maximum.accumulate(ends)[:-1])).astype(np.int64)
+    starts = np.maximum(starts, previous_ends)
+    keep = ends > starts
+
+    changes = np.zeros(len(days) * MINUTES_PER_DAY + 1, dtype=np.int16)
+    np.add.at(changes, starts[keep], statuses[keep])
+    np.add.at(changes, ends[keep], -statuses[keep])
+
+    return np.cumsum(changes[:-1]).astype(np.uint8).reshape(len(days), MINUTES_PER_DAY)
+
+
+def encode_duty_grid(grid_row):
+    """
+    Run-length encodes one day of a duty grid.
+
+    Args:
+        grid_row (numpy.ndarray): A 1440 slot row returned by build_duty_grids.
+
+    Returns:
+        dict: "segments" with the status row, start and end minute (exclusive) of each run,
+              and "status_minutes" with the minutes spent in each item type.
+    """
+    change_points = np.flatnonzero(np.diff(grid_row)) + 1
+    run_starts = np.concatenate(([0], change_points))
+    run_ends = np.concatenate((change_points, [MINUTES_PER_DAY]))
+    run_statuses = grid_row[run_starts]
+
+    segments = [
+        {"status": int(status), "start_minute": int(start_minute), "end_minute": int(end_minute)}
+        for status, start_minute, end_minute in zip(run_statuses, run_starts, run_ends)
+        if status
+    ]
+    minutes_per_status = np.bincount(grid_row, minlength=len(DUTY_STATUS_ROWS) + 1)
+
+    return {
+        "segments": segments,
+        "status_minutes": {item_type: int(minutes_per_status[row]) for item_type, row in DUTY_STATUS_ROWS.items()},
+    }
+
+
+def get_logbook_duty_grid(logbook, logbook_items, as_of=None):
+    """
+    Builds the encoded duty grid of one logbook day from its items.
+
+    Args:
+        logbook (DriverLogbook): The logbook being drawn.
+        logbook_items (iterable): The logbook's LogbookItem instances, e.g. from a prefetch.
+        as_of (datetime): End time used for an item still in progress, defaults to now.
+
+    Returns:
+        dict: The encoded grid, see encode_duty_grid.
+    """
+    grids = build_duty_grids(
+        [logbook.logbook_date],
+        [(logbook.logbook_date, item.item_type, item.start_time, item.end_time) for item in logbook_items],
+        as_of,
+    )
+    return encode_duty_grid(grids[0])
+
+
+def get_duty_grids(driver_id, days, as_of=None):
+    """
+    Builds the encoded duty grid of each of a driver's logbook days from a single query.
+
+    Args:
+        driver_id (int): The driver whose logbooks are being drawn.
+        days (iterable): The logbook days to build.
+        as_of (datetime): End time used for items still in progress, defaults to now.
+
+    Returns:
+        dict: {day: encoded grid} for every requested day, see encode_duty_grid.
+    """
+    days = sorted(set(days))
+    items = LogbookItem.objects.filter(
+        driver_logbook__driver__id=driver_id, driver_logbook__logbook_date__in=days
+    ).values_list("driver_logbook__logbook_date", "item_type", "start_time", "end_time")
+
+    grids = build_duty_grids(days, items, as_of)
+
+    return {day: encode_duty_grid(grid_row) for day, grid_row in zip(days, grids)}
@@ -0,0 +1,104 @@
+import csv
+import json
+
+from logbook.models import LogbookItem
+
+# Columns written for every exported logbook item, in order, and the query lookups they are read from
+EXPORT_COLUMNS = (
+    ("id", "id"),
+    ("logbook_date", "driver_logbook__logbook_date"),
+    ("driver_number", "driver_logbook__driver__driver_number"),
+    ("driver_first_name", "driver_logbook__driver__first_name"),
+    ("driver_last_name", "driver_logbook__driver__last_name"),
+    ("truck_number", "driver_logbook__truck__truck_number"),
+    ("trailer_number", "driver_logbook__truck__trailer_number"),
+    ("item_type", "item_type"),
+    ("start_time", "start_time"),
+    ("end_time", "end_time"),
+    ("remarks", "remarks"),
+)
+
+# Columns holding dates or datetimes, written as ISO 8601 strings
+TEMPORAL_COLUMNS = ("logbook_date", "start_time", "end_time")
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+# Content type of each export format
+EXPORT_CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Number of rows fetched from the database cursor, and joined into one chunk of output, at a time
+EXPORT_CHUNK_SIZE = 2000
+
+
+def get_carrier_logbook_item_rows(carrier_id, start_date, end_date, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Iterates over the logbook items of a carrier's drivers between two logbook dates.
+
+    The rows are read through a server-side cursor `chunk_size` at a time, joined with the driver,
+    truck and logbook date, so memory use does not depend on how many rows are exported.
+
+    Returns:
+        iterator: One tuple per logbook item, with the values of EXPORT_COLUMNS.
+    """
+    return (
+        LogbookItem.objects.filter(
+            driver_logbook__driver__carrier__id=carrier_id,
+            driver_logbook__logbook_date__gte=start_date,
+            driver_logbook__logbook_date__lte=end_date,
+        )
+        .order_by("driver_logbook__logbook_date", "id")
+        .values_list(*(lookup for _, lookup in EXPORT_COLUMNS))
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+class _LineBuffer:
+    """File-like object whose write returns the written line, so csv.writer can be used as a line formatter."""
+
+    def write(self, value):
+        return value
+
+
+def iter_ndjson(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Formats rows as newline delimited JSON objects, yielding one string per `chunk_size` rows."""
+    column_names = [column_name for column_name, _ in EXPORT_COLUMNS]
+    temporal_indexes = [column_names.index(column_name) for column_name in TEMPORAL_COLUMNS]
+    lines = []
+    for row in rows:
+        # Convert dates up front so the C JSON encoder never has to call back into Python
+        row = list(row)
+        for index in temporal_indexes:
+            if row[index] is not None:
+                row[index] = row[index].isoformat()
+        lines.append(json.dumps(dict(zip(column_names, row))))
+        if len(lines) == chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def iter_csv(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Formats rows as CSV with a header line, yielding one string per `chunk_size` rows."""
+    writer = csv.writer(_LineBuffer())
+    lines = [writer.writerow([column_name for column_name, _ in EXPORT_COLUMNS])]
+    for row in rows:
+        lines.append(writer.writerow(row))
+        if len(lines) == chunk_size:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+def iter_export(rows, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """Formats rows in the given export format ("ndjson" or "csv")."""
+    if export_format == "csv":
+        return iter_csv(rows, chunk_size)
+    return iter_ndjson(rows, chunk_size)
+
+
+def stream_carrier_logbook_items(carrier_id, start_date, end_date, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """Streams a carrier's logbook items between two logbook dates in the given export format."""
+    rows = get_carrier_logbook_item_rows(carrier_id, start_date, end_date, chunk_size)
+    return iter_export(rows, export_format, chunk_size)
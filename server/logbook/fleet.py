@@ -0,0 +1,203 @@
+from datetime import timedelta
+from functools import partial
+from threading import Lock
+
+from django.db import connection, transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.utils.timezone import now
+
+from logbook.models import Breadcrumb, TripDetail
+
+# How far behind the latest position read a position may be recorded and still be picked up, positions are
+# stored in transactions that commit in any order, and a device sends what it recorded while offline later on
+FLEET_CATCH_UP_SKEW = timedelta(minutes=10)
+
+# Fields of a position read from the database, with the driver, trip and truck it belongs to
+POSITION_FIELDS = (
+    "driver_id",
+    "driver__first_name",
+    "driver__last_name",
+    "trip_detail_id",
+    "trip_detail__carrier_id",
+    "trip_detail__truck_id",
+    "trip_detail__truck__truck_number",
+    "recorded_at",
+    "latitude",
+    "longitude",
+    "speed",
+)
+
+
+def get_latest_breadcrumbs():
+    """
+    Returns the latest position of every driver on a current trip.
+
+    On PostgreSQL this is a single DISTINCT ON query walking the (driver, recorded_at) index, other
+    databases pick the latest position of each driver with a subquery.
+    """
+    breadcrumbs = Breadcrumb.objects.filter(trip_detail__is_current=True)
+    if connection.features.can_distinct_on_fields:
+        return breadcrumbs.order_by("driver_id", "-recorded_at").distinct("driver_id")
+
+    latest_times = (
+        Breadcrumb.objects.filter(driver=OuterRef("driver"))
+        .values("driver")
+        .annotate(latest=Max("recorded_at"))
+        .values("latest")
+    )
+    return breadcrumbs.filter(recorded_at=Subquery(latest_times))
+
+
+class FleetPositionCache:
+    """
+    Latest position of every driver on a current trip, with their truck, kept in memory.
+
+    The cache is built from the database the first time a process uses it, then positions are
+    added once the transaction storing them commits. Positions recorded by other processes are
+    picked up on each read by reading again the latest position of the drivers with a position
+    recorded at most FLEET_CATCH_UP_SKEW before the latest one read, which does not depend on
+    the order the rows were committed in, and drivers whose trip has ended are dropped. A read
+    costs two small indexed queries however large the fleet is.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.positions = None  # Position dicts keyed by driver id, None until built
+        self.carrier_driver_ids = {}  # Driver ids keyed by carrier id
+        self.latest_recorded_at = None  # Time of the latest position read, None until one is
+
+    def clear(self):
+        """Forgets every position, the cache is built again on the next read."""
+        with self.lock:
+            self.positions = None
+            self.carrier_driver_ids = {}
+            self.latest_recorded_at = None
+
+    def add(self, row):
+        """Keeps a position read with POSITION_FIELDS if it is the driver's latest. Called with the lock held."""
+        if self.latest_recorded_at is None or row["recorded_at"] > self.latest_recorded_at:
+            self.latest_recorded_at = row["recorded_at"]
+        current = self.positions.get(row["driver_id"])
+        if current and current["recorded_at"] >= row["recorded_at"]:
+            return
+        if current:
+            self.carrier_driver_ids.get(current["carrier_id"], set()).discard(row["driver_id"])
+
+        self.positions[row["driver_id"]] = {
+            "driver_id": row["driver_id"],
+            "driver_name": f"{row['driver__first_name']} {row['driver__last_name']}",
+            "trip_id": row["trip_detail_id"],
+            "carrier_id": row["trip_detail__carrier_id"],
+            "truck_id": row["trip_detail__truck_id"],
+            "truck_number": row["trip_detail__truck__truck_number"],
+            "recorded_at": row["recorded_at"],
+            "lat": row["latitude"],
+            "lng": row["longitude"],
+            "speed": row["speed"],
+        }
+        self.carrier_driver_ids.setdefault(row["trip_detail__carrier_id"], set()).add(row["driver_id"])
+
+    def build(self):
+        """Reads the latest position of every driver from the database. Called with the lock held."""
+        self.positions, self.carrier_driver_ids, self.latest_recorded_at = {}, {}, None
+        for row in get_latest_breadcrumbs().values(*POSITION_FIELDS):
+            self.add(row)
+
+    def catch_up(self):
+        """Reads again the latest position of drivers with recent positions. Called with the lock held."""
+        if self.latest_recorded_at is None:
+            # No position was read yet, so any stored since is new
+            self.build()
+            return
+        # A device clock ahead of the server must not push the window past positions recorded on time
+        since = min(self.latest_recorded_at, now()) - FLEET_CATCH_UP_SKEW
+        recent_driver_ids = Breadcrumb.objects.filter(recorded_at__gte=since).values("driver_id")
+        for row in get_latest_breadcrumbs().filter(driver_id__in=recent_driver_ids).values(*POSITION_FIELDS):
+            self.add(row)
+
+    def record(self, trip_detail, driver, new_breadcrumbs):
+        """
+        Updates a driver's position with the positions they just sent once they are committed, if the cache is built.
+
+        Args:
+            trip_detail (TripDetail): The trip the positions were recorded on, with its truck loaded.
+            driver (User): The driver who sent them.
+            new_breadcrumbs (list): The Breadcrumb objects just stored, in recorded order.
+        """
+        if not new_breadcrumbs:
+            return
+
+        transaction.on_commit(partial(self.record_latest, trip_detail, driver, new_breadcrumbs[-1]))
+
+    def record_latest(self, trip_detail, driver, latest):
+        """Updates a driver's position with the latest position they sent, once it is committed."""
+        with self.lock:
+            if self.positions is None:
+                return
+            self.add(
+                {
+                    "driver_id": driver.id,
+                    "driver__first_name": driver.first_name,
+                    "driver__last_name": driver.last_name,
+                    "trip_detail_id": trip_detail.id,
+                    "trip_detail__carrier_id": trip_detail.carrier_id,
+                    "trip_detail__truck_id": trip_detail.truck_id,
+                    "trip_detail__truck__truck_number": trip_detail.truck.truck_number if trip_detail.truck else None,
+                    "recorded_at": latest.recorded_at,
+                    "latitude": latest.latitude,
+                    "longitude": latest.longitude,
+                    "speed": latest.speed,
+                }
+            )
+
+    def forget(self, driver_id):
+        """Drops a driver's position, e.g. once their trip has ended."""
+        with self.lock:
+            if self.positions is None or driver_id not in self.positions:
+                return
+            position = self.positions.pop(driver_id)
+            self.carrier_driver_ids.get(position["carrier_id"], set()).discard(driver_id)
+
+    def get_carrier_positions(self, carrier_id, bounds=None):
+        """
+        Returns the latest positions of a carrier's drivers on a current trip.
+
+        Args:
+            carrier_id (int): The carrier.
+            bounds (tuple): Only keep positions within these (min_lat, min_lng, max_lat, max_lng) bounds if given.
+
+        Returns:
+            list: Position dicts, ordered by driver id.
+        """
+        with self.lock:
+            if self.positions is None:
+                self.build()
+            else:
+                self.catch_up()
+
+            driver_ids = sorted(self.carrier_driver_ids.get(carrier_id, ()))
+            positions = [self.positions[driver_id] for driver_id in driver_ids]
+
+        # Drivers whose trip has ended, possibly through another process, are dropped
+        current_trip_ids = set(
+            TripDetail.objects.filter(
+                id__in=[position["trip_id"] for position in positions], is_current=True
+            ).values_list("id", flat=True)
+        )
+        for position in positions:
+            if position["trip_id"] not in current_trip_ids:
+                self.forget(position["driver_id"])
+        positions = [position for position in positions if position["trip_id"] in current_trip_ids]
+
+        if bounds is not None:
+            min_lat, min_lng, max_lat, max_lng = bounds
+            positions = [
+                position
+                for position in positions
+                if min_lat <= position["lat"] <= max_lat and min_lng <= position["lng"] <= max_lng
+            ]
+        return positions
+
+
+# Fleet positions of this process
+fleet_positions = FleetPositionCache()
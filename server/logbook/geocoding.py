@@ -0,0 +1,252 @@
+import csv
+import json
+import os
+from functools import lru_cache, partial
+from urllib.error import URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from core.utils import bump_versions
+from logbook.models import PlaceName, StopRest, TripDetail
+from logbook.proximity import EARTH_RADIUS_METERS
+
+# Decimal places coordinates are rounded to before resolving, 3 places is about 110 m, so every stop at the
+# same yard, truck stop or shipper shares one cached name
+PLACE_NAME_PRECISION = 3
+
+# Seconds a resolved name stays in the cache in front of the PlaceName table, unknown places are never cached
+PLACE_NAME_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Name the app falls back to when it could not name a location, replaced on the server like a missing name
+UNKNOWN_PLACE_NAME = "Unknown Location"
+
+# Location fields of each model named once it is saved, and the field holding the trip whose version they change
+NAMED_LOCATION_FIELDS = {
+    TripDetail: (("current_location", "pickup_location", "dropoff_location"), "id"),
+    StopRest: (("stop_location",), "trip_detail_id"),
+}
+
+
+class PlaceNameBackendError(Exception):
+    """Raised when a place name backend cannot be reached, the point is then left unnamed and asked again later."""
+
+
+class PlaceNameBackend:
+    """
+    Base class of place name backends, which name the place at a point.
+
+    Subclasses set `name`, stored with every place name they resolve, and implement resolve.
+    """
+
+    name = None
+
+    def resolve(self, lat, lng):
+        """
+        Names the place at a point.
+
+        Returns:
+            str: The place name, or None if the backend knows no place there.
+
+        Raises:
+            PlaceNameBackendError: If the backend cannot be reached.
+        """
+        raise NotImplementedError
+
+
+class NominatimBackend(PlaceNameBackend):
+    """Names places with the OpenStreetMap Nominatim reverse geocoding API."""
+
+    name = "nominatim"
+    url = "https://nominatim.openstreetmap.org/reverse"
+
+    def resolve(self, lat, lng):
+        request = Request(
+            f"{self.url}?{urlencode({'format': 'json', 'lat': lat, 'lon': lng})}",
+            headers={"User-Agent": settings.PLACE_NAME_USER_AGENT},
+        )
+        try:
+            with urlopen(request, timeout=settings.PLACE_NAME_BACKEND_TIMEOUT) as response:
+                return json.load(response).get("display_name")
+        except (URLError, TimeoutError, ValueError) as error:
+            raise PlaceNameBackendError(f"Nominatim could not name the place: {error}") from error
+
+
+class GazetteerBackend(PlaceNameBackend):
+    """
+    Names places offline from the nearest entry of a local gazetteer file.
+
+    The file (GAZETTEER_PATH) is a CSV with name, lat and lng columns, e.g. the carrier's yards,
+    truck stops and shippers, and points further than GAZETTEER_MAX_DISTANCE_METERS from every
+    entry are left unnamed.
+    """
+
+    name = "gazetteer"
+
+    def resolve(self, lat, lng):
+        names, lats, lngs = load_gazetteer(str(settings.GAZETTEER_PATH))
+        if not names:
+            return None
+
+        lat, lng, lats, lngs = np.radians(lat), np.radians(lng), np.radians(lats), np.radians(lngs)
+        a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2
+        distances = 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(a))
+        nearest = int(distances.argmin())
+        return names[nearest] if distances[nearest] <= settings.GAZETTEER_MAX_DISTANCE_METERS else None
+
+
+@lru_cache(maxsize=4)
+def load_gazetteer(path):
+    """
+    Reads a gazetteer file once per process.
+
+    Returns:
+        tuple: (list of names, numpy.ndarray of latitudes, numpy.ndarray of longitudes), empty without a file.
+    """
+    if not os.path.exists(path):
+        return [], np.empty(0), np.empty(0)
+
+    with open(path, newline="", encoding="utf-8") as gazetteer_file:
+        rows = [(row["name"], float(row["lat"]), float(row["lng"])) for row in csv.DictReader(gazetteer_file)]
+    if not rows:
+        return [], np.empty(0), np.empty(0)
+    names, lats, lngs = zip(*rows)
+    return list(names), np.array(lats), np.array(lngs)
+
+
+def get_place_name_backend():
+    """Returns an instance of the backend configured in PLACE_NAME_BACKEND."""
+    return import_string(settings.PLACE_NAME_BACKEND)()
+
+
+def get_place_name_key(lat, lng):
+    """Returns the rounded coordinates, as integers, a point's place name is cached under."""
+    scale = 10**PLACE_NAME_PRECISION
+    return round(lat * scale), round(lng * scale)
+
+
+def get_place_name_cache_key(lat_key, lng_key):
+    """Returns the cache key of the name of rounded coordinates."""
+    return f"place-name-{lat_key}-{lng_key}"
+
+
+def get_cached_place_name(lat_key, lng_key):
+    """
+    Returns the place name of rounded coordinates, resolving it only if it was never resolved before.
+
+    Names are cached for PLACE_NAME_CACHE_TIMEOUT in front of the PlaceName table, which is shared by
+    every process, so the backend is only asked about coordinates no process ever resolved. Unknown
+    places are not cached and are asked again, and a name deleted from the table leaves the cache too.
+
+    Raises:
+        PlaceNameBackendError: If the name is not stored yet and the backend cannot be reached.
+    """
+    cache_key = get_place_name_cache_key(lat_key, lng_key)
+    name = cache.get(cache_key)
+    if name is not None:
+        return name
+
+    name = PlaceName.objects.filter(lat_key=lat_key, lng_key=lng_key).values_list("name", flat=True).first()
+    if name is None:
+        scale = 10**PLACE_NAME_PRECISION
+        backend = get_place_name_backend()
+        name = backend.resolve(lat_key / scale, lng_key / scale)
+        if not name:
+            return None
+        # A concurrent request may have stored the same coordinates in the meantime
+        PlaceName.objects.bulk_create(
+            [PlaceName(lat_key=lat_key, lng_key=lng_key, name=name, provider=backend.name)], ignore_conflicts=True
+        )
+
+    cache.set(cache_key, name, PLACE_NAME_CACHE_TIMEOUT)
+    return name
+
+
+@receiver(post_delete, sender=PlaceName)
+def clear_deleted_place_name(sender, instance, **kwargs):
+    """Drops a deleted place name from the cache, so it is resolved again."""
+    cache.delete(get_place_name_cache_key(instance.lat_key, instance.lng_key))
+
+
+def resolve_place_name(lat, lng):
+    """
+    Names the place at a point.
+
+    Returns:
+        str: The place name, or None if it is unknown or the backend cannot be reached right now.
+    """
+    try:
+        return get_cached_place_name(*get_place_name_key(lat, lng))
+    except PlaceNameBackendError:
+        return None
+
+
+def needs_place_name(location):
+    """Checks whether a location dict (as stored on trips and stops) has coordinates but the app could not name it."""
+    coords = location.get("coords") if isinstance(location, dict) else None
+    return bool(coords) and location.get("name") in (None, "", UNKNOWN_PLACE_NAME)
+
+
+def fill_location_name(location):
+    """
+    Names a location dict from its coordinates if the app could not name it.
+
+    Returns:
+        dict: The location, with its name filled in when it was missing and could be resolved.
+    """
+    if not needs_place_name(location):
+        return location
+
+    name = resolve_place_name(location["coords"]["lat"], location["coords"]["lng"])
+    return {**location, "name": name} if name else location
+
+
+def fill_location_names(model, object_id):
+    """
+    Names the unnamed locations of a saved trip or stop and bumps the version of its trip.
+
+    The backend is asked outside of any transaction. A location changed while it was being named is
+    left alone.
+
+    Args:
+        model: TripDetail or StopRest, see NAMED_LOCATION_FIELDS.
+        object_id (int): The saved trip or stop.
+    """
+    location_fields, trip_id_field = NAMED_LOCATION_FIELDS[model]
+    row = model.objects.filter(id=object_id).values(trip_id_field, *location_fields).first()
+    if not row:
+        return
+    named_locations = {field: fill_location_name(row[field]) for field in location_fields}
+    named_locations = {field: location for field, location in named_locations.items() if location != row[field]}
+    if not named_locations:
+        return
+
+    with transaction.atomic():
+        current_row = model.objects.select_for_update().filter(id=object_id).values(*named_locations).first()
+        named_locations = {
+            field: location
+            for field, location in named_locations.items()
+            if current_row and current_row[field] == row[field]
+        }
+        if named_locations:
+            model.objects.filter(id=object_id).update(**named_locations)
+            bump_versions(TripDetail, [row[trip_id_field]])
+
+
+def fill_location_names_on_commit(instance):
+    """
+    Names the unnamed locations of a trip or stop once the current transaction commits.
+
+    Naming may call a slow remote backend, so it is kept out of the request's transaction and
+    validation, and a trip or stop is saved with the name the app sent until it is named.
+    """
+    location_fields, _ = NAMED_LOCATION_FIELDS[type(instance)]
+    if any(needs_place_name(getattr(instance, field)) for field in location_fields):
+        transaction.on_commit(partial(fill_location_names, type(instance), instance.id))
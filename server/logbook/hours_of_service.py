@@ -0,0 +1,243 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from logbook.duty import (
+    CYCLE_DAYS,
+    CYCLE_LIMIT,
+    DRIVING_LIMIT,
+    DUTY_WINDOW_LIMIT,
+    ON_DUTY_ITEM_TYPES,
+    RESET_BREAK,
+)
+from logbook.models import DailyDutyTotal, DriverDutyState, HosViolation, LogbookItem
+
+# Driving allowed before a 30 minute interruption, and the interruption needed
+DRIVING_BEFORE_BREAK_LIMIT = timedelta(hours=8)
+REST_BREAK = timedelta(minutes=30)
+
+
+def apply_logbook_item(state, logbook_item, daily_on_duty_seconds):
+    """
+    Advances a driver's running hours-of-service state by one closed logbook item.
+
+    Only the state and the item are looked at, so the cost of each step does not depend on the
+    driver's history. Items must be applied in chronological order.
+
+    Args:
+        state (DriverDutyState): The driver's state, updated in place.
+        logbook_item (LogbookItem): The closed item to apply, with driver_logbook loaded.
+        daily_on_duty_seconds (dict): {date: on-duty seconds} of at least the CYCLE_DAYS logbook days up to
+            the item's logbook day, including the item itself, used for the cycle limit.
+
+    Returns:
+        list: Unsaved HosViolation instances for the rules broken during this item.
+    """
+    item_type, start_time, end_time = logbook_item.item_type, logbook_item.start_time, logbook_item.end_time
+    state.processed_until = end_time
+    if item_type not in ON_DUTY_ITEM_TYPES:
+        return []
+
+    # Coming on duty after a 10 hour break starts a new shift
+    if not state.last_on_duty_end or start_time - state.last_on_duty_end >= RESET_BREAK:
+        state.shift_start = start_time
+        state.shift_driving_seconds = 0
+        state.driving_since_break_seconds = 0
+    state.last_on_duty_end = max(end_time, state.last_on_duty_end or end_time)
+    if item_type != "driving":
+        return []
+
+    # Any 30 consecutive minutes without driving count as the break
+    if state.last_driving_end and start_time - state.last_driving_end >= REST_BREAK:
+        state.driving_since_break_seconds = 0
+    state.last_driving_end = end_time
+
+    violations = []
+
+    def add_violation(rule, occurred_at):
+        violations.append(
+            HosViolation(
+                driver_id=state.driver_id,
+                rule=rule,
+                shift_start=state.shift_start,
+                occurred_at=occurred_at,
+                logbook_item=logbook_item,
+            )
+        )
+
+    driving_seconds = (end_time - start_time).total_seconds()
+    driving_left = DRIVING_LIMIT.total_seconds() - state.shift_driving_seconds
+    if driving_seconds > driving_left:
+        add_violation("driving-limit", start_time + timedelta(seconds=max(driving_left, 0)))
+
+    window_end = state.shift_start + DUTY_WINDOW_LIMIT
+    if end_time > window_end:
+        add_violation("duty-window", max(start_time, window_end))
+
+    driving_before_break_left = DRIVING_BEFORE_BREAK_LIMIT.total_seconds() - state.driving_since_break_seconds
+    if driving_seconds > driving_before_break_left:
+        add_violation("rest-break", start_time + timedelta(seconds=max(driving_before_break_left, 0)))
+
+    # The cycle is made of logbook days, which daily_on_duty_seconds is keyed by
+    logbook_date = logbook_item.driver_logbook.logbook_date
+    cycle_seconds = sum(
+        daily_on_duty_seconds.get(logbook_date - timedelta(days=days_back), 0) for days_back in range(CYCLE_DAYS)
+    )
+    if cycle_seconds > CYCLE_LIMIT.total_seconds():
+        add_violation("cycle-limit", end_time)
+
+    state.shift_driving_seconds += driving_seconds
+    state.driving_since_break_seconds += driving_seconds
+
+    return violations
+
+
+def apply_logbook_items(state, logbook_items, daily_on_duty_seconds):
+    """
+    Applies closed logbook items to a driver's running state in chronological order.
+
+    Each on-duty item is added to its day's total just before it is applied, so the cycle limit of
+    every item is checked against the on-duty time as of that item, not including later items.
+
+    Args:
+        state (DriverDutyState): The driver's state, updated in place.
+        logbook_items (list): Closed LogbookItem instances with driver_logbook loaded, in chronological order.
+        daily_on_duty_seconds (defaultdict): {date: on-duty seconds} before the first item, updated in place.
+
+    Returns:
+        list: Unsaved HosViolation instances for the rules broken.
+    """
+    violations = []
+    for logbook_item in logbook_items:
+        if logbook_item.item_type in ON_DUTY_ITEM_TYPES:
+            daily_on_duty_seconds[logbook_item.driver_logbook.logbook_date] += (
+                logbook_item.end_time - logbook_item.start_time
+            ).total_seconds()
+        violations += apply_logbook_item(state, logbook_item, daily_on_duty_seconds)
+    return violations
+
+
+def get_daily_on_duty_seconds_before(driver_id, logbook_items):
+    """
+    Reads a driver's daily on-duty totals from the rollup, without the given already rolled up items.
+
+    Returns:
+        defaultdict: {date: on-duty seconds} of every day in the cycles of the items, as they were before the items.
+    """
+    logbook_dates = [logbook_item.driver_logbook.logbook_date for logbook_item in logbook_items]
+    first_date = min(logbook_dates) - timedelta(days=CYCLE_DAYS - 1)
+    daily_on_duty_seconds = defaultdict(float)
+    for duty_date, driving_seconds, on_duty_not_driving_seconds in DailyDutyTotal.objects.filter(
+        driver__id=driver_id, duty_date__range=(first_date, max(logbook_dates))
+    ).values_list("duty_date", "driving_seconds", "on_duty_not_driving_seconds"):
+        daily_on_duty_seconds[duty_date] = driving_seconds + on_duty_not_driving_seconds
+
+    for logbook_item in logbook_items:
+        if logbook_item.item_type in ON_DUTY_ITEM_TYPES:
+            daily_on_duty_seconds[logbook_item.driver_logbook.logbook_date] -= (
+                logbook_item.end_time - logbook_item.start_time
+            ).total_seconds()
+    return daily_on_duty_seconds
+
+
+def evaluate_closed_logbook_items(logbook_items):
+    """
+    Applies newly closed logbook items to their drivers' running state and records any violations.
+
+    Called on the status change path once the previous item has been closed (and split over days).
+    Per driver this reads and locks the state row, reads at most the rollup rows of the cycle, then
+    writes the state and the violations, so the number of queries does not grow with the driver's
+    history or with the number of items. An item starting before the state's processed_until, closed
+    out of order (e.g. synced from a device that was offline) or closed a second time, cannot simply
+    be applied on top of the state, so the driver's shift it falls in is evaluated again instead.
+
+    Args:
+        logbook_items (list): Closed LogbookItem instances with their driver_logbook set.
+    """
+    items_by_driver = defaultdict(list)
+    for logbook_item in logbook_items:
+        if logbook_item.end_time and logbook_item.driver_logbook and logbook_item.driver_logbook.driver_id:
+            items_by_driver[logbook_item.driver_logbook.driver_id].append(logbook_item)
+
+    for driver_id, driver_items in items_by_driver.items():
+        driver_items.sort(key=lambda logbook_item: logbook_item.start_time)
+        state, _ = DriverDutyState.objects.select_for_update().get_or_create(driver_id=driver_id)
+        if state.processed_until and driver_items[0].start_time < state.processed_until:
+            reevaluate_driver_from(state, driver_items[0].start_time)
+            continue
+
+        daily_on_duty_seconds = get_daily_on_duty_seconds_before(driver_id, driver_items)
+        violations = apply_logbook_items(state, driver_items, daily_on_duty_seconds)
+        state.save()
+        # A rule already broken earlier in the same shift is not recorded again
+        HosViolation.objects.bulk_create(violations, ignore_conflicts=True)
+
+
+def reevaluate_driver_from(state, from_time):
+    """
+    Evaluates a driver's closed items again from the start of the shift that was running at a time.
+
+    The driver's items of the CYCLE_DAYS before `from_time` onwards are read in one query, and replayed
+    from the first on-duty item after their last break of at least RESET_BREAK before `from_time` on a
+    fresh state. Violations of the replayed shifts are replaced, as items closed out of order can move
+    shift starts as well as break rules.
+
+    Args:
+        state (DriverDutyState): The driver's locked state, saved with the result.
+        from_time (datetime): Start of the earliest item that was closed out of order.
+    """
+    window_start = from_time - timedelta(days=CYCLE_DAYS)
+    logbook_items = list(
+        LogbookItem.objects.filter(
+            driver_logbook__driver__id=state.driver_id, end_time__isnull=False, end_time__gt=window_start
+        )
+        .select_related("driver_logbook")
+        .order_by("start_time")
+    )
+
+    replay_index, rest_start = 0, window_start
+    for index, logbook_item in enumerate(logbook_items):
+        if logbook_item.start_time > from_time:
+            break
+        if logbook_item.item_type in ON_DUTY_ITEM_TYPES:
+            if logbook_item.start_time - rest_start >= RESET_BREAK:
+                replay_index = index
+            rest_start = max(rest_start, logbook_item.end_time)
+    logbook_items = logbook_items[replay_index:]
+    if not logbook_items:
+        return
+
+    # Start again from a fresh state, the replay begins right after a reset break
+    state.shift_start = state.last_on_duty_end = state.last_driving_end = state.processed_until = None
+    state.shift_driving_seconds = state.driving_since_break_seconds = 0
+
+    daily_on_duty_seconds = get_daily_on_duty_seconds_before(state.driver_id, logbook_items)
+    violations = apply_logbook_items(state, logbook_items, daily_on_duty_seconds)
+    state.save()
+    HosViolation.objects.filter(driver__id=state.driver_id, shift_start__gte=logbook_items[0].start_time).delete()
+    HosViolation.objects.bulk_create(violations, ignore_conflicts=True)
+
+
+def replay_driver_logbook_items(driver_id, logbook_items):
+    """
+    Rebuilds a driver's running state and violations from their whole history of closed items.
+
+    Used for backfill. Instead of the rollup, the on-duty seconds per day are accumulated while
+    the items are replayed.
+
+    Args:
+        driver_id (int): The driver being replayed.
+        logbook_items (iterable): The driver's closed LogbookItem instances, in chronological order,
+            with driver_logbook loaded.
+
+    Returns:
+        tuple: (DriverDutyState, list of HosViolation), both unsaved.
+    """
+    state = DriverDutyState(driver_id=driver_id)
+    violations = apply_logbook_items(state, logbook_items, defaultdict(float))
+
+    # Keep only the first violation of each rule in each shift, as the unique constraint does
+    first_violations = {}
+    for violation in violations:
+        first_violations.setdefault((violation.rule, violation.shift_start), violation)
+
+    return state, list(first_violations.values())
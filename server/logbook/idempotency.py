@@ -0,0 +1,150 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.timezone import now
+from rest_framework.response import Response
+
+from core.exceptions import RequestFailedError
+from logbook.models import IdempotencyKey
+
+# Longest Idempotency-Key header accepted, enough for any UUID or client generated token
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+def get_request_hash(request):
+    """Returns the SHA-256 of a request's method, path and body, the same for a retry of the same request."""
+    content = json.dumps([request.method, request.path, request.data], sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def get_key_hash(key):
+    """
+    Returns the SHA-256 of an Idempotency-Key, as stored.
+
+    Raises:
+        RequestFailedError: If the key is too long.
+    """
+    if not isinstance(key, str) or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise RequestFailedError("Error, invalid Idempotency-Key submitted", status_code=400)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def is_key_expired(idempotency_key):
+    """Checks whether a stored key is older than IDEMPOTENCY_KEY_TTL, and free to be used again."""
+    return idempotency_key.created_at < now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+
+def claim_operation_keys(user, operations):
+    """
+    Stores the Idempotency-Keys of operations about to be applied, in the caller's transaction.
+
+    Each operation the driver app makes gets its key when it is made, and sends it both on the
+    request made online and with the operation when it is queued and synced later, so an operation
+    whose online request was applied but whose response was lost is not applied a second time.
+
+    Args:
+        user (User): The user applying the operations.
+        operations (dict): Operations keyed by their Idempotency-Key.
+
+    Returns:
+        set: The keys already used within IDEMPOTENCY_KEY_TTL, whose operations must be skipped.
+
+    Raises:
+        RequestFailedError: If a request with one of the keys is still running, the operations can be sent again later.
+    """
+    key_hashes = {get_key_hash(key): key for key in operations}
+    stored_keys = IdempotencyKey.objects.filter(user=user, key__in=key_hashes)
+    expired_ids = []
+    used_keys = set()
+    for stored_key in stored_keys:
+        if is_key_expired(stored_key):
+            expired_ids.append(stored_key.id)
+        else:
+            used_keys.add(key_hashes[stored_key.key])
+    if expired_ids:
+        IdempotencyKey.objects.filter(id__in=expired_ids).delete()
+
+    new_keys = [
+        IdempotencyKey(
+            user=user,
+            key=key_hash,
+            request_hash=hashlib.sha256(json.dumps(operations[key], sort_keys=True, default=str).encode()).hexdigest(),
+        )
+        for key_hash, key in key_hashes.items()
+        if key not in used_keys
+    ]
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.bulk_create(new_keys)
+    except IntegrityError:
+        raise RequestFailedError("Error, an operation is still being applied, try again later", status_code=409)
+    return used_keys
+
+
+def get_stored_response(idempotency_key, request_hash):
+    """
+    Returns the response stored for a key, to replay it.
+
+    Raises:
+        RequestFailedError: If the key was used for a different request.
+    """
+    if idempotency_key.request_hash != request_hash:
+        raise RequestFailedError(
+            "Error, this Idempotency-Key was already used for a different request", status_code=422
+        )
+    return Response(
+        idempotency_key.response, status=idempotency_key.status_code, headers={"Idempotent-Replayed": "true"}
+    )
+
+
+def idempotent(view):
+    """
+    Makes a write view safe to retry with an Idempotency-Key header.
+
+    The first request with a key is handled as usual, and its response is stored with the key in
+    the same transaction as the request's changes, so either both are saved or neither is. A retry
+    with the same key within IDEMPOTENCY_KEY_TTL seconds gets the stored response back without
+    running the view again, and a retry sent while the first request is still running waits for
+    it on the key's unique constraint. Requests without the header are handled as before. Keys
+    are scoped to the user, and expired keys are evicted by the evict_idempotency_keys command.
+
+    Used below @api_view (or with method_decorator on APIView methods), so the request is
+    authenticated and its body parsed.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return view(request, *args, **kwargs)
+
+        key = get_key_hash(key)
+        request_hash = get_request_hash(request)
+        stored_key = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if stored_key:
+            if not is_key_expired(stored_key):
+                return get_stored_response(stored_key, request_hash)
+            # An expired key is free to be used again
+            stored_key.delete()
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    idempotency_key = IdempotencyKey.objects.create(
+                        user=request.user, key=key, request_hash=request_hash
+                    )
+            except IntegrityError:
+                # The same request was sent concurrently and has just been handled
+                return get_stored_response(IdempotencyKey.objects.get(user=request.user, key=key), request_hash)
+
+            response = view(request, *args, **kwargs)
+            idempotency_key.status_code = response.status_code
+            idempotency_key.response = getattr(response, "data", None)
+            idempotency_key.save(update_fields=["status_code", "response"])
+        return response
+
+    return wrapper
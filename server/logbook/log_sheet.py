@@ -0,0 +1,270 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.utils.timezone import localtime
+
+from logbook.duty import RECAP_WINDOW_DAYS, get_recap_hours, get_rolling_duty_totals
+from logbook.duty_grid import DUTY_STATUS_ROWS, MINUTES_PER_DAY, get_logbook_duty_grid
+
+# Bump when the drawing changes, so sheets cached by an older renderer are drawn again
+LOG_SHEET_RENDERER_VERSION = 1
+
+# Labels of the grid rows, in DUTY_STATUS_ROWS order
+GRID_ROW_LABELS = ("Off Duty", "Sleeper Berth", "Driving", "On Duty (not driving)")
+
+# Hour labels along the top of the grid
+GRID_HOUR_LABELS = (
+    ["Mid-night"] + [str(hour) for hour in range(1, 12)] + ["Noon"] + [str(hour) for hour in range(1, 12)]
+)
+
+# Sheet geometry, in SVG user units
+SHEET_WIDTH = 1100
+GRID_LEFT = 150
+GRID_TOP = 130
+GRID_WIDTH = 864
+GRID_ROW_HEIGHT = 32
+LINE_HEIGHT = 18
+
+
+def get_log_sheet_data(logbook, logbook_items, duty_windows):
+    """
+    Collects everything drawn on a log sheet: the header, the per-minute duty grid, the remarks and the recap.
+
+    Args:
+        logbook (DriverLogbook): The logbook to draw, with its driver, carrier and truck loaded.
+        logbook_items (list): The logbook's items, ordered by start time.
+        duty_windows (dict): The logbook day's rolling duty totals, see get_rolling_duty_totals.
+
+    Returns:
+        dict: The log sheet data drawn by render_log_sheet_svg.
+    """
+    return {
+        "logbook_date": logbook.logbook_date,
+        "driver_number": logbook.driver.driver_number,
+        "driver_initials": logbook.driver.driver_initials,
+        "carrier_name": logbook.driver.carrier.name,
+        "truck_trailer_number": (
+            f"{logbook.truck.truck_number} {logbook.truck.trailer_number}" if logbook.truck else "N/A"
+        ),
+        "total_miles_driving_today": logbook.total_miles_driving_today,
+        "mileage_covered_today": logbook.mileage_covered_today,
+        "duty_grid": get_logbook_duty_grid(logbook, logbook_items),
+        "remarks": [
+            {
+                "time": localtime(item.start_time).strftime("%H:%M"),
+                "item_type_name": item.get_item_type_display(),
+                "remarks": item.remarks,
+            }
+            for item in logbook_items
+            if item.remarks
+        ],
+        **get_recap_hours(duty_windows),
+    }
+
+
+def get_log_sheet_version(logbook, duty_windows):
+    """
+    Returns a version for a closed logbook's sheet from the cheap inputs of everything drawn on it.
+
+    Items and mileage are covered by the logbook's version counter, the recap by the rolling duty
+    totals and the header by the driver, carrier and truck details, so neither the sheet data nor
+    the duty grid has to be built to tell whether a cached sheet is still current.
+    """
+    driver, truck = logbook.driver, logbook.truck
+    content = json.dumps(
+        [
+            LOG_SHEET_RENDERER_VERSION,
+            logbook.version,
+            [duty_windows[window] for window in ("today", *RECAP_WINDOW_DAYS)],
+            [driver.driver_number, driver.driver_initials, driver.carrier.name],
+            [truck.truck_number, truck.trailer_number] if truck else None,
+        ],
+        default=str,
+    )
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def _text(x, y, value, **attributes):
+    """Returns an SVG text element, escaping the value."""
+    attributes = "".join(f' {name.replace("_", "-")}="{attribute}"' for name, attribute in attributes.items())
+    return f'<text x="{x}" y="{y}"{attributes}>{escape(str(value))}</text>'
+
+
+def _minute_x(minute):
+    """Returns the x coordinate of a minute of the day on the grid."""
+    return round(GRID_LEFT + minute * GRID_WIDTH / MINUTES_PER_DAY, 2)
+
+
+def _row_y(status):
+    """Returns the y coordinate of the middle of a duty status row on the grid."""
+    return GRID_TOP + (status - 1) * GRID_ROW_HEIGHT + GRID_ROW_HEIGHT / 2
+
+
+def render_log_sheet_svg(sheet_data):
+    """
+    Draws a daily log sheet (header, duty grid, remarks and recap) as an SVG document.
+
+    Args:
+        sheet_data (dict): Log sheet data as returned by get_log_sheet_data.
+
+    Returns:
+        str: The SVG document.
+    """
+    elements = []
+    grid_bottom = GRID_TOP + len(GRID_ROW_LABELS) * GRID_ROW_HEIGHT
+    grid_right = GRID_LEFT + GRID_WIDTH
+
+    # Header
+    elements.append(
+        _text(20, 36, f"Driver's Daily Log - {sheet_data['logbook_date']}", font_size=20, font_weight="bold")
+    )
+    elements.append(
+        _text(
+            20,
+            64,
+            f"Driver number: {sheet_data['driver_number'] or ''}    Initials: {sheet_data['driver_initials'] or ''}"
+            f"    Carrier: {sheet_data['carrier_name']}    Truck/Trailer: {sheet_data['truck_trailer_number']}",
+        )
+    )
+    elements.append(
+        _text(
+            20,
+            86,
+            f"Total miles driving today: {sheet_data['total_miles_driving_today']}"
+            f"    Total mileage today: {sheet_data['mileage_covered_today']}",
+        )
+    )
+
+    # Grid frame, hour labels and quarter hour ticks
+    elements.append(
+        f'<rect x="{GRID_LEFT}" y="{GRID_TOP}" width="{GRID_WIDTH}" height="{grid_bottom - GRID_TOP}" '
+        'fill="none" stroke="black"/>'
+    )
+    for hour, hour_label in enumerate(GRID_HOUR_LABELS):
+        elements.append(_text(_minute_x(hour * 60), GRID_TOP - 8, hour_label, font_size=10, text_anchor="middle"))
+    for quarter in range(1, 24 * 4):
+        x = _minute_x(quarter * 15)
+        if quarter % 4 == 0:
+            elements.append(f'<line x1="{x}" y1="{GRID_TOP}" x2="{x}" y2="{grid_bottom}" stroke="black"/>')
+            continue
+        tick_length = 10 if quarter % 2 == 0 else 6
+        for row in range(len(GRID_ROW_LABELS)):
+            row_top = GRID_TOP + row * GRID_ROW_HEIGHT
+            elements.append(f'<line x1="{x}" y1="{row_top}" x2="{x}" y2="{row_top + tick_length}" stroke="gray"/>')
+
+    # Row labels, row separators and hours per status
+    status_minutes = sheet_data["duty_grid"]["status_minutes"]
+    elements.append(_text(grid_right + 12, GRID_TOP - 8, "Total hours", font_size=10))
+    for item_type, status in DUTY_STATUS_ROWS.items():
+        row_top = GRID_TOP + (status - 1) * GRID_ROW_HEIGHT
+        if status > 1:
+            elements.append(f'<line x1="{GRID_LEFT}" y1="{row_top}" x2="{grid_right}" y2="{row_top}" stroke="black"/>')
+        elements.append(_text(20, _row_y(status) + 4, GRID_ROW_LABELS[status - 1], font_size=12))
+        elements.append(_text(grid_right + 12, _row_y(status) + 4, f"{status_minutes[item_type] / 60:.2f}"))
+
+    # Duty status line, with a vertical joint wherever one status follows straight on from another
+    previous_segment = None
+    for segment in sheet_data["duty_grid"]["segments"]:
+        y = _row_y(segment["status"])
+        elements.append(
+            f'<line x1="{_minute_x(segment["start_minute"])}" y1="{y}" x2="{_minute_x(segment["end_minute"])}" '
+            f'y2="{y}" stroke="blue" stroke-width="3"/>'
+        )
+        if previous_segment and previous_segment["end_minute"] == segment["start_minute"]:
+            x = _minute_x(segment["start_minute"])
+            elements.append(
+                f'<line x1="{x}" y1="{_row_y(previous_segment["status"])}" x2="{x}" y2="{y}" '
+                'stroke="blue" stroke-width="3"/>'
+            )
+        previous_segment = segment
+
+    # Remarks
+    y = grid_bottom + 40
+    elements.append(_text(20, y, "Remarks", font_weight="bold"))
+    for remark in sheet_data["remarks"]:
+        y += LINE_HEIGHT
+        elements.append(
+            _text(20, y, f"{remark['time']}  {remark['item_type_name']}: {remark['remarks']}", font_size=12)
+        )
+
+    # Recap
+    y += 40
+    elements.append(_text(20, y, "Recap", font_weight="bold"))
+    recap = (
+        ("On duty hours today", sheet_data["on_duty_hours"]),
+        ("On duty hours last 5 days", sheet_data["on_duty_hours_last_five_days"]),
+        ("On duty hours last 7 days", sheet_data["on_duty_hours_last_seven_days"]),
+        ("On duty hours last 8 days", sheet_data["on_duty_hours_last_eight_days"]),
+    )
+    for column, (label, hours) in enumerate(recap):
+        elements.append(_text(20 + column * 260, y + LINE_HEIGHT + 4, f"{label}: {hours}", font_size=12))
+
+    height = y + 2 * LINE_HEIGHT + 20
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{SHEET_WIDTH}" height="{height}" '
+        f'viewBox="0 0 {SHEET_WIDTH} {height}" font-family="sans-serif" font-size="14">'
+        f'<rect width="{SHEET_WIDTH}" height="{height}" fill="white"/>{"".join(elements)}</svg>'
+    )
+
+
+def get_rendered_log_sheet(logbook, duty_windows=None):
+    """
+    Returns a logbook's SVG log sheet, drawing it only if this version of it is not cached on disk yet.
+
+    Sheets are cached in LOG_SHEET_CACHE_DIR as <logbook id>-<version>.svg. When a new version is
+    written, older versions of the same logbook are removed. A logbook with an item still in progress
+    is drawn up to now on every call and never cached, as its sheet changes every minute.
+
+    Args:
+        logbook (DriverLogbook): The logbook to draw, with its driver, carrier and truck loaded and items prefetched.
+        duty_windows (dict): Rolling duty totals of the logbook day, read from the rollup if not given.
+
+    Returns:
+        str: The SVG document.
+    """
+    duty_windows = duty_windows or get_rolling_duty_totals(logbook.driver_id, logbook.logbook_date)
+    logbook_items = sorted(logbook.logbookitem_set.all(), key=lambda item: item.start_time)
+    if any(item.end_time is None for item in logbook_items):
+        return render_log_sheet_svg(get_log_sheet_data(logbook, logbook_items, duty_windows))
+
+    cache_dir = Path(settings.LOG_SHEET_CACHE_DIR)
+    cache_path = cache_dir / f"{logbook.id}-{get_log_sheet_version(logbook, duty_windows)}.svg"
+    if cache_path.exists():
+        return cache_path.read_text()
+
+    svg = render_log_sheet_svg(get_log_sheet_data(logbook, logbook_items, duty_windows))
+
+    # Write to a temporary file first so that a concurrent reader never sees a partly written sheet
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for stale_path in cache_dir.glob(f"{logbook.id}-*.svg"):
+        stale_path.unlink(missing_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(file_descriptor, "w") as temporary_file:
+        temporary_file.write(svg)
+    os.replace(temporary_path, cache_path)
+
+    return svg
+
+
+def render_log_sheets_document(svgs, title):
+    """
+    Combines rendered log sheets into one printable HTML document, one sheet per page.
+
+    Args:
+        svgs (list): SVG documents as returned by get_rendered_log_sheet.
+        title (str): The document title.
+
+    Returns:
+        str: The HTML document.
+    """
+    pages = "".join(f'<div class="sheet">{svg}</div>' for svg in svgs)
+    return (
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{escape(title)}</title>"
+        "<style>.sheet{page-break-after:always}.sheet svg{width:100%;height:auto}</style>"
+        f"</head><body>{pages}</body></html>"
+    )
@@ -0,0 +1,78 @@
+import random
+from datetime import date, datetime, timedelta, timezone
+from time import perf_counter
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from logbook.api.views import record_breadcrumbs
+from logbook.models import TripDetail
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Posts batches of synthetic GPS positions to the breadcrumb ingestion view inside a rolled back "
+        "transaction and reports the sustained points per second of one worker"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batches", type=int, default=50, help="Number of requests sent")
+        parser.add_argument("--batch-size", type=int, default=500, help="Positions per request")
+        parser.add_argument(
+            "--resent", type=float, default=0.1, help="Share of each batch resent from the previous one"
+        )
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        rng = random.Random(0)
+        recorded_at = datetime(2025, 1, 1, 6, tzinfo=timezone.utc)
+        lat, lng = 34.05, -118.24
+
+        with transaction.atomic():
+            driver = User.objects.create(email=f"benchmark-{uuid4().hex[:8]}@example.com", is_driver=True)
+            location = {"name": "Los Angeles", "coords": {"lat": lat, "lng": lng}}
+            TripDetail.objects.create(
+                current_location=location,
+                pickup_location=location,
+                dropoff_location=location,
+                cycle_used="0",
+                trip_start_date=date(2025, 1, 1),
+                is_current=True,
+                driver=driver,
+            )
+
+            previous_points = []
+            received = recorded = 0
+            seconds = 0.0
+            for _ in range(options["batches"]):
+                points = previous_points[len(previous_points) - int(len(previous_points) * options["resent"]) :]
+                while len(points) < options["batch_size"]:
+                    recorded_at += timedelta(seconds=1)
+                    lat += rng.uniform(-0.0001, 0.0003)
+                    lng += rng.uniform(-0.0001, 0.0003)
+                    points.append(
+                        {"lat": lat, "lng": lng, "recordedAt": recorded_at.isoformat(), "accuracy": 5, "speed": 25}
+                    )
+                previous_points = points
+
+                request = factory.post("/api/v1/logbook/record-breadcrumbs/", {"points": points}, format="json")
+                force_authenticate(request, user=driver)
+                started = perf_counter()
+                response = record_breadcrumbs(request)
+                seconds += perf_counter() - started
+                if response.status_code != 201:
+                    raise CommandError(f"Ingestion failed: {response.data}")
+                received += response.data["received"]
+                recorded += response.data["recorded"]
+
+            # Never keep the synthetic positions
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{options['batches']} requests of {options['batch_size']} positions")
+        self.stdout.write(f"received {received}, recorded {recorded}, dropped {received - recorded} resent positions")
+        self.stdout.write(
+            f"{seconds * 1000 / options['batches']:.1f} ms per request, {received / seconds:,.0f} positions per second"
+        )
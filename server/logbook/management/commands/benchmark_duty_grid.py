@@ -0,0 +1,63 @@
+import random
+from datetime import date, timedelta
+from timeit import timeit
+
+from django.core.management.base import BaseCommand
+
+from logbook.api.serializers import LogbookDetailViewSerializer
+from logbook.duty import get_day_bounds
+from logbook.duty_grid import DUTY_STATUS_ROWS, build_duty_grids, encode_duty_grid
+from logbook.models import LogbookItem
+
+
+class Command(BaseCommand):
+    help = "Compares the per-minute duty grid builder against the hourly log sheet loop on synthetic logbook days"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=365, help="Number of logbook days to build")
+        parser.add_argument("--items-per-day", type=int, default=12, help="Number of logbook items per day")
+        parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs of each builder")
+
+    def handle(self, *args, **options):
+        days, logbook_items = self.make_synthetic_days(options["days"], options["items_per_day"])
+        items_by_day = {day: [] for day in days}
+        for day, logbook_item in logbook_items:
+            items_by_day[day].append(logbook_item)
+        item_rows = [
+            (day, logbook_item.item_type, logbook_item.start_time, logbook_item.end_time)
+            for day, logbook_item in logbook_items
+        ]
+        serializer = LogbookDetailViewSerializer()
+
+        def hourly_loop():
+            for day in days:
+                serializer.get_logbook_items(items_by_day[day])
+
+        def duty_grid():
+            for grid_row in build_duty_grids(days, item_rows):
+                encode_duty_grid(grid_row)
+
+        hourly_seconds = timeit(hourly_loop, number=options["repeat"]) / options["repeat"]
+        grid_seconds = timeit(duty_grid, number=options["repeat"]) / options["repeat"]
+
+        self.stdout.write(f"{len(days)} days, {len(logbook_items)} items")
+        self.stdout.write(f"hourly loop: {hourly_seconds * 1000:.1f} ms per run")
+        self.stdout.write(f"duty grid:   {grid_seconds * 1000:.1f} ms per run")
+
+    def make_synthetic_days(self, number_of_days, items_per_day):
+        """Splits each day into `items_per_day` back to back items of random type and length."""
+        rng = random.Random(0)
+        item_types = list(DUTY_STATUS_ROWS)
+        first_day = date(2025, 1, 1)
+        days = [first_day + timedelta(days=offset) for offset in range(number_of_days)]
+
+        logbook_items = []
+        for day in days:
+            day_start, day_end = get_day_bounds(day)
+            cut_points = sorted(rng.sample(range(1, 24 * 3600), items_per_day - 1))
+            boundaries = [day_start] + [day_start + timedelta(seconds=second) for second in cut_points] + [day_end]
+            for start_time, end_time in zip(boundaries, boundaries[1:]):
+                logbook_item = LogbookItem(item_type=rng.choice(item_types), start_time=start_time, end_time=end_time)
+                logbook_items.append((day, logbook_item))
+
+        return days, logbook_items
@@ -0,0 +1,128 @@
+import tracemalloc
+from datetime import date, timedelta
+from time import perf_counter
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from logbook.duty import get_day_bounds
+from logbook.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, stream_carrier_logbook_items
+from logbook.models import Carrier, DriverLogbook, LogbookItem, Truck
+from users.models import User
+
+# Logbook items written per driver day, and the day the seeded logbooks start on
+ITEMS_PER_DAY = 12
+FIRST_DAY = date(2025, 1, 1)
+
+# Tables analyzed after seeding
+SEEDED_MODELS = (User, Truck, DriverLogbook, LogbookItem)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a carrier's logbook items inside a rolled back transaction and measures the throughput and "
+        "peak memory of exporting them from the database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Number of seeded logbook items")
+        parser.add_argument("--drivers", type=int, default=1000, help="Drivers the items are spread over")
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson", dest="export_format")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Rows fetched per cursor read")
+        parser.add_argument("--trace-memory", action="store_true", help="Also report peak memory of a second run")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = perf_counter()
+            carrier, last_day = self.seed_logbook_items(options["rows"], options["drivers"])
+            self.stdout.write(f"Seeded {options['rows']} logbook items in {perf_counter() - started:.1f} s")
+            # Plan the export from the seeded row counts, as autovacuum would have on a live database
+            with connection.cursor() as cursor:
+                for model in SEEDED_MODELS:
+                    cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+            started = perf_counter()
+            rows_written, bytes_written = self.run_export(carrier, last_day, options)
+            elapsed = perf_counter() - started
+
+            self.stdout.write(f"{rows_written} rows, {bytes_written / 1_000_000:.1f} MB of {options['export_format']}")
+            self.stdout.write(f"{elapsed:.2f} s, {rows_written / elapsed:,.0f} rows/s")
+
+            if options["trace_memory"]:
+                # Traced separately, tracemalloc slows the export down too much to time it in the same run
+                tracemalloc.start()
+                self.run_export(carrier, last_day, options)
+                _, peak_memory = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.stdout.write(f"peak traced memory: {peak_memory / 1_000_000:.2f} MB")
+
+            # Never keep the seeded logbooks
+            transaction.set_rollback(True)
+
+    def run_export(self, carrier, last_day, options):
+        """Exports the seeded items the way the export view does, returns the number of rows and bytes written."""
+        chunks = stream_carrier_logbook_items(
+            carrier.id, FIRST_DAY, last_day, options["export_format"], options["chunk_size"]
+        )
+        rows_written = bytes_written = 0
+        for chunk in chunks:
+            rows_written += chunk.count("\n")
+            bytes_written += len(chunk)
+        if options["export_format"] == "csv":
+            rows_written -= 1  # Header line
+        return rows_written, bytes_written
+
+    def seed_logbook_items(self, number_of_rows, number_of_drivers):
+        """
+        Bulk inserts a carrier with drivers, trucks, logbook days and ITEMS_PER_DAY items per day.
+
+        Returns:
+            tuple: The carrier and the last seeded logbook date.
+        """
+        run = uuid4().hex[:8]  # Keeps unique emails and truck numbers apart from existing rows
+        carrier = Carrier.objects.create(name=f"Benchmark {run}")
+        drivers = User.objects.bulk_create(
+            User(
+                email=f"driver-{run}-{index}@example.com",
+                carrier=carrier,
+                is_driver=True,
+                driver_number=f"DRV-{index:04d}",
+                first_name="Jane",
+                last_name="Doe",
+            )
+            for index in range(number_of_drivers)
+        )
+        trucks = Truck.objects.bulk_create(
+            Truck(truck_number=f"TRK-{run}-{index}", trailer_number=f"TRL-{run}-{index}", carrier=carrier)
+            for index in range(number_of_drivers)
+        )
+
+        number_of_days = -(-number_of_rows // (ITEMS_PER_DAY * number_of_drivers))
+        logbooks = DriverLogbook.objects.bulk_create(
+            (
+                DriverLogbook(driver=driver, truck=truck, logbook_date=FIRST_DAY + timedelta(days=day))
+                for day in range(number_of_days)
+                for driver, truck in zip(drivers, trucks)
+            ),
+            batch_size=5000,
+        )
+
+        LogbookItem.objects.bulk_create(
+            (self.make_logbook_item(logbooks[row_id // ITEMS_PER_DAY], row_id) for row_id in range(number_of_rows)),
+            batch_size=5000,
+        )
+
+        return carrier, FIRST_DAY + timedelta(days=number_of_days - 1)
+
+    def make_logbook_item(self, logbook, row_id):
+        """Returns the closed item filling the (row_id % ITEMS_PER_DAY)th slot of a logbook day."""
+        day_start, _ = get_day_bounds(logbook.logbook_date)
+        item_duration = timedelta(days=1) / ITEMS_PER_DAY
+        slot = row_id % ITEMS_PER_DAY
+        return LogbookItem(
+            driver_logbook=logbook,
+            item_type=("off-duty", "sleeper-berth", "driving", "on-duty-not-driving")[row_id % 4],
+            start_time=day_start + slot * item_duration,
+            end_time=day_start + (slot + 1) * item_duration,
+        )
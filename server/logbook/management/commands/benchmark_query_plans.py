@@ -0,0 +1,223 @@
+import re
+from datetime import date, timedelta
+from time import perf_counter
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+
+from logbook.duty import get_day_bounds
+from logbook.models import Carrier, DriverLogbook, LogbookItem, StopRest, TripDetail, Truck
+from users.models import User
+
+# Plan nodes that read through an index
+INDEX_SCAN_PATTERN = re.compile(r"(?:Index Scan|Index Only Scan|Bitmap Index Scan)(?: Backward)? (?:using|on) (\w+)")
+
+# Tables analyzed after seeding, so the planner works from the seeded row counts
+SEEDED_MODELS = (User, Carrier, Truck, TripDetail, StopRest, DriverLogbook, LogbookItem)
+
+# Smallest fleet checked, below it the trucks and drivers tables are a few pages and each carrier a large share
+# of them, so the planner rightly reads a carrier's trucks and drivers with a sequential scan
+MIN_CARRIERS = 20
+MIN_DRIVERS = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a synthetic fleet inside a rolled back transaction and checks with EXPLAIN that each hot "
+        "endpoint query reads through the index meant for it (PostgreSQL only)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--carriers", type=int, default=20, help="Number of carriers")
+        parser.add_argument("--drivers-per-carrier", type=int, default=50, help="Drivers (and trucks) per carrier")
+        parser.add_argument("--trips-per-driver", type=int, default=40, help="Trips per driver")
+        parser.add_argument("--days-per-driver", type=int, default=60, help="Logbook days per driver")
+        parser.add_argument("--items-per-day", type=int, default=8, help="Logbook items per logbook day")
+        parser.add_argument("--stops-per-trip", type=int, default=5, help="Stops recorded per trip")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Query plans can only be checked on PostgreSQL")
+        if options["carriers"] < MIN_CARRIERS or options["carriers"] * options["drivers_per_carrier"] < MIN_DRIVERS:
+            raise CommandError(
+                f"Query plans are only checked with at least {MIN_CARRIERS} carriers and {MIN_DRIVERS} drivers"
+            )
+
+        failures = []
+        with transaction.atomic():
+            started = perf_counter()
+            carrier, driver, trip, logbook = self.seed_fleet(options)
+            self.stdout.write(f"Seeded the fleet in {perf_counter() - started:.1f} s")
+
+            with connection.cursor() as cursor:
+                for model in SEEDED_MODELS:
+                    cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+            for name, expected_index, queryset in self.get_hot_queries(carrier, driver, trip, logbook):
+                plan = queryset.explain()
+                index_names = list(dict.fromkeys(INDEX_SCAN_PATTERN.findall(plan)))
+                if expected_index in index_names:
+                    self.stdout.write(f"{name}: index scan using {', '.join(index_names)}")
+                else:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f"{name}: {expected_index} is not used\n{plan}"))
+
+            # Never keep the synthetic fleet
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot queries do not use their index: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("Every hot query uses its index"))
+
+    def get_hot_queries(self, carrier, driver, trip, logbook):
+        """Returns (name, expected index, queryset) of the queries behind the most frequently called endpoints."""
+        return (
+            (
+                "get_current_trip: current trip",
+                "trip_driver_current_idx",
+                TripDetail.objects.filter(is_current=True, driver=driver).order_by("-trip_start_date")[:1],
+            ),
+            (
+                "get_current_trip: current logbook item",
+                "item_current_idx",
+                LogbookItem.objects.filter(driver_logbook__driver=driver, is_current=True).order_by("-start_time")[:1],
+            ),
+            (
+                "carrier_get_trips: first page",
+                "trip_carrier_start_date_idx",
+                TripDetail.objects.filter(carrier=carrier)
+                .select_related("driver", "truck")
+                .order_by(F("trip_start_date").desc(nulls_first=True), "-id")[:51],
+            ),
+            (
+                "get_logbook_detail: logbook items",
+                "item_logbook_start_time_idx",
+                LogbookItem.objects.filter(driver_logbook=logbook).order_by("start_time"),
+            ),
+            (
+                "get_trip_route: trip stops",
+                "stoprest_trip_start_time_idx",
+                StopRest.objects.filter(trip_detail=trip).order_by("start_time"),
+            ),
+            (
+                "get_available_carrier_drivers: available trucks",
+                "truck_carrier_assigned_idx",
+                Truck.objects.filter(carrier=carrier, truck_assigned=False),
+            ),
+            (
+                "get_available_carrier_drivers: available drivers",
+                "user_carrier_driver_idx",
+                User.objects.filter(carrier=carrier, is_driver=True, driver_assigned=False),
+            ),
+        )
+
+    def seed_fleet(self, options):
+        """
+        Bulk inserts the synthetic carriers, drivers, trucks, trips, stops, logbooks and items.
+
+        Returns:
+            tuple: A carrier, one of its drivers, one of that driver's trips and one of their logbooks.
+        """
+        run = uuid4().hex[:8]  # Keeps unique emails and truck numbers apart from existing rows
+        location = {"name": "Nairobi", "lat": -1.29, "lng": 36.82}
+        first_day = date(2025, 1, 1)
+
+        carriers = Carrier.objects.bulk_create(
+            Carrier(name=f"Benchmark {run} {index}") for index in range(options["carriers"])
+        )
+        drivers = User.objects.bulk_create(
+            (
+                User(
+                    email=f"driver-{run}-{carrier.id}-{index}@example.com",
+                    carrier=carrier,
+                    is_driver=True,
+                    driver_assigned=index % 4 == 0,
+                )
+                for carrier in carriers
+                for index in range(options["drivers_per_carrier"])
+            ),
+            batch_size=5000,
+        )
+        trucks = Truck.objects.bulk_create(
+            (
+                Truck(
+                    truck_number=f"TRK-{run}-{driver.id}",
+                    trailer_number=f"TRL-{run}-{driver.id}",
+                    carrier=driver.carrier,
+                    truck_assigned=driver.driver_assigned,
+                )
+                for driver in drivers
+            ),
+            batch_size=5000,
+        )
+
+        trips = TripDetail.objects.bulk_create(
+            (
+                TripDetail(
+                    carrier=driver.carrier,
+                    current_location=location,
+                    pickup_location=location,
+                    dropoff_location=location,
+                    cycle_used="10",
+                    trip_start_date=first_day + timedelta(days=index),
+                    is_current=driver.driver_assigned and index == options["trips_per_driver"] - 1,
+                    is_done=index < options["trips_per_driver"] - 1,
+                    driver=driver,
+                    truck=truck,
+                )
+                for driver, truck in zip(drivers, trucks)
+                for index in range(options["trips_per_driver"])
+            ),
+            batch_size=5000,
+        )
+        StopRest.objects.bulk_create(
+            (
+                StopRest(
+                    trip_detail=trip,
+                    stop_location=location,
+                    stop_type="rest",
+                    start_time=get_day_bounds(trip.trip_start_date)[0] + timedelta(hours=2 * index),
+                )
+                for trip in trips
+                for index in range(options["stops_per_trip"])
+            ),
+            batch_size=5000,
+        )
+
+        logbooks = DriverLogbook.objects.bulk_create(
+            (
+                DriverLogbook(driver=driver, truck=truck, logbook_date=first_day + timedelta(days=index))
+                for driver, truck in zip(drivers, trucks)
+                for index in range(options["days_per_driver"])
+            ),
+            batch_size=5000,
+        )
+        last_day = first_day + timedelta(days=options["days_per_driver"] - 1)
+        LogbookItem.objects.bulk_create(
+            (
+                logbook_item
+                for logbook in logbooks
+                for logbook_item in self.make_logbook_items(
+                    logbook, options["items_per_day"], logbook.logbook_date == last_day
+                )
+            ),
+            batch_size=5000,
+        )
+
+        return carriers[0], drivers[0], trips[0], logbooks[0]
+
+    def make_logbook_items(self, logbook, items_per_day, is_last_day):
+        """Splits a logbook day into back to back items, the last item of the driver's last day is left open."""
+        day_start, _ = get_day_bounds(logbook.logbook_date)
+        item_duration = timedelta(days=1) / items_per_day
+        for index in range(items_per_day):
+            is_current = is_last_day and index == items_per_day - 1
+            yield LogbookItem(
+                driver_logbook=logbook,
+                item_type=("off-duty", "driving", "on-duty-not-driving", "sleeper-berth")[index % 4],
+                start_time=day_start + index * item_duration,
+                end_time=None if is_current else day_start + (index + 1) * item_duration,
+                is_current=is_current,
+            )
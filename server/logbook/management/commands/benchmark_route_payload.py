@@ -0,0 +1,62 @@
+import gzip
+import random
+from datetime import datetime, timedelta, timezone
+from timeit import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from logbook.polyline import encode_route_map_data
+
+
+class Command(BaseCommand):
+    help = "Compares the payload size and serialization time of the JSON and polyline route formats on a long trip"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stops", type=int, default=300, help="Number of stops recorded on the trip")
+        parser.add_argument("--route-points", type=int, default=40000, help="Number of points along the route")
+        parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs of each format")
+
+    def handle(self, *args, **options):
+        route_map_data = self.make_synthetic_trip(options["stops"], options["route_points"])
+        renderer = JSONRenderer()
+
+        def render_json():
+            return renderer.render({"message": "success", "route_map_data": route_map_data})
+
+        def render_polyline():
+            return renderer.render({"message": "success", "route_map_data": encode_route_map_data(route_map_data)})
+
+        self.stdout.write(f"{options['stops']} stops, {options['route_points']} route points")
+        for name, render in (("json", render_json), ("polyline", render_polyline)):
+            body = render()
+            seconds = timeit(render, number=options["repeat"]) / options["repeat"]
+            self.stdout.write(
+                f"{name:<9} {len(body) / 1024:8.1f} KiB, {len(gzip.compress(body)) / 1024:7.1f} KiB gzipped, "
+                f"{seconds * 1000:6.1f} ms per response"
+            )
+
+    def make_synthetic_trip(self, number_of_stops, number_of_route_points):
+        """Builds route map data for a trip of small random steps heading roughly north east."""
+        rng = random.Random(0)
+        lat, lng = 34.05, -118.24
+        route = []
+        for _ in range(number_of_route_points):
+            lat += rng.uniform(-0.0005, 0.0015)
+            lng += rng.uniform(-0.0005, 0.0015)
+            route.append([round(lat, 6), round(lng, 6)])
+
+        trip_start = datetime(2025, 1, 1, 6, tzinfo=timezone.utc)
+        stop_step = max(number_of_route_points // max(number_of_stops, 1), 1)
+        trip_stops = [
+            {
+                "start_time": trip_start + timedelta(hours=index),
+                "stop_location": {
+                    "name": f"Stop {index}, Interstate 40, United States",
+                    "coords": {"lat": route[point][0], "lng": route[point][1]},
+                },
+            }
+            for index, point in enumerate(range(0, number_of_route_points, stop_step))
+        ][:number_of_stops]
+
+        return {"id": 1, "trip_stops": trip_stops, "middle_index": len(trip_stops) // 2, "route": route}
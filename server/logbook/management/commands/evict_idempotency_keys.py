@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from logbook.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Deletes the idempotency keys older than IDEMPOTENCY_KEY_TTL, whose responses are no longer replayed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Number of keys deleted per query")
+
+    def handle(self, *args, **options):
+        cutoff = now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        keys_deleted = 0
+        while True:
+            # Oldest keys first through the created_at index, in chunks so no single delete holds locks for long
+            key_ids = list(
+                IdempotencyKey.objects.filter(created_at__lt=cutoff)
+                .order_by("created_at")
+                .values_list("id", flat=True)[: options["chunk_size"]]
+            )
+            if not key_ids:
+                break
+            keys_deleted += IdempotencyKey.objects.filter(id__in=key_ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f"{keys_deleted} expired idempotency keys deleted"))
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from logbook.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, stream_carrier_logbook_items
+
+
+class Command(BaseCommand):
+    help = "Exports every logbook item of a carrier between two logbook dates as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("carrier_id", type=int, help="Carrier whose drivers' logbook items are exported")
+        parser.add_argument("start_date", help="First logbook date, YYYY-MM-DD")
+        parser.add_argument("end_date", help="Last logbook date (inclusive), YYYY-MM-DD")
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson", dest="export_format")
+        parser.add_argument("--output", help="File to write to, defaults to standard output")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Rows fetched per cursor read")
+
+    def handle(self, *args, **options):
+        chunks = stream_carrier_logbook_items(
+            options["carrier_id"],
+            options["start_date"],
+            options["end_date"],
+            options["export_format"],
+            options["chunk_size"],
+        )
+
+        if not options["output"]:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+            return
+
+        with open(options["output"], "w", newline="") as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Logbook items exported to {options['output']}"))
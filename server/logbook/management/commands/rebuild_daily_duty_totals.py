@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from logbook.duty import DAILY_TOTAL_FIELDS, compute_daily_duty_totals
+from logbook.models import DailyDutyTotal, DriverLogbook
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily duty totals rollup from raw logbook items, or verifies it with --verify"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=200, help="Number of drivers processed per chunk")
+        parser.add_argument("--driver", type=int, action="append", dest="driver_ids", help="Only process this driver")
+        parser.add_argument("--verify", action="store_true", help="Report differences without writing anything")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+
+        # Every driver that has at least one logbook
+        drivers = DriverLogbook.objects.filter(driver__isnull=False)
+        if options["driver_ids"]:
+            drivers = drivers.filter(driver__id__in=options["driver_ids"])
+        driver_ids = list(drivers.order_by("driver_id").values_list("driver_id", flat=True).distinct())
+
+        rows_written = 0
+        mismatches = 0
+        for chunk_start in range(0, len(driver_ids), chunk_size):
+            chunk_driver_ids = driver_ids[chunk_start : chunk_start + chunk_size]
+            expected_totals = compute_daily_duty_totals(chunk_driver_ids)
+
+            if options["verify"]:
+                mismatches += self.verify_chunk(chunk_driver_ids, expected_totals)
+                continue
+
+            # Replace the chunk's rollup rows in one transaction so readers never see a partial chunk
+            with transaction.atomic():
+                DailyDutyTotal.objects.filter(driver__id__in=chunk_driver_ids).delete()
+                DailyDutyTotal.objects.bulk_create(expected_totals.values(), batch_size=1000)
+            rows_written += len(expected_totals)
+            self.stdout.write(f"Rebuilt {chunk_start + len(chunk_driver_ids)}/{len(driver_ids)} drivers")
+
+        if options["verify"]:
+            self.stdout.write(f"{mismatches} mismatched daily duty totals found")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{rows_written} daily duty totals rebuilt"))
+
+    def verify_chunk(self, driver_ids, expected_totals):
+        """Compares stored rollup rows with the ones computed from raw items and reports each difference."""
+        stored_totals = {
+            (daily_total.driver_id, daily_total.duty_date): daily_total
+            for daily_total in DailyDutyTotal.objects.filter(driver__id__in=driver_ids)
+        }
+
+        mismatches = 0
+        for key in sorted(expected_totals.keys() | stored_totals.keys()):
+            expected, stored = expected_totals.get(key), stored_totals.get(key)
+            for field in DAILY_TOTAL_FIELDS.values():
+                expected_seconds = getattr(expected, field) if expected else 0
+                stored_seconds = getattr(stored, field) if stored else 0
+                # Allow for sub-second float rounding between incremental updates and the rebuild
+                if abs(expected_seconds - stored_seconds) >= 1:
+                    mismatches += 1
+                    self.stdout.write(
+                        f"driver {key[0]} on {key[1]}: {field} is {stored_seconds}, expected {expected_seconds}"
+                    )
+        return mismatches
@@ -0,0 +1,29 @@
+from datetime import date, timedelta
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+
+from logbook.mileage import set_gps_mileage
+
+
+class Command(BaseCommand):
+    help = "Recomputes the GPS mileage of every driver's logbook for one or more days from the stored positions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date", type=date.fromisoformat, help="Last day to recompute (YYYY-MM-DD), today by default"
+        )
+        parser.add_argument("--days", type=int, default=1, help="Number of days to recompute, ending on --date")
+        parser.add_argument("--driver", type=int, action="append", dest="driver_ids", help="Only process this driver")
+
+    def handle(self, *args, **options):
+        last_day = options["date"] or now().date()
+        for offset in reversed(range(options["days"])):
+            day = last_day - timedelta(days=offset)
+            started = perf_counter()
+            # Replace the day's mileage in one transaction so readers never see a partial fleet
+            with transaction.atomic():
+                logbooks_written = set_gps_mileage(day, options["driver_ids"])
+            self.stdout.write(f"{day}: {logbooks_written} logbooks recomputed in {perf_counter() - started:.2f} s")
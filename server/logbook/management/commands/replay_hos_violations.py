@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from logbook.hours_of_service import replay_driver_logbook_items
+from logbook.models import DriverDutyState, DriverLogbook, HosViolation, LogbookItem
+
+
+class Command(BaseCommand):
+    help = "Replays closed logbook items to rebuild each driver's hours-of-service state and violations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=2000, help="Number of items read from the database at a time"
+        )
+        parser.add_argument("--driver", type=int, action="append", dest="driver_ids", help="Only replay this driver")
+
+    def handle(self, *args, **options):
+        # Every driver that has at least one logbook
+        drivers = DriverLogbook.objects.filter(driver__isnull=False)
+        if options["driver_ids"]:
+            drivers = drivers.filter(driver__id__in=options["driver_ids"])
+        driver_ids = list(drivers.order_by("driver_id").values_list("driver_id", flat=True).distinct())
+
+        violations_written = 0
+        for index, driver_id in enumerate(driver_ids, start=1):
+            logbook_items = (
+                LogbookItem.objects.filter(driver_logbook__driver__id=driver_id, end_time__isnull=False)
+                .select_related("driver_logbook")
+                .order_by("start_time", "id")
+                .iterator(chunk_size=options["chunk_size"])
+            )
+
+            # Replace the driver's state and violations in one transaction so readers never see them half rebuilt
+            with transaction.atomic():
+                state, violations = replay_driver_logbook_items(driver_id, logbook_items)
+                HosViolation.objects.filter(driver__id=driver_id).delete()
+                DriverDutyState.objects.filter(driver__id=driver_id).delete()
+                state.save()
+                HosViolation.objects.bulk_create(violations, batch_size=1000)
+            violations_written += len(violations)
+            self.stdout.write(f"Replayed {index}/{len(driver_ids)} drivers")
+
+        self.stdout.write(self.style.SUCCESS(f"{violations_written} hours-of-service violations recorded"))
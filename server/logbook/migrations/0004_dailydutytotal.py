@@ -0,0 +1,31 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('logbook', '0003_driverlogbook_truck'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyDutyTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duty_date', models.DateField()),
+                ('off_duty_seconds', models.FloatField(default=0)),
+                ('sleeper_berth_seconds', models.FloatField(default=0)),
+                ('driving_seconds', models.FloatField(default=0)),
+                ('on_duty_not_driving_seconds', models.FloatField(default=0)),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('driver', 'duty_date')},
+            },
+        ),
+    ]
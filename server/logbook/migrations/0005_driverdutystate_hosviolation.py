@@ -0,0 +1,91 @@
+# Generated by Django 4.2.20 on 2026-10-18 10:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("logbook", "0004_dailydutytotal"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DriverDutyState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shift_start", models.DateTimeField(blank=True, null=True)),
+                ("last_on_duty_end", models.DateTimeField(blank=True, null=True)),
+                ("last_driving_end", models.DateTimeField(blank=True, null=True)),
+                ("shift_driving_seconds", models.FloatField(default=0)),
+                ("driving_since_break_seconds", models.FloatField(default=0)),
+                ("processed_until", models.DateTimeField(blank=True, null=True)),
+                (
+                    "driver",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="duty_state",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="HosViolation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "rule",
+                    models.CharField(
+                        choices=[
+                            ("driving-limit", "11 Hour Driving Limit"),
+                            ("duty-window", "14 Hour Duty Window"),
+                            ("rest-break", "30 Minute Break"),
+                            ("cycle-limit", "70 Hour / 8 Day Limit"),
+                        ],
+                        max_length=100,
+                    ),
+                ),
+                ("shift_start", models.DateTimeField()),
+                ("occurred_at", models.DateTimeField()),
+                (
+                    "driver",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "logbook_item",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="logbook.logbookitem",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("driver", "rule", "shift_start")},
+            },
+        ),
+    ]
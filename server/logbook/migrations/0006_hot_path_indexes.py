@@ -0,0 +1,55 @@
+# Generated by Django 4.2.20 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logbook", "0005_driverdutystate_hosviolation"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="logbookitem",
+            index=models.Index(
+                fields=["driver_logbook", "start_time"],
+                name="item_logbook_start_time_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="logbookitem",
+            index=models.Index(
+                condition=models.Q(("is_current", True)),
+                fields=["driver_logbook"],
+                name="item_current_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stoprest",
+            index=models.Index(
+                fields=["trip_detail", "start_time"],
+                name="stoprest_trip_start_time_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tripdetail",
+            index=models.Index(
+                fields=["driver", "is_current", "trip_start_date"],
+                name="trip_driver_current_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tripdetail",
+            index=models.Index(
+                fields=["carrier", "-trip_start_date", "-id"],
+                name="trip_carrier_start_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="truck",
+            index=models.Index(
+                fields=["carrier", "truck_assigned"], name="truck_carrier_assigned_idx"
+            ),
+        ),
+    ]
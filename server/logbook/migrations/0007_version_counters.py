@@ -0,0 +1,23 @@
+# Generated by Django 4.2.20 on 2026-10-18 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logbook", "0006_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="driverlogbook",
+            name="version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="tripdetail",
+            name="version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
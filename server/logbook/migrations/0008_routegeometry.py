@@ -0,0 +1,53 @@
+# Generated by Django 4.2.20 on 2026-10-18 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logbook", "0007_version_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RouteGeometry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "route_kind",
+                    models.CharField(
+                        choices=[
+                            ("planned", "Planned Route"),
+                            ("actual", "Actual Route"),
+                        ],
+                        max_length=100,
+                    ),
+                ),
+                ("stop_set_hash", models.CharField(max_length=64)),
+                ("provider", models.CharField(max_length=100)),
+                ("coordinates", models.JSONField()),
+                ("distance_meters", models.FloatField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "trip_detail",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="logbook.tripdetail",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("trip_detail", "stop_set_hash")},
+            },
+        ),
+    ]
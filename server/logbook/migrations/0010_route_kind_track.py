@@ -0,0 +1,25 @@
+# Generated by Django 4.2.20 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logbook", "0009_breadcrumb"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="routegeometry",
+            name="route_kind",
+            field=models.CharField(
+                choices=[
+                    ("planned", "Planned Route"),
+                    ("actual", "Actual Route"),
+                    ("track", "GPS Track"),
+                ],
+                max_length=100,
+            ),
+        ),
+    ]
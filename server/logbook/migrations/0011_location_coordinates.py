@@ -0,0 +1,95 @@
+# Generated by Django 4.2.20 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logbook", "0010_route_kind_track"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="stoprest",
+            name="grid_cell",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="stoprest",
+            name="latitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="stoprest",
+            name="longitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="tripdetail",
+            name="current_grid_cell",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="tripdetail",
+            name="current_latitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="tripdetail",
+            name="current_longitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="tripdetail",
+            name="dropoff_grid_cell",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="tripdetail",
+            name="dropoff_latitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="tripdetail",
+            name="dropoff_longitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="tripdetail",
+            name="pickup_grid_cell",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="tripdetail",
+            name="pickup_latitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="tripdetail",
+            name="pickup_longitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="stoprest",
+            index=models.Index(fields=["grid_cell"], name="stoprest_grid_cell_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="tripdetail",
+            index=models.Index(
+                fields=["current_grid_cell"], name="trip_current_cell_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tripdetail",
+            index=models.Index(
+                fields=["pickup_grid_cell"], name="trip_pickup_cell_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tripdetail",
+            index=models.Index(
+                fields=["dropoff_grid_cell"], name="trip_dropoff_cell_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.20 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logbook", "0011_location_coordinates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="driverlogbook",
+            name="gps_miles_driven",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="breadcrumb",
+            index=models.Index(
+                fields=["driver", "recorded_at"], name="breadcrumb_driver_time_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.20 on 2026-10-18 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logbook", "0012_gps_mileage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlaceName",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("lat_key", models.IntegerField()),
+                ("lng_key", models.IntegerField()),
+                ("name", models.CharField(max_length=500)),
+                ("provider", models.CharField(max_length=100)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "unique_together": {("lat_key", "lng_key")},
+            },
+        ),
+    ]
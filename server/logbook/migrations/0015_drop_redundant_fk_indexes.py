@@ -0,0 +1,80 @@
+# Generated by Django 4.2.20 on 2026-10-18 11:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("logbook", "0014_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="breadcrumb",
+            name="driver",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="logbookitem",
+            name="driver_logbook",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="logbook.driverlogbook",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="stoprest",
+            name="trip_detail",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="logbook.tripdetail",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tripdetail",
+            name="carrier",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="logbook.carrier",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tripdetail",
+            name="driver",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="truck",
+            name="carrier",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="logbook.carrier",
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+from logbook.proximity import get_grid_cell, get_location_coords
+
+# Rows updated per chunk
+BACKFILL_CHUNK_SIZE = 2000
+
+# Location JSON field and coordinate column prefix of each model
+LOCATION_FIELDS = {
+    "TripDetail": [
+        (f"{location_type}_location", f"{location_type}_") for location_type in ("current", "pickup", "dropoff")
+    ],
+    "StopRest": [("stop_location", "")],
+}
+
+
+def backfill_location_coordinates(apps, schema_editor, chunk_size=BACKFILL_CHUNK_SIZE):
+    """Copies the coordinates of trip and stop locations saved before the columns existed into their columns."""
+    for model_name, location_fields in LOCATION_FIELDS.items():
+        model = apps.get_model("logbook", model_name)
+        columns = [
+            f"{prefix}{field}" for _, prefix in location_fields for field in ("latitude", "longitude", "grid_cell")
+        ]
+        last_id = 0
+        while True:
+            # Walk the table by id so each chunk is one index range scan however far in it is
+            rows = list(model.objects.filter(id__gt=last_id).order_by("id")[:chunk_size])
+            if not rows:
+                break
+            for row in rows:
+                # Historical models have no save() override, so the columns are set as the models' save() does
+                for location_field, prefix in location_fields:
+                    lat, lng = get_location_coords(getattr(row, location_field))
+                    setattr(row, f"{prefix}latitude", lat)
+                    setattr(row, f"{prefix}longitude", lng)
+                    setattr(row, f"{prefix}grid_cell", get_grid_cell(lat, lng))
+            model.objects.bulk_update(rows, columns)
+            last_id = rows[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logbook", "0015_drop_redundant_fk_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_location_coordinates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-18 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logbook", "0016_backfill_location_coordinates"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="breadcrumb",
+            index=models.Index(fields=["recorded_at"], name="breadcrumb_time_idx"),
+        ),
+    ]
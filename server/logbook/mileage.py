@@ -0,0 +1,210 @@
+from datetime import timedelta, timezone
+
+import numpy as np
+from django.db.models import F
+
+from core.utils import get_or_create_driver_logbook
+from logbook.duty import get_utc_day_bounds
+from logbook.models import Breadcrumb, DriverLogbook, TripDetail
+from logbook.proximity import EARTH_RADIUS_METERS, haversine_distance
+
+METERS_PER_MILE = 1609.344
+
+# Smallest move counted towards GPS mileage. A position closer than this, or than its own reported accuracy, to the
+# last counted position is taken for GPS jitter around the same spot, e.g. while parked
+MIN_MOVE_METERS = 10
+
+
+def get_segment_distances(lats, lngs):
+    """
+    Returns the great-circle distance in meters between each pair of consecutive points.
+
+    Args:
+        lats (numpy.ndarray): Latitudes in degrees, in track order.
+        lngs (numpy.ndarray): Longitudes in degrees, in track order.
+
+    Returns:
+        numpy.ndarray: len(lats) - 1 distances.
+    """
+    lats, lngs = np.radians(lats), np.radians(lngs)
+    a = np.sin(np.diff(lats) / 2) ** 2 + np.cos(lats[:-1]) * np.cos(lats[1:]) * np.sin(np.diff(lngs) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(a))
+
+
+def get_logbook_date(time):
+    """Returns the logbook day an aware datetime falls on, the UTC date like every logbook written to."""
+    return time.astimezone(timezone.utc).date()
+
+
+def get_day_indexes(times):
+    """
+    Returns the logbook days (UTC dates) spanned by a list of aware datetimes and the day index of each one.
+
+    Returns:
+        tuple: (list of days, numpy.ndarray of indexes into that list).
+    """
+    first_day, last_day = get_logbook_date(min(times)), get_logbook_date(max(times))
+    days = [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+    day_starts = np.array([get_utc_day_bounds(day)[0].timestamp() for day in days])
+    timestamps = np.fromiter((time.timestamp() for time in times), dtype=np.float64, count=len(times))
+    return days, np.searchsorted(day_starts, timestamps, side="right") - 1
+
+
+def drop_jitter(track_keys, lats, lngs, accuracies):
+    """
+    Leaves out the positions that did not move away from the last kept position of their track.
+
+    A position is kept when it is at least MIN_MOVE_METERS, and at least its own accuracy, away from the
+    previous kept one, so the distance covered is measured between kept positions and jitter around a
+    parked truck adds nothing. The first position of each track is always kept.
+
+    Args:
+        track_keys (list): Track of each point, each track's points contiguous and in recorded order.
+        lats (list): Latitudes of the points.
+        lngs (list): Longitudes of the points.
+        accuracies (list): Reported accuracy of each point in meters, or None.
+
+    Returns:
+        tuple: (track_keys, lats, lngs) of the kept points.
+    """
+    kept = ([], [], [])
+    previous = None  # (track, lat, lng) of the last kept point
+    for track_key, lat, lng, accuracy in zip(track_keys, lats, lngs, accuracies):
+        if previous and previous[0] == track_key:
+            if haversine_distance(previous[1:], (lat, lng)) < max(MIN_MOVE_METERS, accuracy or 0):
+                continue
+        previous = (track_key, lat, lng)
+        for values, value in zip(kept, previous):
+            values.append(value)
+    return kept
+
+
+def get_track_distances(track_keys, lats, lngs):
+    """
+    Sums the distance covered along each track.
+
+    Args:
+        track_keys (list): Track of each point (e.g. driver id, or day index), each track's points contiguous
+            and in recorded order. Segments joining two tracks are not counted.
+        lats (list): Latitudes of the points.
+        lngs (list): Longitudes of the points.
+
+    Returns:
+        dict: Meters covered keyed by track, for each track with at least one segment.
+    """
+    if len(track_keys) < 2:
+        return {}
+
+    distances = get_segment_distances(np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64))
+    tracks, track_indexes = np.unique(np.asarray(track_keys), return_inverse=True)
+    counted = track_indexes[1:] == track_indexes[:-1]
+    # Every segment is added to the track of its end point
+    segment_tracks = track_indexes[1:][counted]
+    track_meters = np.bincount(segment_tracks, weights=distances[counted], minlength=len(tracks))
+    return {tracks[index].item(): float(track_meters[index]) for index in np.unique(segment_tracks).tolist()}
+
+
+def get_latest_breadcrumb(driver):
+    """Returns the (recorded_at, latitude, longitude, accuracy) of the driver's latest stored position, or None."""
+    return (
+        Breadcrumb.objects.filter(driver=driver)
+        .order_by("-recorded_at")
+        .values_list("recorded_at", "latitude", "longitude", "accuracy")
+        .first()
+    )
+
+
+def add_breadcrumbs_mileage(driver, new_breadcrumbs, latest_breadcrumb):
+    """
+    Adds the distance covered by newly stored positions to the driver's logbooks.
+
+    Positions normally arrive in order, after the latest stored one, so only the segments from that
+    position through the new ones are measured and added to the running totals. When positions
+    arrive out of order, the days they fall on are recomputed instead. The GPS mileage is not part
+    of the logbook detail or the log sheet, so the logbook's version is left alone.
+
+    Args:
+        driver (User): The driver who sent the positions.
+        new_breadcrumbs (list): The Breadcrumb objects just stored, in recorded order.
+        latest_breadcrumb (tuple): The driver's latest position stored before them, from get_latest_breadcrumb.
+    """
+    if not new_breadcrumbs:
+        return
+
+    if latest_breadcrumb and latest_breadcrumb[0] > new_breadcrumbs[0].recorded_at:
+        days = {get_logbook_date(breadcrumb.recorded_at) for breadcrumb in new_breadcrumbs}
+        for day in sorted(days):
+            set_gps_mileage(day, [driver.id])
+        return
+
+    points = [
+        (breadcrumb.recorded_at, breadcrumb.latitude, breadcrumb.longitude, breadcrumb.accuracy)
+        for breadcrumb in new_breadcrumbs
+    ]
+    if latest_breadcrumb:
+        points.insert(0, latest_breadcrumb)
+
+    # Each day is its own track, so a segment across midnight counts on neither day
+    times, lats, lngs, accuracies = zip(*points)
+    days, day_indexes = get_day_indexes(times)
+    for day_index, meters in get_track_distances(*drop_jitter(day_indexes.tolist(), lats, lngs, accuracies)).items():
+        miles_update = {"gps_miles_driven": F("gps_miles_driven") + meters / METERS_PER_MILE}
+        # The day's logbook almost always exists already, it is only created for the first positions of a day
+        if not DriverLogbook.objects.filter(driver=driver, logbook_date=days[day_index]).update(**miles_update):
+            driver_logbook = get_or_create_driver_logbook(driver, days[day_index])
+            DriverLogbook.objects.filter(id=driver_logbook.id).update(**miles_update)
+
+
+def set_gps_mileage(day, driver_ids=None):
+    """
+    Recomputes the GPS mileage of every driver's logbook for a day from all their positions of that day.
+
+    Missing logbooks are created as get_or_create_driver_logbooks does, in one bulk insert with the
+    truck of the driver's current trip, skipping any a concurrent request created in the meantime,
+    and read back. As for the running totals, the logbooks' versions are left alone.
+
+    Args:
+        day (date): The logbook day.
+        driver_ids (list): Only recompute these drivers, every driver with a logbook or positions that day if None.
+
+    Returns:
+        int: The number of logbooks written.
+    """
+    day_start, day_end = get_utc_day_bounds(day)
+    breadcrumbs = Breadcrumb.objects.filter(recorded_at__gte=day_start, recorded_at__lt=day_end)
+    driver_logbooks = DriverLogbook.objects.filter(logbook_date=day)
+    if driver_ids is not None:
+        breadcrumbs = breadcrumbs.filter(driver__id__in=driver_ids)
+        driver_logbooks = driver_logbooks.filter(driver__id__in=driver_ids)
+
+    # Only coordinates are read, every position already lies on the day
+    rows = list(
+        breadcrumbs.order_by("driver_id", "recorded_at").values_list("driver_id", "latitude", "longitude", "accuracy")
+    )
+    driver_meters = get_track_distances(*drop_jitter(*zip(*rows))) if rows else {}
+
+    driver_logbooks = {driver_logbook.driver_id: driver_logbook for driver_logbook in driver_logbooks}
+    missing_driver_ids = driver_meters.keys() - driver_logbooks.keys()
+    if missing_driver_ids:
+        truck_ids = {}
+        for driver_id, truck_id in (
+            TripDetail.objects.filter(is_current=True, driver__id__in=missing_driver_ids)
+            .order_by("driver_id", "-trip_start_date")
+            .values_list("driver_id", "truck_id")
+        ):
+            truck_ids.setdefault(driver_id, truck_id)
+        DriverLogbook.objects.bulk_create(
+            [
+                DriverLogbook(driver_id=driver_id, logbook_date=day, truck_id=truck_ids.get(driver_id))
+                for driver_id in missing_driver_ids
+            ],
+            ignore_conflicts=True,
+        )
+        for driver_logbook in DriverLogbook.objects.filter(logbook_date=day, driver__id__in=missing_driver_ids):
+            driver_logbooks[driver_logbook.driver_id] = driver_logbook
+
+    for driver_id, driver_logbook in driver_logbooks.items():
+        driver_logbook.gps_miles_driven = driver_meters.get(driver_id, 0) / METERS_PER_MILE
+    DriverLogbook.objects.bulk_update(driver_logbooks.values(), ["gps_miles_driven"], batch_size=1000)
+
+    return len(driver_logbooks)
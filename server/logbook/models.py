@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import (
     Model,
     JSONField,
@@ -9,9 +10,15 @@ from django.db.models import (
     DateField,
     BooleanField,
     FloatField,
+    OneToOneField,
+    PositiveIntegerField,
+    IntegerField,
+    Index,
+    Q,
 )
 
-from logbook.choices import logbook_item_types
+from logbook.choices import logbook_item_types, hos_violation_rules, route_kinds
+from logbook.proximity import get_grid_cell, get_location_coords
 from users.models import User
 
 
@@ -33,15 +40,23 @@ class Truck(Model):
     # Trailer's unique number, case-insensitive
     trailer_number = CharField(max_length=100, unique=True, db_collation="case_insensitive")
     # Carrier associated with this truck, cannot delete carrier if truck is in use
-    carrier = ForeignKey(Carrier, on_delete=PROTECT, null=True, blank=True)
+    # (indexed by truck_carrier_assigned_idx, which starts with it)
+    carrier = ForeignKey(Carrier, on_delete=PROTECT, null=True, blank=True, db_index=False)
     # Indicates if the truck is currently assigned
     truck_assigned = BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Available trucks of a carrier
+            Index(fields=["carrier", "truck_assigned"], name="truck_carrier_assigned_idx"),
+        ]
+
 
 # TripDetail model: Contains details about a specific trip for a carrier
 class TripDetail(Model):
     # Carrier associated with this trip detail, cannot delete carrier if trip is in progress
-    carrier = ForeignKey(Carrier, on_delete=PROTECT, null=True, blank=True)
+    # (indexed by trip_carrier_start_date_idx, which starts with it)
+    carrier = ForeignKey(Carrier, on_delete=PROTECT, null=True, blank=True, db_index=False)
     # Current location during the trip, stored as JSON (e.g., lat, long)
     current_location = JSONField()
     # Pickup location during the trip, stored as JSON (e.g., lat, long)
@@ -58,10 +73,51 @@ class TripDetail(Model):
     is_current = BooleanField(default=False)
     # Boolean to mark if the trip is completed
     is_done = BooleanField(default=False)
-    # Driver associated with this trip, can be null
-    driver = ForeignKey(User, on_delete=PROTECT, null=True, blank=True)
+    # Driver associated with this trip, can be null (indexed by trip_driver_current_idx, which starts with it)
+    driver = ForeignKey(User, on_delete=PROTECT, null=True, blank=True, db_index=False)
     # Truck assigned to this trip, can be null
     truck = ForeignKey(Truck, on_delete=PROTECT, null=True, blank=True)
+    # Bumped by every write to the trip or its stops, read views use it as their ETag
+    version = PositiveIntegerField(default=1)
+    # Coordinates and grid cell of each location, copied from the location JSON on save for proximity search
+    current_latitude = FloatField(null=True, blank=True)
+    current_longitude = FloatField(null=True, blank=True)
+    current_grid_cell = IntegerField(null=True, blank=True)
+    pickup_latitude = FloatField(null=True, blank=True)
+    pickup_longitude = FloatField(null=True, blank=True)
+    pickup_grid_cell = IntegerField(null=True, blank=True)
+    dropoff_latitude = FloatField(null=True, blank=True)
+    dropoff_longitude = FloatField(null=True, blank=True)
+    dropoff_grid_cell = IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # A driver's current trip, most recent first
+            Index(fields=["driver", "is_current", "trip_start_date"], name="trip_driver_current_idx"),
+            # A carrier's trips in listing order, walked by the keyset pagination of the carrier trip list
+            Index(fields=["carrier", "-trip_start_date", "-id"], name="trip_carrier_start_date_idx"),
+            # Trips by the grid cell of each location, for proximity search
+            Index(fields=["current_grid_cell"], name="trip_current_cell_idx"),
+            Index(fields=["pickup_grid_cell"], name="trip_pickup_cell_idx"),
+            Index(fields=["dropoff_grid_cell"], name="trip_dropoff_cell_idx"),
+        ]
+
+    # Location types whose coordinates are copied into columns
+    location_types = ("current", "pickup", "dropoff")
+
+    def set_location_coordinates(self):
+        # Copies the coordinates of each location JSON into its columns
+        for location_type in self.location_types:
+            lat, lng = get_location_coords(getattr(self, f"{location_type}_location"))
+            setattr(self, f"{location_type}_latitude", lat)
+            setattr(self, f"{location_type}_longitude", lng)
+            setattr(self, f"{location_type}_grid_cell", get_grid_cell(lat, lng))
+
+    def save(self, *args, **kwargs):
+        # Keep the coordinate columns in sync with the location JSON. Only save() does, rows written with
+        # bulk_create() or queryset update() must call set_location_coordinates() or are left null
+        self.set_location_coordinates()
+        super().save(*args, **kwargs)
 
 
 class DriverLogbook(Model):
@@ -70,8 +126,13 @@ class DriverLogbook(Model):
     total_miles_driving_today = FloatField(default=0)
     # Overall mileage covered today, including co-drivers
     mileage_covered_today = FloatField(default=0)
-    driver = ForeignKey(User, on_delete=PROTECT, null=True, blank=True)
+    # Miles driven today measured from the driver's GPS positions, kept up to date as positions arrive
+    gps_miles_driven = FloatField(default=0)
+    # Indexed by the unique (driver, logbook_date) constraint, which starts with it
+    driver = ForeignKey(User, on_delete=PROTECT, null=True, blank=True, db_index=False)
     truck = ForeignKey(Truck, on_delete=PROTECT, null=True, blank=True)
+    # Bumped by every write to the logbook or its items, read views use it as their ETag
+    version = PositiveIntegerField(default=1)
 
     class Meta:
         # Ensures that there are no duplicate entries for the same trip on the same day
@@ -84,7 +145,8 @@ class DriverLogbook(Model):
 
 # StopRest model: Represents a stop or rest period during the trip
 class StopRest(Model):
-    trip_detail = ForeignKey(TripDetail, on_delete=PROTECT, null=True, blank=True)
+    # Indexed by stoprest_trip_start_time_idx, which starts with it
+    trip_detail = ForeignKey(TripDetail, on_delete=PROTECT, null=True, blank=True, db_index=False)
     # Location of the stop/rest, stored as JSON (e.g., lat, long)
     stop_location = JSONField()
     # Type of stop (e.g., fuel, rest)
@@ -93,10 +155,34 @@ class StopRest(Model):
     start_time = DateTimeField(null=True)
     # End time of the stop
     end_time = DateTimeField(null=True, blank=True)
+    # Coordinates and grid cell of the stop, copied from the location JSON on save for proximity search
+    latitude = FloatField(null=True, blank=True)
+    longitude = FloatField(null=True, blank=True)
+    grid_cell = IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # A trip's stops in order
+            Index(fields=["trip_detail", "start_time"], name="stoprest_trip_start_time_idx"),
+            # Stops by grid cell, for proximity search
+            Index(fields=["grid_cell"], name="stoprest_grid_cell_idx"),
+        ]
+
+    def set_location_coordinates(self):
+        # Copies the coordinates of the stop location JSON into its columns
+        self.latitude, self.longitude = get_location_coords(self.stop_location)
+        self.grid_cell = get_grid_cell(self.latitude, self.longitude)
+
+    def save(self, *args, **kwargs):
+        # Keep the coordinate columns in sync with the location JSON. Only save() does, rows written with
+        # bulk_create() or queryset update() must call set_location_coordinates() or are left null
+        self.set_location_coordinates()
+        super().save(*args, **kwargs)
 
 
 class LogbookItem(Model):
-    driver_logbook = ForeignKey(DriverLogbook, on_delete=PROTECT, null=True, blank=True)
+    # Indexed by item_logbook_start_time_idx, which starts with it
+    driver_logbook = ForeignKey(DriverLogbook, on_delete=PROTECT, null=True, blank=True, db_index=False)
     # Type of the trip item (e.g., stop, loading, unloading), choices from the trip_item_types list
     item_type = CharField(max_length=100, choices=logbook_item_types)
     # Start time of the item/activity
@@ -107,3 +193,145 @@ class LogbookItem(Model):
     remarks = CharField(max_length=255, null=True)
     # Boolean to mark if this item is currently active
     is_current = BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # A logbook's items in order
+            Index(fields=["driver_logbook", "start_time"], name="item_logbook_start_time_idx"),
+            # The current item of a driver, only the few open items are indexed
+            Index(fields=["driver_logbook"], condition=Q(is_current=True), name="item_current_idx"),
+        ]
+
+
+# DailyDutyTotal model: Per-driver, per-day rollup of logbook item durations, kept up to date as items are closed
+class DailyDutyTotal(Model):
+    # Indexed by the unique (driver, duty_date) constraint, which starts with it
+    driver = ForeignKey(User, on_delete=PROTECT, db_index=False)
+    duty_date = DateField()
+    # Seconds spent in each duty status on this day
+    off_duty_seconds = FloatField(default=0)
+    sleeper_berth_seconds = FloatField(default=0)
+    driving_seconds = FloatField(default=0)
+    on_duty_not_driving_seconds = FloatField(default=0)
+
+    class Meta:
+        # One rollup row per driver per day
+        unique_together = ("driver", "duty_date")
+
+    @property
+    def on_duty_seconds(self):
+        # On-duty time is driving plus on duty (not driving), lines 3 & 4 of the log sheet
+        return self.driving_seconds + self.on_duty_not_driving_seconds
+
+
+# DriverDutyState model: Running hours-of-service state of a driver, advanced each time one of their items is closed
+class DriverDutyState(Model):
+    driver = OneToOneField(User, on_delete=PROTECT, related_name="duty_state")
+    # Start of the current shift (first on-duty time after a 10 hour break)
+    shift_start = DateTimeField(null=True, blank=True)
+    # End of the latest on-duty item, the current break runs from here
+    last_on_duty_end = DateTimeField(null=True, blank=True)
+    # End of the latest driving item, used for the 30 minute break
+    last_driving_end = DateTimeField(null=True, blank=True)
+    # Driving in the current shift, and since the last 30 minute interruption
+    shift_driving_seconds = FloatField(default=0)
+    driving_since_break_seconds = FloatField(default=0)
+    # End of the latest item applied to this state, older items are not applied again
+    processed_until = DateTimeField(null=True, blank=True)
+
+
+# HosViolation model: An hours-of-service rule broken by a driver, at most one per rule per shift
+class HosViolation(Model):
+    # Indexed by the unique (driver, rule, shift_start) constraint, which starts with it
+    driver = ForeignKey(User, on_delete=PROTECT, db_index=False)
+    # Rule that was broken, choices from the hos_violation_rules list
+    rule = CharField(max_length=100, choices=hos_violation_rules)
+    # Start of the shift in which the rule was broken
+    shift_start = DateTimeField()
+    # Time at which the rule was first broken
+    occurred_at = DateTimeField()
+    # Logbook item during which the rule was broken
+    logbook_item = ForeignKey(LogbookItem, on_delete=PROTECT, null=True, blank=True)
+
+    class Meta:
+        unique_together = ("driver", "rule", "shift_start")
+
+
+# RouteGeometry model: Road geometry of a trip computed by a route provider, stored so the same stops are routed once
+class RouteGeometry(Model):
+    # Indexed by the unique (trip_detail, stop_set_hash) constraint, which starts with it
+    trip_detail = ForeignKey(TripDetail, on_delete=CASCADE, db_index=False)
+    # Which route of the trip this is, choices from the route_kinds list
+    route_kind = CharField(max_length=100, choices=route_kinds)
+    # Hash of the route kind, provider and ordered waypoints the geometry was computed for
+    stop_set_hash = CharField(max_length=64)
+    # Name of the route provider that computed the geometry
+    provider = CharField(max_length=100)
+    # Points along the route, as [lat, lng] pairs
+    coordinates = JSONField()
+    # Length of the route in meters
+    distance_meters = FloatField(null=True, blank=True)
+    created_at = DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("trip_detail", "stop_set_hash")
+
+
+# Breadcrumb model: A GPS position reported by the driver app during a trip
+class Breadcrumb(Model):
+    # Indexed by the unique (trip_detail, recorded_at) constraint, which starts with it
+    trip_detail = ForeignKey(TripDetail, on_delete=CASCADE, db_index=False)
+    # Indexed by breadcrumb_driver_time_idx, which starts with it
+    driver = ForeignKey(User, on_delete=PROTECT, db_index=False)
+    # Time at which the device recorded the position
+    recorded_at = DateTimeField()
+    latitude = FloatField()
+    longitude = FloatField()
+    # Accuracy radius in meters and speed in meters per second, as reported by the device
+    accuracy = FloatField(null=True, blank=True)
+    speed = FloatField(null=True, blank=True)
+
+    class Meta:
+        # One position per trip per timestamp, resent points are dropped (also serves a trip's track in order)
+        unique_together = ("trip_detail", "recorded_at")
+        indexes = [
+            # A driver's positions in order, across trips
+            Index(fields=["driver", "recorded_at"], name="breadcrumb_driver_time_idx"),
+            # Drivers with recent positions, caught up on by the fleet position cache
+            Index(fields=["recorded_at"], name="breadcrumb_time_idx"),
+        ]
+
+
+# PlaceName model: Name of the place at rounded coordinates, resolved once by the place name backend and shared
+class PlaceName(Model):
+    # Latitude and longitude rounded to PLACE_NAME_PRECISION decimal places, stored as integers
+    lat_key = IntegerField()
+    lng_key = IntegerField()
+    name = CharField(max_length=500)
+    # Name of the place name backend that resolved the name
+    provider = CharField(max_length=100)
+    created_at = DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("lat_key", "lng_key")
+
+
+# IdempotencyKey model: Response of a write request sent with an Idempotency-Key header, replayed when it is retried
+class IdempotencyKey(Model):
+    # Indexed by the unique (user, key) constraint, which starts with it
+    user = ForeignKey(User, on_delete=CASCADE, db_index=False)
+    # SHA-256 of the Idempotency-Key header, so every row has the same small size whatever key the client sends
+    key = CharField(max_length=64)
+    # SHA-256 of the request method, path and body, a key reused for a different request is rejected
+    request_hash = CharField(max_length=64)
+    # Status code and body of the response, stored in the same transaction as the request's changes
+    status_code = PositiveIntegerField(null=True)
+    response = JSONField(encoder=DjangoJSONEncoder, null=True)
+    created_at = DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "key")
+        indexes = [
+            # Expired keys, evicted oldest first
+            Index(fields=["created_at"], name="idempotency_key_created_idx"),
+        ]
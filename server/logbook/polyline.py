@@ -0,0 +1,99 @@
+import numpy as np
+
+# Decimal places kept for every coordinate, 5 places is about 1 m and matches the common polyline format
+POLYLINE_PRECISION = 5
+
+
+def encode_polyline(points, precision=POLYLINE_PRECISION):
+    """
+    Encodes a sequence of coordinates in the encoded polyline format.
+
+    Coordinates are rounded to `precision` decimal places and each point is stored as its difference
+    from the previous one, so a long line of nearby points costs a few characters per point instead
+    of two full JSON numbers.
+
+    Args:
+        points (list): (lat, lng) pairs in order.
+        precision (int): Decimal places kept for each coordinate.
+
+    Returns:
+        str: The encoded polyline, empty when there are no points.
+    """
+    if not len(points):
+        return ""
+
+    scaled = np.rint(np.asarray(points, dtype=np.float64) * 10**precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    # Zigzag the signed deltas so small negative values also encode as short chunks
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1).tolist()
+
+    characters = []
+    for value in values:
+        while value >= 0x20:
+            characters.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        characters.append(chr(value + 63))
+    return "".join(characters)
+
+
+def decode_polyline(encoded, precision=POLYLINE_PRECISION):
+    """
+    Decodes an encoded polyline back into coordinates.
+
+    Args:
+        encoded (str): A polyline returned by encode_polyline.
+        precision (int): Decimal places the polyline was encoded with.
+
+    Returns:
+        list: [lat, lng] pairs in order.
+    """
+    values = []
+    value = shift = 0
+    for character in encoded:
+        chunk = ord(character) - 63
+        value |= (chunk & 0x1F) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+
+    scaled = np.cumsum(np.asarray(values, dtype=np.int64).reshape(-1, 2), axis=0)
+    return (scaled / 10**precision).tolist()
+
+
+def encode_route_map_data(route_map_data, precision=POLYLINE_PRECISION):
+    """
+    Returns trip route map data with the stop sequence and route line encoded as polylines.
+
+    Stops become parallel "start_times" and "names" lists plus one "polyline" of their coordinates,
+    leaving out stops recorded without coordinates, which cannot be drawn anyway.
+
+    Args:
+        route_map_data (dict): Data returned by TripRouteViewSerializer, with the "route" added.
+        precision (int): Decimal places kept for each coordinate.
+
+    Returns:
+        dict: The compact route map data, with the precision used.
+    """
+    located_stops = [
+        trip_stop
+        for trip_stop in route_map_data["trip_stops"]
+        if trip_stop["stop_location"] and trip_stop["stop_location"].get("coords")
+    ]
+    stop_coordinates = [
+        (trip_stop["stop_location"]["coords"]["lat"], trip_stop["stop_location"]["coords"]["lng"])
+        for trip_stop in located_stops
+    ]
+    route = route_map_data.get("route")
+
+    return {
+        **route_map_data,
+        "trip_stops": {
+            "start_times": [trip_stop["start_time"] for trip_stop in located_stops],
+            "names": [trip_stop["stop_location"].get("name") for trip_stop in located_stops],
+            "polyline": encode_polyline(stop_coordinates, precision),
+        },
+        "middle_index": len(located_stops) // 2,
+        "route": encode_polyline(route, precision) if route else None,
+        "precision": precision,
+    }
@@ -0,0 +1,187 @@
+import math
+
+import numpy as np
+from django.db.models import Q
+
+EARTH_RADIUS_METERS = 6_371_000
+
+# Size of one grid cell in degrees, about 11 km north to south
+GRID_CELL_DEGREES = 0.1
+
+# Number of grid cells around the globe on each row
+GRID_COLUMNS = round(360 / GRID_CELL_DEGREES)
+
+# Largest height or width in degrees of a searched area, keeps the cell ranges of one query short
+MAX_SEARCH_SPAN_DEGREES = 5
+
+
+def haversine_distance(start, end):
+    """Returns the great-circle distance in meters between two (lat, lng) points."""
+    start_lat, start_lng, end_lat, end_lng = map(math.radians, (*start, *end))
+    a = (
+        math.sin((end_lat - start_lat) / 2) ** 2
+        + math.cos(start_lat) * math.cos(end_lat) * math.sin((end_lng - start_lng) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a))
+
+
+def get_location_coords(location):
+    """Returns the (lat, lng) of a location dict as stored on trips and stops, or (None, None) without coordinates."""
+    coords = location.get("coords") if isinstance(location, dict) else None
+    if not coords or coords.get("lat") is None or coords.get("lng") is None:
+        return None, None
+    return float(coords["lat"]), float(coords["lng"])
+
+
+def get_grid_cell(lat, lng):
+    """
+    Returns the grid cell holding a point, or None without coordinates.
+
+    Cells are numbered row by row from the south west, so the cells of one row between two
+    longitudes form a single range of numbers and a bounding box is a handful of index range scans.
+    """
+    if lat is None or lng is None:
+        return None
+    row = min(int((lat + 90) // GRID_CELL_DEGREES), round(180 / GRID_CELL_DEGREES) - 1)
+    column = min(int((lng + 180) // GRID_CELL_DEGREES), GRID_COLUMNS - 1)
+    return row * GRID_COLUMNS + column
+
+
+def get_radius_bounds(lat, lng, radius_meters):
+    """Returns the (min_lat, min_lng, max_lat, max_lng) box around a circle, clamped to valid coordinates."""
+    lat_span = math.degrees(radius_meters / EARTH_RADIUS_METERS)
+    lng_span = lat_span / max(math.cos(math.radians(lat)), 1e-6)
+    return max(lat - lat_span, -90), max(lng - lng_span, -180), min(lat + lat_span, 90), min(lng + lng_span, 180)
+
+
+def parse_search_area(query_params):
+    """
+    Reads the searched area from the query params of a proximity search.
+
+    Either a bounding box (minLat, minLng, maxLat, maxLng) or a circle (lat, lng, radiusKm) is accepted.
+
+    Returns:
+        tuple: (min_lat, min_lng, max_lat, max_lng) bounds, and the (lat, lng, radius in meters) circle or None.
+
+    Raises:
+        ValueError: If the area is missing, malformed or larger than MAX_SEARCH_SPAN_DEGREES.
+    """
+    if "radiusKm" in query_params:
+        lat, lng, radius_km = (float(query_params[name]) for name in ("lat", "lng", "radiusKm"))
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180 and radius_km > 0):
+            raise ValueError("Invalid circle")
+        circle = (lat, lng, radius_km * 1000)
+        bounds = get_radius_bounds(*circle)
+    else:
+        bounds = tuple(float(query_params[name]) for name in ("minLat", "minLng", "maxLat", "maxLng"))
+        circle = None
+
+    min_lat, min_lng, max_lat, max_lng = bounds
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise ValueError("Invalid bounding box")
+    if max_lat - min_lat > MAX_SEARCH_SPAN_DEGREES or max_lng - min_lng > MAX_SEARCH_SPAN_DEGREES:
+        raise ValueError("Area too large")
+    return bounds, circle
+
+
+def parse_bounding_box(query_params):
+    """
+    Reads an optional bounding box (minLat, minLng, maxLat, maxLng) from query params, of any size.
+
+    Returns:
+        tuple: (min_lat, min_lng, max_lat, max_lng) bounds, or None if no bound is given.
+
+    Raises:
+        ValueError: If the bounding box is incomplete or malformed.
+    """
+    names = ("minLat", "minLng", "maxLat", "maxLng")
+    if not any(name in query_params for name in names):
+        return None
+
+    try:
+        min_lat, min_lng, max_lat, max_lng = (float(query_params[name]) for name in names)
+    except KeyError as error:
+        raise ValueError("Incomplete bounding box") from error
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise ValueError("Invalid bounding box")
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def get_bounds_filter(prefix, min_lat, min_lng, max_lat, max_lng):
+    """
+    Returns a filter matching the rows whose point lies in a bounding box.
+
+    The rows are first narrowed down by the indexed grid cell column, one cell range per grid row
+    crossed by the box, then by the exact latitude and longitude columns.
+
+    Args:
+        prefix (str): Prefix of the "<prefix>latitude", "<prefix>longitude" and "<prefix>grid_cell" fields.
+    """
+    south_west, north_east = get_grid_cell(min_lat, min_lng), get_grid_cell(max_lat, max_lng)
+    first_column, last_column = south_west % GRID_COLUMNS, north_east % GRID_COLUMNS
+    cell_filter = Q()
+    for row in range(south_west // GRID_COLUMNS, north_east // GRID_COLUMNS + 1):
+        row_start = row * GRID_COLUMNS
+        cell_filter |= Q(**{f"{prefix}grid_cell__range": (row_start + first_column, row_start + last_column)})
+
+    return cell_filter & Q(
+        **{
+            f"{prefix}latitude__range": (min_lat, max_lat),
+            f"{prefix}longitude__range": (min_lng, max_lng),
+        }
+    )
+
+
+def get_nearest_within_radius(candidates, circle, limit):
+    """
+    Keeps the candidate points lying inside a circle, nearest first.
+
+    Args:
+        candidates (list): (id, lat, lng) tuples, e.g. the rows found in the circle's bounding box.
+        circle (tuple): (lat, lng, radius in meters).
+        limit (int): Most points returned.
+
+    Returns:
+        list: (id, distance in meters) tuples of the nearest points inside the circle.
+    """
+    if not candidates:
+        return []
+
+    ids, lats, lngs = (np.asarray(column) for column in zip(*candidates))
+    center_lat, center_lng, radius = circle
+    lats, lngs, center_lat, center_lng = (
+        np.radians(lats),
+        np.radians(lngs),
+        math.radians(center_lat),
+        math.radians(center_lng),
+    )
+    a = np.sin((lats - center_lat) / 2) ** 2 + np.cos(center_lat) * np.cos(lats) * np.sin((lngs - center_lng) / 2) ** 2
+    distances = 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(a))
+
+    inside = np.flatnonzero(distances <= radius)
+    nearest = inside[np.argsort(distances[inside], kind="stable")[:limit]]
+    return [(int(ids[index]), float(distances[index])) for index in nearest]
+
+
+def find_in_area(queryset, prefix, bounds, circle, limit):
+    """
+    Finds the rows of a queryset whose point lies in a searched area.
+
+    Args:
+        queryset (QuerySet): Rows to search, e.g. already narrowed down to a carrier.
+        prefix (str): Prefix of the point's coordinate and grid cell fields, see get_bounds_filter.
+        bounds (tuple): (min_lat, min_lng, max_lat, max_lng) returned by parse_search_area.
+        circle (tuple): (lat, lng, radius in meters) returned by parse_search_area, or None.
+        limit (int): Most rows returned.
+
+    Returns:
+        list: (id, distance in meters) tuples, nearest first inside a circle, by id inside a bounding box
+              (the distance is then None).
+    """
+    queryset = queryset.filter(get_bounds_filter(prefix, *bounds))
+    if circle is None:
+        return [(row_id, None) for row_id in queryset.order_by("id").values_list("id", flat=True)[:limit]]
+
+    # Only the coordinates of the rows in the circle's bounding box are read to measure the distances
+    candidates = list(queryset.values_list("id", f"{prefix}latitude", f"{prefix}longitude"))
+    return get_nearest_within_radius(candidates, circle, limit)
@@ -0,0 +1,145 @@
+import hashlib
+import json
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.module_loading import import_string
+
+from logbook.models import RouteGeometry
+from logbook.proximity import haversine_distance
+
+
+class RouteProviderError(Exception):
+    """Raised when a route provider cannot route a set of waypoints."""
+
+
+class RouteProvider:
+    """
+    Base class of route providers, which turn an ordered list of waypoints into a road geometry.
+
+    Subclasses set `name`, stored with every geometry they compute, and implement get_route.
+    """
+
+    name = None
+
+    def get_route(self, waypoints):
+        """
+        Routes through the waypoints in order.
+
+        Args:
+            waypoints (list): (lat, lng) tuples, at least two.
+
+        Returns:
+            tuple: (list of [lat, lng] points along the route, distance in meters).
+
+        Raises:
+            RouteProviderError: If the route cannot be computed.
+        """
+        raise NotImplementedError
+
+
+class OpenRouteServiceProvider(RouteProvider):
+    """Routes along roads with the OpenRouteService driving-car directions API."""
+
+    name = "openrouteservice"
+    url = "https://api.openrouteservice.org/v2/directions/driving-car/geojson"
+
+    def get_route(self, waypoints):
+        request = Request(
+            self.url,
+            data=json.dumps({"coordinates": [[lng, lat] for lat, lng in waypoints]}).encode(),
+            headers={"Authorization": f"Bearer {settings.ORS_API_KEY}", "Content-Type": "application/json"},
+        )
+        try:
+            with urlopen(request, timeout=settings.ROUTE_PROVIDER_TIMEOUT) as response:
+                feature = json.load(response)["features"][0]
+            coordinates = [[lat, lng] for lng, lat in feature["geometry"]["coordinates"]]
+            distance = feature["properties"]["summary"].get("distance", 0)
+        except (URLError, TimeoutError, ValueError, KeyError, IndexError, TypeError, AttributeError) as error:
+            raise RouteProviderError(f"OpenRouteService could not route the trip: {error}") from error
+
+        return coordinates, distance
+
+
+class StraightLineProvider(RouteProvider):
+    """Offline stand-in that joins the waypoints with straight lines, used in tests and without an API key."""
+
+    name = "straight-line"
+
+    def get_route(self, waypoints):
+        distance = sum(haversine_distance(start, end) for start, end in zip(waypoints, waypoints[1:]))
+        return [[lat, lng] for lat, lng in waypoints], distance
+
+
+def get_route_provider():
+    """Returns an instance of the provider configured in ROUTE_PROVIDER."""
+    return import_string(settings.ROUTE_PROVIDER)()
+
+
+def get_location_waypoints(locations):
+    """Returns the (lat, lng) of each location dict (as stored on trips and stops) that has coordinates."""
+    return [
+        (location["coords"]["lat"], location["coords"]["lng"])
+        for location in locations
+        if location and location.get("coords")
+    ]
+
+
+def get_stop_set_hash(route_kind, provider_name, waypoints):
+    """Returns a hash identifying a route by its kind, provider and ordered waypoints."""
+    content = json.dumps([route_kind, provider_name, waypoints])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def get_trip_route_geometry(trip_detail, route_kind, waypoints, provider=None):
+    """
+    Returns the road geometry of a trip through the given waypoints, routing it only once.
+
+    Geometries are stored per trip and stop-set hash, so the same stops are never routed twice, and a
+    finished trip, whose stops no longer change, is always served from storage. When a new stop changes
+    the hash, the trip's older geometry of the same kind is replaced.
+
+    Args:
+        trip_detail (TripDetail): The trip being drawn.
+        route_kind (str): "planned" (current, pickup and dropoff locations) or "actual" (recorded stops).
+        waypoints (list): (lat, lng) tuples in route order.
+        provider (RouteProvider): Defaults to the configured provider.
+
+    Returns:
+        list: [lat, lng] points along the route, or None with fewer than two waypoints.
+
+    Raises:
+        RouteProviderError: If the route is not stored yet and the provider cannot compute it.
+    """
+    if len(waypoints) < 2:
+        return None
+
+    provider = provider or get_route_provider()
+    stop_set_hash = get_stop_set_hash(route_kind, provider.name, waypoints)
+    stored_coordinates = (
+        RouteGeometry.objects.filter(trip_detail=trip_detail, stop_set_hash=stop_set_hash)
+        .values_list("coordinates", flat=True)
+        .first()
+    )
+    if stored_coordinates is not None:
+        return stored_coordinates
+
+    coordinates, distance = provider.get_route(waypoints)
+    try:
+        with transaction.atomic():
+            RouteGeometry.objects.filter(trip_detail=trip_detail, route_kind=route_kind).delete()
+            RouteGeometry.objects.create(
+                trip_detail=trip_detail,
+                route_kind=route_kind,
+                stop_set_hash=stop_set_hash,
+                provider=provider.name,
+                coordinates=coordinates,
+                distance_meters=distance,
+            )
+    except IntegrityError:
+        # Routed by a concurrent request in the meantime, both results are equivalent
+        pass
+
+    return coordinates
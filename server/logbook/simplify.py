@@ -0,0 +1,118 @@
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from logbook.proximity import EARTH_RADIUS_METERS
+
+# Ground meters covered by one 256 px map tile pixel at zoom level 0 on the equator, halved at each zoom level
+METERS_PER_PIXEL_AT_ZOOM_0 = 156_543.03
+
+# Zoom levels at which the routes of finished trips are precomputed, a requested zoom uses the next level up
+ROUTE_ZOOM_LEVELS = (6, 9, 12, 15)
+
+
+def get_zoom_tolerance(zoom):
+    """Returns the simplification tolerance in meters for a map zoom level, one pixel on the map."""
+    return METERS_PER_PIXEL_AT_ZOOM_0 / 2**zoom
+
+
+def simplify_track(points, tolerance):
+    """
+    Simplifies a line with the Douglas-Peucker algorithm.
+
+    Points are projected onto a local flat plane in meters, then the point farthest from the line
+    joining the ends of each span is kept if it lies further than `tolerance`, and the span is split
+    there. The distances of each span are computed at once with NumPy, so only the number of kept
+    points, not the number of input points, costs Python iterations.
+
+    Args:
+        points (list): [lat, lng] pairs in order.
+        tolerance (float): Largest distance in meters a dropped point may lie from the simplified line.
+
+    Returns:
+        list: The kept points, always including the first and the last one.
+    """
+    if len(points) < 3 or tolerance <= 0:
+        return points
+
+    coordinates = np.radians(np.asarray(points, dtype=np.float64))
+    mean_lat = coordinates[:, 0].mean()
+    projected = np.column_stack((coordinates[:, 1] * np.cos(mean_lat), coordinates[:, 0])) * EARTH_RADIUS_METERS
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    spans = [(0, len(points) - 1)]
+    while spans:
+        start, end = spans.pop()
+        if end - start < 2:
+            continue
+
+        # Distance of each inner point to the segment joining the ends of the span
+        segment_start, segment = projected[start], projected[end] - projected[start]
+        offsets = projected[start + 1 : end] - segment_start
+        segment_length = segment @ segment
+        if segment_length:
+            offsets = offsets - np.outer(np.clip(offsets @ segment / segment_length, 0, 1), segment)
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            spans.extend(((start, split), (split, end)))
+
+    return [points[index] for index in np.flatnonzero(keep)]
+
+
+def get_route_zoom_level(zoom):
+    """Returns the precomputed zoom level used for a requested zoom, the first one at least as detailed."""
+    return next((level for level in ROUTE_ZOOM_LEVELS if level >= zoom), ROUTE_ZOOM_LEVELS[-1])
+
+
+def get_route_levels_cache_key(trip_detail, route_kind, track_version=None):
+    """Returns the cache key of a trip's precomputed route levels, tied to the trip version and track version."""
+    return f"trip-route-levels-{trip_detail.id}-{route_kind}-{trip_detail.version}-{track_version}"
+
+
+def get_simplified_trip_route(trip_detail, route_kind, load_route, zoom=None, tolerance=None, track_version=None):
+    """
+    Returns a trip's route simplified to a tolerance or a map zoom level.
+
+    The route of a finished trip no longer changes, so all ROUTE_ZOOM_LEVELS are computed the first
+    time one is requested and cached together, and later requests at any zoom neither load the full
+    route nor simplify it again. Other routes are simplified on each request.
+
+    Args:
+        trip_detail (TripDetail): The trip being drawn.
+        route_kind (str): The kind of route, part of the cache key.
+        load_route (callable): Returns the full route as [lat, lng] pairs (or None), only called when needed.
+        zoom (int): Map zoom level the route is drawn at.
+        tolerance (float): Tolerance in meters, used instead of the zoom level when given.
+        track_version (str): Version of the recorded track (see get_track_version) for routeKind "track".
+
+    Returns:
+        list: The simplified route, or the full route when neither zoom nor tolerance is given.
+    """
+    if tolerance is not None:
+        route = load_route()
+        return simplify_track(route, tolerance) if route else route
+    if zoom is None:
+        return load_route()
+
+    level = get_route_zoom_level(zoom)
+    if not trip_detail.is_done:
+        route = load_route()
+        return simplify_track(route, get_zoom_tolerance(level)) if route else route
+
+    cache_key = get_route_levels_cache_key(trip_detail, route_kind, track_version)
+    route_levels = cache.get(cache_key)
+    if route_levels is None:
+        route = load_route()
+        if not route:
+            return route
+        route_levels = {
+            route_level: simplify_track(route, get_zoom_tolerance(route_level)) for route_level in ROUTE_ZOOM_LEVELS
+        }
+        cache.set(cache_key, route_levels, settings.ROUTE_LEVELS_CACHE_TIMEOUT)
+
+    return route_levels[level]
@@ -0,0 +1,203 @@
+from datetime import datetime, timedelta, timezone
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils.timezone import is_naive, make_aware, now
+
+from rest_framework.exceptions import ValidationError
+
+from core.utils import bump_versions, end_logbook_item, get_or_create_driver_logbook
+from logbook.api.serializers import LogbookItemSerializer, StopRestSerializer
+from logbook.hours_of_service import reevaluate_driver_from
+from logbook.idempotency import MAX_IDEMPOTENCY_KEY_LENGTH, claim_operation_keys
+from logbook.models import DriverDutyState, DriverLogbook, LogbookItem, TripDetail
+from users.models import User
+
+# Most queued operations accepted in one sync request
+MAX_SYNC_OPERATIONS = 500
+
+# How far ahead of the server clock an operation's time may be, to allow for a drifting device clock
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+class SyncOperationError(Exception):
+    """Raised when a queued operation cannot be applied, the whole batch is then rolled back and the app drops it."""
+
+    def __init__(self, index, message):
+        super().__init__(f"Operation {index}: {message}")
+        self.index = index
+
+
+def parse_operations(operations):
+    """
+    Validates a batch of operations queued by the driver app while offline.
+
+    Args:
+        operations (list): Dicts with "type" (one of SYNC_OPERATION_HANDLERS), "recordedAt" (ISO 8601,
+            when the driver made the change on the device), "data", the body the app would have
+            sent to the operation's own endpoint, and optionally "idempotencyKey", the key the app
+            made the operation with (see claim_operation_keys).
+
+    Returns:
+        list: (type, recorded time in UTC, data, idempotency key or None) tuples, in the order sent.
+
+    Raises:
+        SyncOperationError: If an operation is malformed, of an unknown type or recorded in the future.
+    """
+    latest_time = now() + MAX_CLOCK_SKEW
+    parsed_operations = []
+    for index, operation in enumerate(operations):
+        try:
+            operation_type, data = operation["type"], operation.get("data") or {}
+            recorded_at = datetime.fromisoformat(operation["recordedAt"])
+            key = operation.get("idempotencyKey") or None
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise SyncOperationError(index, "invalid operation")
+        if operation_type not in SYNC_OPERATION_HANDLERS or not isinstance(data, dict):
+            raise SyncOperationError(index, "invalid operation")
+        if key is not None and (not isinstance(key, str) or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH):
+            raise SyncOperationError(index, "invalid idempotencyKey")
+
+        if is_naive(recorded_at):
+            recorded_at = make_aware(recorded_at)
+        # Logbook days are worked out from UTC times, as for changes made online
+        recorded_at = recorded_at.astimezone(timezone.utc)
+        if recorded_at > latest_time:
+            raise SyncOperationError(index, "recorded in the future")
+        parsed_operations.append((operation_type, recorded_at, data, key))
+
+    return parsed_operations
+
+
+def apply_change_status(driver, recorded_at, data):
+    """
+    Closes the driver's current logbook item and opens a new one, both at the time of the change.
+
+    Returns:
+        DriverLogbook: The logbook the new item was added to.
+    """
+    current_item = (
+        LogbookItem.objects.filter(driver_logbook__driver=driver, is_current=True).order_by("-start_time").first()
+    )
+    if current_item:
+        if recorded_at < current_item.start_time:
+            raise ValueError("Status changed before the current status started")
+        end_logbook_item(current_item, recorded_at)
+
+    driver_logbook = get_or_create_driver_logbook(driver, recorded_at.date())
+    serializer = LogbookItemSerializer(
+        data={**data, "start_time": recorded_at, "driver_logbook": driver_logbook.id, "is_current": True}
+    )
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    return driver_logbook
+
+
+def apply_record_stop(driver, recorded_at, data):
+    """
+    Records a stop, on the driver's current trip unless another trip is given, ending when it was recorded.
+
+    Returns:
+        TripDetail: The trip the stop was recorded on.
+    """
+    trip_detail_id = data.get("trip_detail") or (
+        TripDetail.objects.filter(is_current=True, driver=driver)
+        .order_by("-trip_start_date")
+        .values_list("id", flat=True)
+        .first()
+    )
+    serializer = StopRestSerializer(
+        data={
+            **data,
+            "trip_detail": trip_detail_id,
+            "start_time": data.get("start_time") or recorded_at,
+            "end_time": data.get("end_time") or recorded_at,
+        }
+    )
+    serializer.is_valid(raise_exception=True)
+    return serializer.save().trip_detail
+
+
+def apply_record_mileage_covered_today(driver, recorded_at, data):
+    """
+    Records the mileage of the day the operation was recorded on.
+
+    Returns:
+        DriverLogbook: The logbook the mileage was recorded in.
+    """
+    driver_logbook = get_or_create_driver_logbook(driver, recorded_at.date())
+    driver_logbook.total_miles_driving_today = data["total_miles_driving_today"]
+    # Without the mileage covered today, use the total miles driven today
+    mileage_covered_today = data.get("mileage_covered_today", "")
+    driver_logbook.mileage_covered_today = (
+        mileage_covered_today if mileage_covered_today != "" else data["total_miles_driving_today"]
+    )
+    driver_logbook.save()
+    return driver_logbook
+
+
+# Function applying each type of queued operation
+SYNC_OPERATION_HANDLERS = {
+    "change_status": apply_change_status,
+    "record_stop": apply_record_stop,
+    "record_mileage_covered_today": apply_record_mileage_covered_today,
+}
+
+
+def apply_operations(driver, operations):
+    """
+    Applies a driver's queued operations in order, at the times they were made on the device.
+
+    All operations are applied in one transaction, holding a lock on the driver's row so two syncs of
+    the same driver cannot interleave, and either all of them or none are applied. The versions of the
+    changed trips and logbooks are bumped once at the end. Status changes are backdated to their device
+    times, possibly behind items the hours of service state was already evaluated up to, so the driver
+    is evaluated again from the earliest one synced. Operations whose Idempotency-Key was already used,
+    online or by an earlier sync, are skipped.
+
+    Args:
+        driver (User): The driver who queued the operations.
+        operations (list): Operations returned by parse_operations.
+
+    Returns:
+        int: The number of operations applied.
+
+    Raises:
+        SyncOperationError: If an operation cannot be applied.
+        RequestFailedError: If a request with the key of one of the operations is still running.
+    """
+    changed_models = {DriverLogbook: set(), TripDetail: set()}
+    status_times, applied = [], 0
+    with transaction.atomic():
+        User.objects.select_for_update().only("id").get(id=driver.id)
+        keyed_operations = {}
+        for operation_type, recorded_at, data, key in operations:
+            if key:
+                keyed_operations.setdefault(key, {"type": operation_type, "recordedAt": recorded_at, "data": data})
+        used_keys = claim_operation_keys(driver, keyed_operations) if keyed_operations else set()
+
+        for index, (operation_type, recorded_at, data, key) in enumerate(operations):
+            if key in used_keys:
+                continue
+            if key:
+                # A key sent twice in the batch is applied once
+                used_keys.add(key)
+            try:
+                changed = SYNC_OPERATION_HANDLERS[operation_type](driver, recorded_at, data)
+            except (KeyError, TypeError, ValueError, DjangoValidationError, ValidationError) as error:
+                if isinstance(error, ValidationError) and isinstance(error.detail, dict):
+                    raise SyncOperationError(index, f"invalid {', '.join(error.detail)}") from error
+                raise SyncOperationError(index, str(error)) from error
+            changed_models[type(changed)].add(changed.id)
+            applied += 1
+            if operation_type == "change_status":
+                status_times.append(recorded_at)
+
+        if status_times:
+            state, _ = DriverDutyState.objects.select_for_update().get_or_create(driver_id=driver.id)
+            reevaluate_driver_from(state, min(status_times))
+
+        for model, object_ids in changed_models.items():
+            bump_versions(model, list(object_ids))
+
+    return applied
@@ -1,13 +1,53 @@
-from django.test import TestCase
+import csv
+import json
+import math
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+from importlib import import_module
+from io import StringIO
+from unittest.mock import patch
+
+from django.apps import apps
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth.models import Group
 from django.conf import settings
+from django.core.cache import cache
 from django.db import connection, transaction
 from django.core.management import call_command
 
+from core.testing import QueryBudgetMixin
+from core.utils import bump_versions, close_logbook_item, handle_multi_day_logbook_item
 from users.models import User
-from logbook.models import Carrier
+from logbook.duty import get_day_bounds, get_rolling_duty_totals, update_daily_duty_totals
+from logbook.duty_grid import build_duty_grids, encode_duty_grid
+from logbook.fleet import fleet_positions
+from logbook.geocoding import GazetteerBackend, load_gazetteer, resolve_place_name
+from logbook.hours_of_service import evaluate_closed_logbook_items
+from logbook.mileage import METERS_PER_MILE
+from logbook.polyline import decode_polyline, encode_polyline
+from logbook.proximity import get_grid_cell
+from logbook.simplify import get_zoom_tolerance, simplify_track
+from logbook.routing import RouteProviderError, StraightLineProvider
+from logbook.models import (
+    Carrier,
+    Truck,
+    TripDetail,
+    DriverLogbook,
+    LogbookItem,
+    DailyDutyTotal,
+    DriverDutyState,
+    HosViolation,
+    RouteGeometry,
+    StopRest,
+    Breadcrumb,
+    PlaceName,
+    IdempotencyKey,
+)
 from rest_framework.exceptions import APIException
 
 
@@ -23,6 +63,40 @@ class MissingItemError(APIException):
     default_code = "not_found"
 
 
+# Where the trips made by create_driver_trip start, pick up and drop off unless given other locations
+TRIP_LOCATION = {"name": "Nairobi", "coords": {"lat": -1.29, "lng": 36.82}}
+
+
+def create_driver_trip(is_driver=False, **trip_fields):
+    """
+    Creates the driver@example.com user and a current trip of theirs, starting on 2025-04-01 in Nairobi.
+
+    Args:
+        is_driver (bool): Whether the user is flagged as a driver.
+        **trip_fields: TripDetail fields replacing the defaults, e.g. truck or is_done.
+
+    Returns:
+        tuple: The driver and the trip.
+    """
+    driver = User.objects.create_user(email="driver@example.com", password="password123")
+    if is_driver:
+        driver.is_driver = True
+        driver.save()
+    trip = TripDetail.objects.create(
+        **{
+            "current_location": TRIP_LOCATION,
+            "pickup_location": TRIP_LOCATION,
+            "dropoff_location": TRIP_LOCATION,
+            "cycle_used": "10",
+            "trip_start_date": date(2025, 4, 1),
+            "is_current": True,
+            "driver": driver,
+            **trip_fields,
+        }
+    )
+    return driver, trip
+
+
 class MaintainCarriersTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -126,3 +200,1430 @@ class MaintainCarriersTests(TestCase):
         response = self.client.get("/api/carriers/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["carriers_data"]), 2)
+
+
+class DailyDutyTotalTests(TestCase):
+    def setUp(self):
+        self.driver = User.objects.create_user(email="driver@example.com", password="password123")
+        self.day = date(2025, 4, 10)
+        self.day_start, _ = get_day_bounds(self.day)
+        self.logbook = DriverLogbook.objects.create(driver=self.driver, logbook_date=self.day)
+
+    def test_closing_items_updates_rollup(self):
+        item = LogbookItem.objects.create(
+            driver_logbook=self.logbook, item_type="driving", start_time=self.day_start + timedelta(hours=6)
+        )
+        close_logbook_item(item, self.day_start + timedelta(hours=9))
+        # Closing the same item again only applies the difference
+        close_logbook_item(item, self.day_start + timedelta(hours=10))
+
+        daily_total = DailyDutyTotal.objects.get(driver=self.driver, duty_date=self.day)
+        self.assertEqual(daily_total.driving_seconds, 4 * 3600)
+
+        totals = get_rolling_duty_totals(self.driver.id, self.day + timedelta(days=4))
+        self.assertEqual(totals["today"], 0)
+        self.assertEqual(totals[5], 4 * 3600)
+
+    def test_rebuild_matches_incremental_rollup(self):
+        item = LogbookItem.objects.create(
+            driver_logbook=self.logbook, item_type="sleeper-berth", start_time=self.day_start + timedelta(hours=1)
+        )
+        close_logbook_item(item, self.day_start + timedelta(hours=3))
+        DailyDutyTotal.objects.all().delete()
+
+        call_command("rebuild_daily_duty_totals", chunk_size=1, stdout=StringIO())
+
+        daily_total = DailyDutyTotal.objects.get(driver=self.driver, duty_date=self.day)
+        self.assertEqual(daily_total.sleeper_berth_seconds, 2 * 3600)
+        output = StringIO()
+        call_command("rebuild_daily_duty_totals", verify=True, stdout=output)
+        self.assertIn("0 mismatched", output.getvalue())
+
+
+class DutyGridTests(TestCase):
+    def test_grid_keeps_minute_resolution_and_totals(self):
+        day = date(2025, 4, 10)
+        next_day = day + timedelta(days=1)
+        day_start, day_end = get_day_bounds(day)
+        items = [
+            (day, "off-duty", day_start, day_start + timedelta(hours=7, minutes=45)),
+            (day, "driving", day_start + timedelta(hours=7, minutes=45), day_start + timedelta(hours=10, minutes=5)),
+            (day, "off-duty", day_start + timedelta(hours=10, minutes=5), day_end - timedelta(microseconds=1)),
+            (next_day, "sleeper-berth", day_end, day_end + timedelta(minutes=30)),
+        ]
+
+        grids = build_duty_grids([day, next_day], items)
+        first_day = encode_duty_grid(grids[0])
+        second_day = encode_duty_grid(grids[1])
+
+        self.assertEqual(
+            first_day["segments"],
+            [
+                {"status": 1, "start_minute": 0, "end_minute": 465},
+                {"status": 3, "start_minute": 465, "end_minute": 605},
+                {"status": 1, "start_minute": 605, "end_minute": 1440},
+            ],
+        )
+        self.assertEqual(first_day["status_minutes"]["driving"], 140)
+        self.assertEqual(first_day["status_minutes"]["off-duty"], 1300)
+        self.assertEqual(second_day["segments"], [{"status": 2, "start_minute": 0, "end_minute": 30}])
+
+
+class MultiDaySplitTests(TestCase):
+    def setUp(self):
+        self.driver = User.objects.create_user(email="driver@example.com", password="password123")
+
+    def split_item_over_days(self, number_of_days):
+        first_day = date(2025, 4, 1)
+        day_start, _ = get_day_bounds(first_day)
+        driver_logbook = DriverLogbook.objects.create(driver=self.driver, logbook_date=first_day)
+        logbook_item = LogbookItem.objects.create(
+            driver_logbook=driver_logbook,
+            item_type="off-duty",
+            start_time=day_start + timedelta(hours=18),
+            is_current=True,
+        )
+        end_time = day_start + timedelta(days=number_of_days, hours=6)
+
+        with CaptureQueriesContext(connection) as queries:
+            handle_multi_day_logbook_item(logbook_item, end_time)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_days_spanned(self):
+        short_split_queries = self.split_item_over_days(2)
+        LogbookItem.objects.all().delete()
+        DriverLogbook.objects.all().delete()
+        DailyDutyTotal.objects.all().delete()
+        DriverDutyState.objects.all().delete()
+        long_split_queries = self.split_item_over_days(14)
+
+        self.assertEqual(short_split_queries, long_split_queries)
+        self.assertEqual(DriverLogbook.objects.filter(driver=self.driver).count(), 15)
+        self.assertEqual(LogbookItem.objects.filter(driver_logbook__driver=self.driver).count(), 15)
+        self.assertEqual(DailyDutyTotal.objects.filter(driver=self.driver).count(), 15)
+
+
+class HosViolationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", password="password123")
+        self.carrier = Carrier.objects.create(name="Carrier 1", admin=self.admin)
+        self.admin.carrier = self.carrier
+        self.admin.save()
+        self.driver = User.objects.create_user(email="driver@example.com", password="password123")
+        self.driver.carrier = self.carrier
+        self.driver.save()
+        self.day = date(2025, 4, 10)
+        self.day_start, _ = get_day_bounds(self.day)
+        self.logbook = DriverLogbook.objects.create(driver=self.driver, logbook_date=self.day)
+
+    def close_item(self, item_type, start_hour, end_hour):
+        item = LogbookItem.objects.create(
+            driver_logbook=self.logbook, item_type=item_type, start_time=self.day_start + timedelta(hours=start_hour)
+        )
+        close_logbook_item(item, self.day_start + timedelta(hours=end_hour))
+
+    def get_violations(self):
+        return {violation.rule: violation.occurred_at for violation in HosViolation.objects.filter(driver=self.driver)}
+
+    def test_closing_items_records_violations(self):
+        self.close_item("on-duty-not-driving", 6, 7)
+        self.close_item("driving", 7, 19)
+
+        self.assertEqual(
+            self.get_violations(),
+            {
+                "driving-limit": self.day_start + timedelta(hours=18),
+                "rest-break": self.day_start + timedelta(hours=15),
+            },
+        )
+        state = DriverDutyState.objects.get(driver=self.driver)
+        self.assertEqual(state.shift_start, self.day_start + timedelta(hours=6))
+        self.assertEqual(state.shift_driving_seconds, 12 * 3600)
+
+        client = APIClient()
+        client.force_authenticate(user=self.admin)
+        response = client.post(
+            "/api/v1/logbook/get-carrier-hos-violations/", {"startDate": "2025-04-10", "endDate": "2025-04-10"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["hos_violations_data"]), 2)
+
+    def test_break_resets_driving_before_break(self):
+        self.close_item("driving", 6, 11)
+        self.close_item("off-duty", 11, 11.5)
+        self.close_item("driving", 11.5, 16)
+
+        self.assertEqual(self.get_violations(), {})
+
+    def test_replay_matches_incremental_violations(self):
+        self.close_item("on-duty-not-driving", 6, 7)
+        self.close_item("driving", 7, 19)
+        self.close_item("driving", 19, 21)
+        incremental_violations = self.get_violations()
+        HosViolation.objects.all().delete()
+        DriverDutyState.objects.all().delete()
+
+        call_command("replay_hos_violations", stdout=StringIO())
+
+        self.assertEqual(self.get_violations(), incremental_violations)
+        self.assertEqual(incremental_violations["duty-window"], self.day_start + timedelta(hours=20))
+
+    def test_item_closed_out_of_order_is_evaluated(self):
+        self.close_item("driving", 6, 11)
+        self.close_item("driving", 14, 19)
+        self.assertEqual(self.get_violations(), {})
+
+        # Synced late from a device that was offline, it fills the gap between the two items
+        self.close_item("driving", 11, 14)
+
+        self.assertEqual(
+            self.get_violations(),
+            {
+                "driving-limit": self.day_start + timedelta(hours=17),
+                "rest-break": self.day_start + timedelta(hours=14),
+            },
+        )
+        state = DriverDutyState.objects.get(driver=self.driver)
+        self.assertEqual(state.shift_driving_seconds, 13 * 3600)
+        self.assertEqual(state.processed_until, self.day_start + timedelta(hours=19))
+
+    def test_cycle_limit_is_checked_as_of_each_item(self):
+        # 60 on-duty hours over the previous 7 days
+        for days_back in range(1, 8):
+            logbook_date = self.day - timedelta(days=days_back)
+            DailyDutyTotal.objects.create(
+                driver=self.driver, duty_date=logbook_date, on_duty_not_driving_seconds=60 * 3600 / 7
+            )
+        # Closed together, as when an item is split over days
+        logbook_items = LogbookItem.objects.bulk_create(
+            LogbookItem(
+                driver_logbook=self.logbook,
+                item_type="driving",
+                start_time=self.day_start + timedelta(hours=start_hour),
+                end_time=self.day_start + timedelta(hours=end_hour),
+            )
+            for start_hour, end_hour in ((6, 11), (14, 20))
+        )
+        update_daily_duty_totals(logbook_items)
+        evaluate_closed_logbook_items(logbook_items)
+
+        # The cycle is only exceeded by the second item, at 60 + 5 + 6 hours
+        violation = HosViolation.objects.get(driver=self.driver, rule="cycle-limit")
+        self.assertEqual(violation.logbook_item, logbook_items[1])
+
+    def test_cycle_limit_is_checked_over_logbook_days(self):
+        DailyDutyTotal.objects.create(
+            driver=self.driver, duty_date=self.day - timedelta(days=7), on_duty_not_driving_seconds=60 * 3600
+        )
+        # Ends at 22:30 UTC, already the next day in local time but still on this logbook day
+        utc_day_start = datetime.combine(self.day, datetime.min.time(), tzinfo=timezone.utc)
+        logbook_item = LogbookItem.objects.create(
+            driver_logbook=self.logbook, item_type="driving", start_time=utc_day_start + timedelta(hours=12)
+        )
+        close_logbook_item(logbook_item, utc_day_start + timedelta(hours=22, minutes=30))
+
+        self.assertTrue(HosViolation.objects.filter(driver=self.driver, rule="cycle-limit").exists())
+
+
+class DriverLogbooksDetailTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", password="password123")
+        self.carrier = Carrier.objects.create(name="Carrier 1", admin=self.admin)
+        self.driver = User.objects.create_user(email="driver@example.com", password="password123")
+        self.driver.carrier = self.carrier
+        self.driver.is_driver = True
+        self.driver.save()
+
+        self.first_day = date(2025, 4, 1)
+        for day_offset in range(10):
+            logbook_date = self.first_day + timedelta(days=day_offset)
+            day_start, _ = get_day_bounds(logbook_date)
+            driver_logbook = DriverLogbook.objects.create(driver=self.driver, logbook_date=logbook_date)
+            logbook_item = LogbookItem.objects.create(
+                driver_logbook=driver_logbook, item_type="driving", start_time=day_start + timedelta(hours=8)
+            )
+            close_logbook_item(logbook_item, day_start + timedelta(hours=10))
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def get_page(self, **extra):
+        payload = {
+            "driverId": self.driver.id,
+            "startDate": self.first_day,
+            "endDate": self.first_day + timedelta(days=9),
+            **extra,
+        }
+        return self.client.post("/api/v1/logbook/get-driver-logbooks-detail/", payload, format="json")
+
+    def test_pages_are_loaded_in_a_fixed_number_of_queries(self):
+        with self.assertNumQueries(3):
+            response = self.get_page(limit=4)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        logbooks_data = response.data["logbooks_data"]
+        self.assertEqual([logbook["logbook_date"] for logbook in logbooks_data][0], "2025-04-10")
+        self.assertEqual(len(logbooks_data), 4)
+        self.assertEqual(logbooks_data[0]["on_duty_hours"], 2)
+        self.assertEqual(logbooks_data[0]["on_duty_hours_last_eight_days"], 16)
+
+        with self.assertNumQueries(3):
+            response = self.get_page(limit=8)
+        self.assertEqual(len(response.data["logbooks_data"]), 8)
+
+    def test_cursor_returns_the_next_page(self):
+        first_page = self.get_page(limit=6)
+        second_page = self.get_page(limit=6, cursor=first_page.data["next_cursor"])
+
+        self.assertEqual(len(second_page.data["logbooks_data"]), 4)
+        self.assertEqual(second_page.data["logbooks_data"][0]["logbook_date"], "2025-04-04")
+        self.assertIsNone(second_page.data["next_cursor"])
+
+
+class CarrierTripsTests(QueryBudgetMixin, TestCase):
+    query_budgets = {"carrier_get_trips": 1}
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", password="password123")
+        self.carrier = Carrier.objects.create(name="Carrier 1", admin=self.admin)
+        self.admin.carrier = self.carrier
+        self.admin.save()
+        self.truck = Truck.objects.create(carrier=self.carrier, truck_number="T1", trailer_number="TR1")
+
+        self.trips = []
+        for index in range(7):
+            driver = User.objects.create_user(email=f"driver{index}@example.com", password="password123")
+            self.trips.append(
+                TripDetail.objects.create(
+                    carrier=self.carrier,
+                    current_location=TRIP_LOCATION,
+                    pickup_location=TRIP_LOCATION,
+                    dropoff_location=TRIP_LOCATION,
+                    cycle_used="10",
+                    # Two trips share each start date, the last one is not assigned yet
+                    trip_start_date=date(2025, 4, 1) + timedelta(days=index // 2) if index < 6 else None,
+                    is_done=index < 2,
+                    is_current=2 <= index < 6,
+                    driver=driver if index < 6 else None,
+                    truck=self.truck if index < 6 else None,
+                )
+            )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def get_trips(self, **params):
+        response = self.client.get("/api/v1/logbook/carrier-get-trips/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertWithinQueryBudget(response)
+        return response
+
+    def test_pages_follow_the_cursor_without_gaps(self):
+        trip_ids = []
+        cursor = None
+        while True:
+            response = self.get_trips(limit=2, **({"cursor": cursor} if cursor else {}))
+            trip_ids += [trip["id"] for trip in response.data["trips_data"]]
+            cursor = response.data["next_cursor"]
+            if not cursor:
+                break
+
+        expected_order = [self.trips[6]] + sorted(
+            self.trips[:6], key=lambda trip: (trip.trip_start_date, trip.id), reverse=True
+        )
+        self.assertEqual(trip_ids, [trip.id for trip in expected_order])
+        self.assertEqual(response.data["trips_data"][-1]["truck_number"], "T1 TR1")
+
+    def test_filters(self):
+        response = self.get_trips(tripStatus="done")
+        self.assertEqual({trip["id"] for trip in response.data["trips_data"]}, {self.trips[0].id, self.trips[1].id})
+
+        response = self.get_trips(driverId=self.trips[3].driver_id)
+        self.assertEqual([trip["id"] for trip in response.data["trips_data"]], [self.trips[3].id])
+
+        response = self.get_trips(startDate="2025-04-02", endDate="2025-04-02", truckId=self.truck.id)
+        self.assertEqual(len(response.data["trips_data"]), 2)
+
+    def test_unchanged_page_returns_304_within_budget(self):
+        etag = self.get_trips()["ETag"]
+
+        response = self.client.get("/api/v1/logbook/carrier-get-trips/", headers={"if_none_match": etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertWithinQueryBudget(response)
+
+        # Renaming a listed truck changes the page without bumping any trip's version
+        self.truck.truck_number = "T2"
+        self.truck.save()
+        response = self.client.get("/api/v1/logbook/carrier-get-trips/", headers={"if_none_match": etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class CarrierListTests(QueryBudgetMixin, TestCase):
+    query_budgets = {"maintain_carriers": 1}
+
+    def test_carriers_are_listed_within_budget(self):
+        for index in range(3):
+            admin = User.objects.create_user(email=f"admin{index}@example.com", password="password123")
+            Carrier.objects.create(name=f"Carrier {index}", admin=admin)
+        client = APIClient()
+        client.force_authenticate(user=admin)
+
+        response = client.get("/api/v1/logbook/maintain-carriers/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["carriers_data"]), 3)
+        self.assertWithinQueryBudget(response)
+
+
+class DriverSnapshotTests(QueryBudgetMixin, TestCase):
+    query_budgets = {"get_driver_snapshot": 2, "get_current_trip": 2}
+
+    def setUp(self):
+        self.truck = Truck.objects.create(truck_number="T1", trailer_number="TR1")
+        self.driver, self.trip = create_driver_trip(is_driver=True, truck=self.truck)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.driver)
+
+    def get_snapshot(self, **headers):
+        response = self.client.get("/api/v1/logbook/get-driver-snapshot/", headers=headers)
+        self.assertWithinQueryBudget(response)
+        return response
+
+    def test_snapshot_does_not_write(self):
+        response = self.get_snapshot()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["current_trip_data"]["id"], self.trip.id)
+        self.assertIsNone(response.data["driver_logbook_data"])
+        self.assertFalse(DriverLogbook.objects.exists())
+
+    def test_current_trip_does_not_write(self):
+        response = self.client.get("/api/v1/logbook/get-current-trip/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["current_trip_data"]["id"], self.trip.id)
+        self.assertIsNone(response.data["driver_logbook_data"])
+        self.assertFalse(DriverLogbook.objects.exists())
+        self.assertWithinQueryBudget(response)
+
+    def test_unchanged_snapshot_returns_304(self):
+        etag = self.get_snapshot()["ETag"]
+
+        response = self.get_snapshot(if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        response = self.client.post(
+            "/api/v1/logbook/change-status/",
+            {"currentLogbookItemId": None, "item_type": "driving", "remarks": "Leaving the depot", "is_current": True},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # The logbook created by the status change takes the truck of the current trip
+        self.assertEqual(DriverLogbook.objects.get(driver=self.driver).truck, self.truck)
+
+        response = self.get_snapshot(if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["current_logbook_item_data"]["item_type_name"], "Driving")
+        self.assertIsNotNone(response.data["driver_logbook_data"])
+
+
+class VersionEtagTests(TestCase):
+    def setUp(self):
+        self.driver, self.trip = create_driver_trip(is_driver=True)
+        self.driver.carrier = Carrier.objects.create(name="Carrier 1")
+        self.driver.save()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.driver)
+
+    def test_trip_summary_is_revalidated_from_its_version(self):
+        url = f"/api/v1/logbook/get-trip-summary/{self.trip.id}/"
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, headers={"if_none_match": etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.post(
+            "/api/v1/logbook/record-stop/",
+            {
+                "trip_detail": self.trip.id,
+                "stop_location": {"name": "Nakuru", "lat": -0.3, "lng": 36.07},
+                "stop_type": "fuel",
+                "start_time": "2025-04-01T10:00:00Z",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(url, headers={"if_none_match": etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["trip_summary_data"]["stops"]), 1)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_closed_logbook_detail_is_revalidated_from_its_version_and_recap(self):
+        day_start, _ = get_day_bounds(date(2025, 4, 2))
+        previous_logbook = DriverLogbook.objects.create(driver=self.driver, logbook_date=date(2025, 4, 1))
+        logbook = DriverLogbook.objects.create(driver=self.driver, logbook_date=date(2025, 4, 2))
+        update_daily_duty_totals(
+            [
+                LogbookItem.objects.create(
+                    driver_logbook=logbook,
+                    item_type="driving",
+                    start_time=day_start + timedelta(hours=8),
+                    end_time=day_start + timedelta(hours=10),
+                )
+            ]
+        )
+        url = f"/api/v1/logbook/get-logbook-detail/{logbook.id}/"
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, headers={"if_none_match": etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Driving the day before leaves the logbook's version alone but changes its recap
+        update_daily_duty_totals(
+            [
+                LogbookItem.objects.create(
+                    driver_logbook=previous_logbook,
+                    item_type="driving",
+                    start_time=day_start - timedelta(hours=4),
+                    end_time=day_start - timedelta(hours=1),
+                )
+            ]
+        )
+        response = self.client.get(url, headers={"if_none_match": etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["logbook_data"]["on_duty_hours_last_five_days"], 5)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_open_logbook_detail_is_not_revalidated(self):
+        response = self.client.post(
+            "/api/v1/logbook/change-status/",
+            {"currentLogbookItemId": None, "item_type": "driving", "remarks": "Start", "is_current": True},
+            format="json",
+        )
+        url = f"/api/v1/logbook/get-logbook-detail/{response.data['driver_logbook_data']['id']}/"
+
+        response = self.client.get(url, headers={"if_none_match": "*"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("ETag", response)
+
+
+class PolylineTests(TestCase):
+    def test_encodes_the_reference_polyline(self):
+        points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+
+        self.assertEqual(encode_polyline(points), "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+        self.assertEqual(decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@"), [list(point) for point in points])
+
+    def test_round_trips_at_the_given_precision(self):
+        points = [[51.4778, -0.0015], [51.47781, -0.00149], [-33.8688, 151.2093]]
+
+        self.assertEqual(decode_polyline(encode_polyline(points, precision=6), precision=6), points)
+        self.assertEqual(encode_polyline([]), "")
+        self.assertEqual(decode_polyline(""), [])
+
+
+class CountingRouteProvider(StraightLineProvider):
+    """Straight line provider that counts how many routes it computed."""
+
+    routed = 0
+
+    def get_route(self, waypoints):
+        CountingRouteProvider.routed += 1
+        return super().get_route(waypoints)
+
+
+class FailingRouteProvider(StraightLineProvider):
+    def get_route(self, waypoints):
+        raise RouteProviderError("Unavailable")
+
+
+@override_settings(ROUTE_PROVIDER="logbook.tests.CountingRouteProvider")
+class TripRouteGeometryTests(TestCase):
+    def setUp(self):
+        CountingRouteProvider.routed = 0
+        self.driver, self.trip = create_driver_trip(
+            pickup_location={"name": "Nakuru", "coords": {"lat": -0.3, "lng": 36.07}},
+            dropoff_location={"name": "Eldoret", "coords": {"lat": 0.51, "lng": 35.27}},
+        )
+        for hour, (lat, lng) in enumerate([(-1.29, 36.82), (-0.3, 36.07)]):
+            self.add_stop(lat, lng, hour)
+        self.url = f"/api/v1/logbook/get-trip-route/{self.trip.id}/"
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.driver)
+
+    def add_stop(self, lat, lng, hour):
+        StopRest.objects.create(
+            trip_detail=self.trip,
+            stop_location={"name": "Stop", "coords": {"lat": lat, "lng": lng}},
+            stop_type="fuel",
+            start_time=f"2025-04-01T{hour:02d}:00:00Z",
+        )
+
+    def test_route_is_computed_once_and_served_from_storage(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["route_map_data"]["route"], [[-1.29, 36.82], [-0.3, 36.07]])
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["route_map_data"]["route"], [[-1.29, 36.82], [-0.3, 36.07]])
+        self.assertEqual(CountingRouteProvider.routed, 1)
+        self.assertEqual(RouteGeometry.objects.get().provider, "straight-line")
+
+    def test_new_stop_replaces_the_stored_route(self):
+        self.client.get(self.url)
+        self.add_stop(0.51, 35.27, 2)
+
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data["route_map_data"]["route"]), 3)
+        self.assertEqual(CountingRouteProvider.routed, 2)
+        self.assertEqual(RouteGeometry.objects.filter(trip_detail=self.trip).count(), 1)
+
+    def test_planned_route_is_stored_separately(self):
+        self.client.get(self.url)
+        response = self.client.get(self.url, {"routeKind": "planned"})
+
+        self.assertEqual(len(response.data["route_map_data"]["route"]), 3)
+        self.assertEqual(RouteGeometry.objects.filter(trip_detail=self.trip).count(), 2)
+
+        response = self.client.get(self.url, {"routeKind": "unknown"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_polyline_encoding_is_opt_in(self):
+        response = self.client.get(self.url, {"encoding": "polyline"})
+        route_map_data = response.data["route_map_data"]
+
+        self.assertEqual(decode_polyline(route_map_data["route"]), [[-1.29, 36.82], [-0.3, 36.07]])
+        self.assertEqual(decode_polyline(route_map_data["trip_stops"]["polyline"]), [[-1.29, 36.82], [-0.3, 36.07]])
+        self.assertEqual(route_map_data["trip_stops"]["names"], ["Stop", "Stop"])
+        self.assertEqual(route_map_data["precision"], 5)
+
+        response = self.client.get(self.url, {"encoding": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(ROUTE_PROVIDER="logbook.tests.FailingRouteProvider")
+    def test_failed_route_is_not_revalidated(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["route_map_data"]["route"])
+        self.assertNotIn("ETag", response)
+        self.assertFalse(RouteGeometry.objects.exists())
+
+
+class BreadcrumbIngestTests(QueryBudgetMixin, TestCase):
+    query_budgets = {"record_breadcrumbs": 7}
+
+    def setUp(self):
+        self.driver, self.trip = create_driver_trip()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.driver)
+
+    def post_points(self, seconds):
+        points = [
+            {"lat": -1.29 + second / 1000, "lng": 36.82, "recordedAt": f"2025-04-01T10:00:{second:02d}Z", "speed": 20}
+            for second in seconds
+        ]
+        return self.client.post("/api/v1/logbook/record-breadcrumbs/", {"points": points}, format="json")
+
+    def test_batch_is_recorded_on_the_current_trip(self):
+        response = self.post_points(range(30))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["recorded"], 30)
+        self.assertEqual(Breadcrumb.objects.filter(trip_detail=self.trip, driver=self.driver).count(), 30)
+
+        # Once the day's logbook exists, a batch adds its mileage without looking the logbook up
+        response = self.post_points(range(30, 60))
+        self.assertEqual(response.data["recorded"], 30)
+        self.assertWithinQueryBudget(response)
+
+    def test_positions_only_change_the_track_version(self):
+        summary_url = f"/api/v1/logbook/get-trip-summary/{self.trip.id}/"
+        route_url = f"/api/v1/logbook/get-trip-route/{self.trip.id}/"
+        self.post_points(range(3))
+        summary_etag = self.client.get(summary_url)["ETag"]
+        track_etag = self.client.get(route_url, {"routeKind": "track"})["ETag"]
+
+        self.post_points(range(3, 6))
+        response = self.client.get(summary_url, headers={"if_none_match": summary_etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(route_url, {"routeKind": "track"}, headers={"if_none_match": track_etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["route_map_data"]["route"]), 6)
+
+    def test_resent_points_are_dropped_by_timestamp(self):
+        self.post_points(range(10))
+        response = self.post_points([5, 5, 9, 10, 11])
+
+        self.assertEqual(response.data["received"], 5)
+        self.assertEqual(response.data["recorded"], 2)
+        self.assertEqual(Breadcrumb.objects.count(), 12)
+
+    def test_invalid_batches_are_rejected(self):
+        response = self.client.post(
+            "/api/v1/logbook/record-breadcrumbs/",
+            {"points": [{"lat": 95, "lng": 36.82, "recordedAt": "2025-04-01T10:00:00Z"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post("/api/v1/logbook/record-breadcrumbs/", {"points": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.trip.is_current = False
+        self.trip.save()
+        response = self.post_points(range(3))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Breadcrumb.objects.exists())
+
+
+class TrackSimplificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.driver, self.trip = create_driver_trip(is_current=False, is_done=True)
+        # A straight track heading north, about 11 m between positions, with one 1.1 km detour in the middle
+        Breadcrumb.objects.bulk_create(
+            Breadcrumb(
+                trip_detail=self.trip,
+                driver=self.driver,
+                recorded_at=datetime(2025, 4, 1, 10, tzinfo=timezone.utc) + timedelta(seconds=index),
+                latitude=-1.29 + index * 0.0001,
+                longitude=36.82 + (0.01 if index == 500 else 0),
+            )
+            for index in range(1001)
+        )
+        self.url = f"/api/v1/logbook/get-trip-route/{self.trip.id}/"
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.driver)
+
+    def test_collinear_points_are_dropped(self):
+        points = [[0, index * 0.001] for index in range(100)]
+
+        self.assertEqual(simplify_track(points, 1), [[0, 0], [0, 0.099]])
+        self.assertEqual(simplify_track(points, 0), points)
+
+    def test_points_beyond_the_tolerance_are_kept(self):
+        points = [[0, 0], [0.001, 0.0005], [0, 0.001]]
+
+        self.assertEqual(simplify_track(points, 100), points)
+        self.assertEqual(simplify_track(points, 200), [[0, 0], [0, 0.001]])
+        self.assertAlmostEqual(get_zoom_tolerance(12), 38.22, places=2)
+
+    def test_track_is_simplified_to_the_requested_zoom(self):
+        response = self.client.get(self.url, {"routeKind": "track"})
+        self.assertEqual(len(response.data["route_map_data"]["route"]), 1001)
+
+        response = self.client.get(self.url, {"routeKind": "track", "zoom": 12})
+        self.assertEqual(len(response.data["route_map_data"]["route"]), 5)
+        response = self.client.get(self.url, {"routeKind": "track", "tolerance": 2000})
+        self.assertEqual(len(response.data["route_map_data"]["route"]), 2)
+
+        response = self.client.get(self.url, {"routeKind": "track", "zoom": "far"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_levels_of_a_finished_trip_are_computed_once(self):
+        self.client.get(self.url, {"routeKind": "track", "zoom": 12})
+
+        # Only the version lookups, trip and stops are read, the track itself comes from the cache
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url, {"routeKind": "track", "zoom": 3})
+        # At the coarsest level the detour is smaller than a pixel
+        self.assertEqual(len(response.data["route_map_data"]["route"]), 2)
+
+
+class ProximitySearchTests(TestCase):
+    def setUp(self):
+        self.carrier = Carrier.objects.create(name="Carrier 1")
+        self.admin = User.objects.create_user(email="admin@example.com", password="password123")
+        self.admin.carrier = self.carrier
+        self.admin.save()
+        self.trip = self.create_trip(self.carrier, (-1.29, 36.82), (-0.3, 36.07))
+        # Stops about 1 km, 5 km and 100 km north of the yard at -1.29, 36.82
+        for lat in (-1.281, -1.245, -0.39):
+            self.create_stop(self.trip, lat, 36.82)
+        other_trip = self.create_trip(Carrier.objects.create(name="Carrier 2"), (-1.29, 36.82), (-1.29, 36.82))
+        self.create_stop(other_trip, -1.29, 36.82)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def create_trip(self, carrier, pickup, dropoff):
+        return TripDetail.objects.create(
+            carrier=carrier,
+            current_location={"name": "Yard", "coords": {"lat": pickup[0], "lng": pickup[1]}},
+            pickup_location={"name": "Pickup", "coords": {"lat": pickup[0], "lng": pickup[1]}},
+            dropoff_location={"name": "Dropoff", "coords": {"lat": dropoff[0], "lng": dropoff[1]}},
+            cycle_used="10",
+            trip_start_date=date(2025, 4, 1),
+        )
+
+    def create_stop(self, trip, lat, lng):
+        return StopRest.objects.create(
+            trip_detail=trip,
+            stop_location={"name": "Stop", "coords": {"lat": lat, "lng": lng}},
+            stop_type="fuel",
+            start_time="2025-04-01T10:00:00Z",
+        )
+
+    def test_coordinates_are_synced_on_save(self):
+        stop = StopRest.objects.filter(trip_detail=self.trip).first()
+        self.assertEqual((stop.latitude, stop.longitude), (-1.281, 36.82))
+        self.assertEqual(stop.grid_cell, get_grid_cell(-1.281, 36.82))
+
+        self.trip.dropoff_location = {"name": "Unknown"}
+        self.trip.save()
+        self.trip.refresh_from_db()
+        self.assertEqual((self.trip.pickup_latitude, self.trip.dropoff_latitude), (-1.29, None))
+
+    def test_stops_are_found_within_a_radius_nearest_first(self):
+        response = self.client.get(
+            "/api/v1/logbook/search-carrier-stops/", {"lat": -1.29, "lng": 36.82, "radiusKm": 10}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stops_data = response.data["stops_data"]
+        self.assertEqual([stop["stop_location"]["coords"]["lat"] for stop in stops_data], [-1.281, -1.245])
+        self.assertAlmostEqual(stops_data[0]["distance_km"], 1.0, places=1)
+
+    def test_stops_are_found_within_a_bounding_box(self):
+        response = self.client.get(
+            "/api/v1/logbook/search-carrier-stops/",
+            {"minLat": -1.3, "minLng": 36.7, "maxLat": -0.35, "maxLng": 36.9},
+        )
+        self.assertEqual(len(response.data["stops_data"]), 3)
+
+        response = self.client.get(
+            "/api/v1/logbook/search-carrier-stops/", {"minLat": -10, "minLng": 30, "maxLat": 0, "maxLng": 40}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_trips_are_found_by_location_type(self):
+        response = self.client.get(
+            "/api/v1/logbook/search-carrier-trips/",
+            {"lat": -0.3, "lng": 36.07, "radiusKm": 5, "locationType": "dropoff"},
+        )
+        self.assertEqual([trip["id"] for trip in response.data["trips_data"]], [self.trip.id])
+
+        response = self.client.get("/api/v1/logbook/search-carrier-trips/", {"lat": -0.3, "lng": 36.07, "radiusKm": 5})
+        self.assertEqual(response.data["trips_data"], [])
+
+    def test_backfill_fills_the_coordinate_columns(self):
+        StopRest.objects.update(latitude=None, longitude=None, grid_cell=None)
+        TripDetail.objects.update(pickup_latitude=None, pickup_grid_cell=None)
+
+        backfill_migration = import_module("logbook.migrations.0016_backfill_location_coordinates")
+        backfill_migration.backfill_location_coordinates(apps, None, chunk_size=2)
+
+        self.assertFalse(StopRest.objects.filter(grid_cell__isnull=True).exists())
+        self.assertEqual(TripDetail.objects.get(id=self.trip.id).pickup_grid_cell, get_grid_cell(-1.29, 36.82))
+
+
+class GpsMileageTests(TestCase):
+    def setUp(self):
+        self.driver, self.trip = create_driver_trip(is_driver=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.driver)
+        # Each position is 0.01 degrees of latitude (about 1.11 km) north of the previous one
+        self.step_miles = 2 * 6_371_000 * math.sin(math.radians(0.01) / 2) / METERS_PER_MILE
+
+    def post_points(self, minutes):
+        points = [
+            {"lat": minute / 100, "lng": 36.82, "recordedAt": f"2025-04-01T10:{minute:02d}:00Z"} for minute in minutes
+        ]
+        return self.client.post("/api/v1/logbook/record-breadcrumbs/", {"points": points}, format="json")
+
+    def get_gps_miles_driven(self):
+        return DriverLogbook.objects.get(driver=self.driver, logbook_date=date(2025, 4, 1)).gps_miles_driven
+
+    def test_mileage_is_added_as_positions_arrive(self):
+        self.post_points(range(0, 10))
+        self.assertAlmostEqual(self.get_gps_miles_driven(), 9 * self.step_miles)
+
+        # The segment joining the two batches is counted once
+        self.post_points(range(10, 20))
+        self.assertAlmostEqual(self.get_gps_miles_driven(), 19 * self.step_miles)
+
+    def test_jitter_around_a_parked_truck_is_not_counted(self):
+        # Ten positions about 2 m apart while parked, then one 1.11 km north
+        points = [
+            {
+                "lat": 0.00002 * (minute % 2),
+                "lng": 36.82,
+                "recordedAt": f"2025-04-01T10:{minute:02d}:00Z",
+                "accuracy": 8,
+            }
+            for minute in range(11)
+        ]
+        points[-1]["lat"] = 0.01
+        self.client.post("/api/v1/logbook/record-breadcrumbs/", {"points": points}, format="json")
+        self.assertAlmostEqual(self.get_gps_miles_driven(), self.step_miles)
+
+        call_command("recompute_gps_mileage", "--date", "2025-04-01", stdout=StringIO())
+        self.assertAlmostEqual(self.get_gps_miles_driven(), self.step_miles)
+
+    def test_positions_out_of_order_recompute_the_day(self):
+        self.post_points([0, 1, 5, 6])
+        self.post_points([2, 3, 4])
+
+        self.assertAlmostEqual(self.get_gps_miles_driven(), 6 * self.step_miles)
+
+    def test_recompute_command_matches_the_running_total(self):
+        self.post_points(range(0, 30, 3))
+        DriverLogbook.objects.update(gps_miles_driven=0)
+
+        call_command("recompute_gps_mileage", "--date", "2025-04-01", stdout=StringIO())
+
+        self.assertAlmostEqual(self.get_gps_miles_driven(), 9 * 3 * self.step_miles)
+
+    def test_mileage_lands_on_the_utc_logbook_day(self):
+        # After 21:00 UTC it is already the next day in local time, but still the same logbook day
+        for minutes in (range(0, 10), range(10, 20)):
+            points = [
+                {"lat": minute / 100, "lng": 36.82, "recordedAt": f"2025-04-01T22:{minute:02d}:00Z"}
+                for minute in minutes
+            ]
+            self.client.post("/api/v1/logbook/record-breadcrumbs/", {"points": points}, format="json")
+
+        self.assertEqual(list(DriverLogbook.objects.values_list("logbook_date", flat=True)), [date(2025, 4, 1)])
+        self.assertAlmostEqual(self.get_gps_miles_driven(), 19 * self.step_miles)
+        # The mileage is not part of the logbook detail, so its version is left alone
+        self.assertEqual(DriverLogbook.objects.get().version, 1)
+
+    def test_recompute_creates_missing_logbooks_with_the_current_truck(self):
+        truck = Truck.objects.create(truck_number="KAA 1", trailer_number="ZA 1", carrier=self.trip.carrier)
+        TripDetail.objects.filter(id=self.trip.id).update(truck=truck)
+        self.post_points(range(0, 10))
+        DriverLogbook.objects.all().delete()
+
+        call_command("recompute_gps_mileage", "--date", "2025-04-01", stdout=StringIO())
+
+        driver_logbook = DriverLogbook.objects.get(driver=self.driver, logbook_date=date(2025, 4, 1))
+        self.assertEqual(driver_logbook.truck_id, truck.id)
+        self.assertAlmostEqual(driver_logbook.gps_miles_driven, 9 * self.step_miles)
+
+
+class CountingGazetteerBackend(GazetteerBackend):
+    """Gazetteer backend that counts how many points it resolved."""
+
+    resolved = 0
+
+    def resolve(self, lat, lng):
+        CountingGazetteerBackend.resolved += 1
+        return super().resolve(lat, lng)
+
+
+@override_settings(PLACE_NAME_BACKEND="logbook.tests.CountingGazetteerBackend")
+class PlaceNameTests(TestCase):
+    def setUp(self):
+        CountingGazetteerBackend.resolved = 0
+        cache.clear()
+        self.gazetteer_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.gazetteer_dir)
+        gazetteer_path = os.path.join(self.gazetteer_dir, "gazetteer.csv")
+        with open(gazetteer_path, "w", newline="", encoding="utf-8") as gazetteer_file:
+            writer = csv.writer(gazetteer_file)
+            writer.writerow(["name", "lat", "lng"])
+            writer.writerow(["Nairobi Yard", -1.29, 36.82])
+            writer.writerow(["Nakuru Truck Stop", -0.3, 36.07])
+        settings_override = override_settings(GAZETTEER_PATH=gazetteer_path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        load_gazetteer.cache_clear()
+
+        self.driver, self.trip = create_driver_trip(
+            pickup_location={"name": "Nakuru", "coords": {"lat": -0.3, "lng": 36.07}},
+            dropoff_location={"name": "Eldoret", "coords": {"lat": 0.51, "lng": 35.27}},
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.driver)
+
+    def test_nearby_points_are_resolved_once(self):
+        self.assertEqual(resolve_place_name(-1.2901, 36.8202), "Nairobi Yard")
+        self.assertEqual(resolve_place_name(-1.29004, 36.81996), "Nairobi Yard")
+        self.assertEqual(CountingGazetteerBackend.resolved, 1)
+
+        # Another process only finds the stored name
+        cache.clear()
+        self.assertEqual(resolve_place_name(-1.29, 36.82), "Nairobi Yard")
+        self.assertEqual(CountingGazetteerBackend.resolved, 1)
+        self.assertEqual(PlaceName.objects.get().provider, "gazetteer")
+
+        # Places far from every gazetteer entry stay unnamed, and are asked again next time
+        self.assertIsNone(resolve_place_name(10, 10))
+        self.assertIsNone(resolve_place_name(10, 10))
+        self.assertEqual(CountingGazetteerBackend.resolved, 3)
+
+    def test_deleted_names_are_resolved_again(self):
+        self.assertEqual(resolve_place_name(-1.29, 36.82), "Nairobi Yard")
+        PlaceName.objects.all().delete()
+
+        self.assertEqual(resolve_place_name(-1.29, 36.82), "Nairobi Yard")
+        self.assertEqual(CountingGazetteerBackend.resolved, 2)
+
+    def record_stop(self, name):
+        response = self.client.post(
+            "/api/v1/logbook/record-stop/",
+            {
+                "trip_detail": self.trip.id,
+                "stop_location": {"name": name, "coords": {"lat": -0.3001, "lng": 36.0702}},
+                "stop_type": "fuel",
+                "start_time": "2025-04-01T10:00:00Z",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_unnamed_stop_is_named_after_it_is_committed(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.record_stop("Unknown Location")
+        # The backend is not asked while the stop is being saved
+        self.assertEqual(CountingGazetteerBackend.resolved, 0)
+        self.assertEqual(StopRest.objects.get().stop_location["name"], "Unknown Location")
+
+        version = TripDetail.objects.get(id=self.trip.id).version
+        for callback in callbacks:
+            callback()
+        self.assertEqual(StopRest.objects.get().stop_location["name"], "Nakuru Truck Stop")
+        self.assertEqual(TripDetail.objects.get(id=self.trip.id).version, version + 1)
+
+        # A stop the app named keeps its name
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record_stop("Fuel at the yard")
+        self.assertEqual(StopRest.objects.latest("id").stop_location["name"], "Fuel at the yard")
+        self.assertEqual(CountingGazetteerBackend.resolved, 1)
+
+    def test_place_name_endpoint(self):
+        response = self.client.get("/api/v1/logbook/get-place-name/", {"lat": -0.3, "lng": 36.07})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["name"], "Nakuru Truck Stop")
+
+        response = self.client.get("/api/v1/logbook/get-place-name/", {"lat": 91, "lng": 36.07})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FleetPositionTests(QueryBudgetMixin, TestCase):
+    query_budgets = {"get_carrier_fleet_positions": 2}
+
+    def setUp(self):
+        fleet_positions.clear()
+        self.carrier = Carrier.objects.create(name="Carrier 1")
+        self.admin = User.objects.create_user(email="admin@example.com", password="password123")
+        self.admin.carrier = self.carrier
+        self.admin.save()
+        self.drivers, self.trips = [], []
+        for index, carrier in enumerate([self.carrier, self.carrier, Carrier.objects.create(name="Carrier 2")]):
+            driver = User.objects.create_user(email=f"driver{index}@example.com", password="password123")
+            truck = Truck.objects.create(truck_number=f"KAA {index}", trailer_number=f"ZA {index}", carrier=carrier)
+            self.trips.append(
+                TripDetail.objects.create(
+                    carrier=carrier,
+                    current_location=TRIP_LOCATION,
+                    pickup_location=TRIP_LOCATION,
+                    dropoff_location=TRIP_LOCATION,
+                    cycle_used="10",
+                    trip_start_date=date(2025, 4, 1),
+                    is_current=True,
+                    driver=driver,
+                    truck=truck,
+                )
+            )
+            self.drivers.append(driver)
+        self.client = APIClient()
+
+    def post_position(self, driver, lat, second):
+        self.client.force_authenticate(user=driver)
+        point = {"lat": lat, "lng": 36.82, "recordedAt": f"2025-04-01T10:00:{second:02d}Z"}
+        return self.client.post("/api/v1/logbook/record-breadcrumbs/", {"points": [point]}, format="json")
+
+    def get_positions(self, params=None):
+        self.client.force_authenticate(user=self.admin)
+        return self.client.get("/api/v1/logbook/get-carrier-fleet-positions/", params or {})
+
+    def test_latest_positions_are_rebuilt_then_served_from_memory(self):
+        for second, lat in enumerate([-1.29, -1.2, -1.1]):
+            self.post_position(self.drivers[0], lat, second)
+        self.post_position(self.drivers[1], 0.5, 0)
+        self.post_position(self.drivers[2], -1.29, 0)
+
+        response = self.get_positions()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        positions = response.data["positions_data"]
+        self.assertEqual([position["truck_number"] for position in positions], ["KAA 0", "KAA 1"])
+        self.assertEqual(positions[0]["lat"], -1.1)
+
+        # New positions move the trucks without rebuilding
+        self.post_position(self.drivers[0], -1.0, 10)
+        response = self.get_positions()
+        self.assertWithinQueryBudget(response)
+        self.assertEqual(response.data["positions_data"][0]["lat"], -1.0)
+
+    def test_positions_committed_out_of_order_are_picked_up(self):
+        self.post_position(self.drivers[0], -1.29, 0)
+        self.post_position(self.drivers[0], -1.2, 2)
+        earlier_id = Breadcrumb.objects.order_by("id").first().id
+        Breadcrumb.objects.filter(id=earlier_id).delete()
+        self.get_positions()
+
+        # A position whose row id was taken before the last read, but committed after it
+        Breadcrumb.objects.create(
+            id=earlier_id,
+            trip_detail=self.trips[1],
+            driver=self.drivers[1],
+            recorded_at=datetime(2025, 4, 1, 10, 0, 1, tzinfo=timezone.utc),
+            latitude=0.5,
+            longitude=36.82,
+        )
+        response = self.get_positions()
+        self.assertEqual(
+            [position["driver_id"] for position in response.data["positions_data"]],
+            [self.drivers[0].id, self.drivers[1].id],
+        )
+
+    def test_positions_are_only_recorded_once_committed(self):
+        self.post_position(self.drivers[0], -1.29, 0)
+        self.get_positions()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.post_position(self.drivers[0], -1.0, 10)
+        self.assertEqual(fleet_positions.positions[self.drivers[0].id]["lat"], -1.29)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(fleet_positions.positions[self.drivers[0].id]["lat"], -1.0)
+
+    def test_positions_are_filtered_by_bounding_box(self):
+        self.post_position(self.drivers[0], -1.29, 0)
+        self.post_position(self.drivers[1], 0.5, 0)
+
+        response = self.get_positions({"minLat": -2, "minLng": 36, "maxLat": 0, "maxLng": 37})
+        self.assertEqual([position["driver_id"] for position in response.data["positions_data"]], [self.drivers[0].id])
+
+        response = self.get_positions({"minLat": -2, "minLng": 36})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ended_trips_leave_the_fleet(self):
+        self.post_position(self.drivers[0], -1.29, 0)
+        self.post_position(self.drivers[1], 0.5, 0)
+        self.get_positions()
+
+        # The trip may end in another process, which this one only learns from the database
+        TripDetail.objects.filter(id=self.trips[1].id).update(is_current=False)
+        response = self.get_positions()
+        self.assertEqual([position["driver_id"] for position in response.data["positions_data"]], [self.drivers[0].id])
+
+
+class DriverOperationSyncTests(TestCase):
+    def setUp(self):
+        self.driver, self.trip = create_driver_trip(is_driver=True)
+        # Times the operations were queued at on the device, while it was offline
+        self.times = [datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=hours) for hours in (3, 2, 1)]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.driver)
+
+    def sync(self, operations, keys=()):
+        operations = [
+            {"type": operation_type, "recordedAt": recorded_at.isoformat(), "data": data}
+            for operation_type, recorded_at, data in operations
+        ]
+        for operation, key in zip(operations, keys):
+            operation["idempotencyKey"] = key
+        return self.client.post("/api/v1/logbook/sync-driver-operations/", {"operations": operations}, format="json")
+
+    def test_operations_are_applied_at_their_device_times(self):
+        response = self.sync(
+            [
+                ("change_status", self.times[0], {"item_type": "driving", "remarks": "Leaving the yard"}),
+                (
+                    "record_stop",
+                    self.times[1],
+                    {"stop_location": {"name": "Stop", "coords": {"lat": -1.0, "lng": 36.5}}, "stop_type": "fuel"},
+                ),
+                ("change_status", self.times[2], {"item_type": "on-duty-not-driving", "remarks": "Unloading"}),
+                ("record_mileage_covered_today", self.times[2], {"total_miles_driving_today": 120}),
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["applied"], 4)
+        self.assertEqual(response.data["current_logbook_item_data"]["item_type_name"], "On Duty (not driving)")
+
+        first_item = LogbookItem.objects.get(start_time=self.times[0])
+        self.assertFalse(first_item.is_current)
+        current_item = LogbookItem.objects.get(is_current=True)
+        self.assertEqual(current_item.start_time, self.times[2])
+        stop = StopRest.objects.get()
+        self.assertEqual((stop.trip_detail_id, stop.end_time), (self.trip.id, self.times[1]))
+        driver_logbook = DriverLogbook.objects.get(logbook_date=self.times[2].date())
+        self.assertEqual(driver_logbook.mileage_covered_today, 120)
+
+    def test_failed_operation_rolls_back_the_batch(self):
+        response = self.sync(
+            [
+                ("change_status", self.times[0], {"item_type": "driving"}),
+                ("change_status", self.times[1], {"item_type": "flying"}),
+            ]
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["failed_operation_index"], 1)
+        self.assertFalse(LogbookItem.objects.exists())
+
+        self.sync([("change_status", self.times[1], {"item_type": "driving"})])
+        response = self.sync([("change_status", self.times[0], {"item_type": "off-duty"})])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.sync(
+            [("change_status", datetime.now(timezone.utc) + timedelta(hours=1), {"item_type": "off-duty"})]
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(LogbookItem.objects.count(), 1)
+
+    def test_operations_already_applied_under_their_key_are_skipped(self):
+        # Applied online, but the response was lost so the app queued it with the same key
+        self.client.post(
+            "/api/v1/logbook/record-mileage-covered-today/",
+            {"total_miles_driving_today": 50, "mileage_covered_today": 50},
+            format="json",
+            headers={"Idempotency-Key": "mileage-1"},
+        )
+        stop = {"stop_location": {"name": "Stop", "coords": {"lat": -1.0, "lng": 36.5}}, "stop_type": "fuel"}
+        operations = [
+            ("record_mileage_covered_today", self.times[2], {"total_miles_driving_today": 50}),
+            ("record_stop", self.times[1], stop),
+            ("record_stop", self.times[1], stop),
+        ]
+
+        response = self.sync(operations, keys=["mileage-1", "stop-1", "stop-1"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["applied"], 1)
+        self.assertEqual(StopRest.objects.count(), 1)
+
+        # The whole batch sent again after its response was lost
+        response = self.sync(operations, keys=["mileage-1", "stop-1", "stop-1"])
+        self.assertEqual(response.data["applied"], 0)
+        self.assertEqual(StopRest.objects.count(), 1)
+
+        response = self.sync(operations[1:], keys=["x" * 256])
+        self.assertEqual(response.data["failed_operation_index"], 0)
+
+    def test_backdated_status_changes_are_evaluated_again(self):
+        # The state was already evaluated past the times the device was offline at
+        shift_start = datetime(2025, 4, 1, 6, tzinfo=timezone.utc)
+        DriverDutyState.objects.create(
+            driver=self.driver,
+            shift_start=shift_start + timedelta(hours=13),
+            last_on_duty_end=shift_start + timedelta(hours=14),
+            processed_until=shift_start + timedelta(hours=14),
+        )
+
+        response = self.sync(
+            [
+                ("change_status", shift_start, {"item_type": "driving"}),
+                ("change_status", shift_start + timedelta(hours=12), {"item_type": "off-duty"}),
+            ]
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            HosViolation.objects.filter(driver=self.driver, rule="driving-limit", shift_start=shift_start).exists()
+        )
+        self.assertEqual(DriverDutyState.objects.get(driver=self.driver).shift_start, shift_start)
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.driver, self.trip = create_driver_trip()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.driver)
+
+    def change_status(self, key, item_type="driving"):
+        return self.client.post(
+            "/api/v1/logbook/change-status/",
+            {"item_type": item_type, "remarks": "Leaving the yard", "currentLogbookItemId": None, "is_current": True},
+            format="json",
+            headers={"Idempotency-Key": key},
+        )
+
+    def record_stop(self, key=None, stop_type="fuel"):
+        return self.client.post(
+            "/api/v1/logbook/record-stop/",
+            {
+                "trip_detail": self.trip.id,
+                "stop_location": {"name": "Nakuru", "coords": {"lat": -0.3, "lng": 36.07}},
+                "stop_type": stop_type,
+                "start_time": "2025-04-01T10:00:00Z",
+            },
+            format="json",
+            headers={"Idempotency-Key": key} if key else {},
+        )
+
+    def test_retried_request_replays_the_stored_response(self):
+        response = self.change_status("status-1")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with self.assertNumQueries(1):
+            retry = self.change_status("status-1")
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json(), response.json())
+        self.assertEqual(LogbookItem.objects.count(), 1)
+
+        self.record_stop("stop-1")
+        self.record_stop("stop-1")
+        self.assertEqual(StopRest.objects.count(), 1)
+
+        # Requests without a key, or with another one, are handled as usual
+        self.record_stop("stop-2")
+        self.record_stop()
+        self.assertEqual(StopRest.objects.count(), 3)
+
+    def test_key_reused_for_another_request_is_rejected(self):
+        self.change_status("status-1")
+
+        response = self.change_status("status-1", item_type="off-duty")
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(LogbookItem.objects.count(), 1)
+
+    def test_failed_request_is_not_stored(self):
+        response = self.change_status("status-1", item_type="flying")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_expired_keys_are_evicted(self):
+        self.change_status("status-1")
+        IdempotencyKey.objects.update(created_at=datetime.now(timezone.utc) - timedelta(days=2))
+
+        response = self.change_status("status-1")
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(LogbookItem.objects.count(), 2)
+
+        IdempotencyKey.objects.update(created_at=datetime.now(timezone.utc) - timedelta(days=2))
+        call_command("evict_idempotency_keys", stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class LogbookExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", password="password123")
+        self.carrier = Carrier.objects.create(name="Carrier 1", admin=self.admin)
+        self.admin.carrier = self.carrier
+        self.admin.save()
+        self.driver = User.objects.create_user(email="driver@example.com", password="password123")
+        self.driver.carrier = self.carrier
+        self.driver.driver_number = "DRV-1"
+        self.driver.save()
+
+        day_start, _ = get_day_bounds(date(2025, 4, 1))
+        driver_logbook = DriverLogbook.objects.create(driver=self.driver, logbook_date=date(2025, 4, 1))
+        LogbookItem.objects.create(
+            driver_logbook=driver_logbook,
+            item_type="driving",
+            start_time=day_start,
+            end_time=day_start + timedelta(hours=2),
+            remarks='Loaded at "Dock 4", Nairobi',
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def export(self, export_format):
+        response = self.client.get(
+            "/api/v1/logbook/export-carrier-logbook-items/",
+            {"startDate": "2025-04-01", "endDate": "2025-06-30", "exportFormat": export_format},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_export(self):
+        rows = [json.loads(line) for line in self.export("ndjson").splitlines()]
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["driver_number"], "DRV-1")
+        self.assertEqual(rows[0]["logbook_date"], "2025-04-01")
+        self.assertEqual(rows[0]["remarks"], 'Loaded at "Dock 4", Nairobi')
+
+    def test_csv_export(self):
+        rows = list(csv.DictReader(StringIO(self.export("csv"))))
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["item_type"], "driving")
+        self.assertEqual(rows[0]["remarks"], 'Loaded at "Dock 4", Nairobi')
+
+    def test_invalid_dates_are_rejected(self):
+        for params in ({"endDate": "2025-06-30"}, {"startDate": "2025-04-01", "endDate": "June"}):
+            response = self.client.get("/api/v1/logbook/export-carrier-logbook-items/", params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class LogSheetRenderTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.settings_override = self.settings(LOG_SHEET_CACHE_DIR=self.cache_dir)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.admin = User.objects.create_user(email="admin@example.com", password="password123")
+        self.carrier = Carrier.objects.create(name="Carrier 1", admin=self.admin)
+        self.driver = User.objects.create_user(email="driver@example.com", password="password123")
+        self.driver.carrier = self.carrier
+        self.driver.save()
+
+        day_start, _ = get_day_bounds(date(2025, 4, 1))
+        self.logbook = DriverLogbook.objects.create(driver=self.driver, logbook_date=date(2025, 4, 1))
+        self.logbook_item = LogbookItem.objects.create(
+            driver_logbook=self.logbook,
+            item_type="driving",
+            start_time=day_start + timedelta(hours=6),
+            end_time=day_start + timedelta(hours=9),
+            remarks="Fuel stop <Mombasa Rd>",
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def get_sheet(self):
+        response = self.client.get(f"/api/v1/logbook/get-logbook-sheet/{self.logbook.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.content.decode()
+
+    def test_unchanged_sheet_is_served_from_cache(self):
+        svg = self.get_sheet()
+        self.assertIn("Fuel stop &lt;Mombasa Rd&gt;", svg)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        with patch("logbook.log_sheet.render_log_sheet_svg") as render_log_sheet_svg:
+            self.assertEqual(self.get_sheet(), svg)
+        render_log_sheet_svg.assert_not_called()
+
+    def test_changed_sheet_replaces_cached_version(self):
+        self.get_sheet()
+        self.logbook_item.remarks = "Weigh station"
+        self.logbook_item.save()
+        bump_versions(DriverLogbook, [self.logbook.id])
+
+        self.assertIn("Weigh station", self.get_sheet())
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_sheet_with_an_item_in_progress_is_not_cached(self):
+        LogbookItem.objects.create(
+            driver_logbook=self.logbook,
+            item_type="on-duty-not-driving",
+            start_time=self.logbook_item.end_time,
+            is_current=True,
+        )
+
+        self.get_sheet()
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_sheets_for_a_date_range_are_combined(self):
+        response = self.client.post(
+            "/api/v1/logbook/get-driver-logbook-sheets/",
+            {"driverId": self.driver.id, "startDate": "2025-04-01", "endDate": "2025-04-30"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content.decode().count("<svg"), 1)
@@ -1,3 +1,4 @@
+import sys
 from pathlib import Path
 from decouple import config
 
@@ -54,8 +55,23 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",  # Manages authentication
     "django.contrib.messages.middleware.MessageMiddleware",  # Manages messaging framework
     "django.middleware.clickjacking.XFrameOptionsMiddleware",  # Prevents clickjacking
+    "core.middleware.RequestInstrumentationMiddleware",  # Records query count, DB and serialization time of API calls
 ]
 
+REQUEST_INSTRUMENTATION_PATH_PREFIX = "/api/v1/"  # Requests under this path are instrumented
+
+# Logs one line per instrumented API request to the console
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {"core.requests": {"handlers": ["console"], "level": "INFO", "propagate": False}},
+}
+
+# Keep the console quiet while the test suite runs, tests check the request lines they need with assertLogs
+if sys.argv[1:2] == ["test"]:
+    LOGGING["loggers"]["core.requests"]["level"] = "WARNING"
+
 ROOT_URLCONF = "logbook_manager.urls"  # Root URL configuration for the project
 
 TEMPLATES = [
@@ -142,6 +158,34 @@ STATIC_URL = "static/"  # URL for serving static files
 STATICFILES_DIRS = [BASE_DIR / "build/static"]  # Directories for static files in the build folder
 STATIC_ROOT = BASE_DIR / "static"  # Directory for collecting static files during deployment
 
+LOG_SHEET_CACHE_DIR = BASE_DIR / "log_sheet_cache"  # Directory for caching rendered log sheets
+
+# Route provider used for trip maps, OpenRouteService when an API key is set, straight lines otherwise
+ORS_API_KEY = config("ORS_API_KEY", default="")
+ROUTE_PROVIDER = "logbook.routing.OpenRouteServiceProvider" if ORS_API_KEY else "logbook.routing.StraightLineProvider"
+ROUTE_PROVIDER_TIMEOUT = 10  # Seconds to wait for the route provider
+ROUTE_LEVELS_CACHE_TIMEOUT = 60 * 60 * 24  # Seconds the simplified routes of a finished trip stay cached
+
+# Place names of stop and trip locations sent without one, resolved offline from GAZETTEER_PATH by default, or
+# from OpenStreetMap when set to "logbook.geocoding.NominatimBackend". Locations are named after they are saved
+PLACE_NAME_BACKEND = config("PLACE_NAME_BACKEND", default="logbook.geocoding.GazetteerBackend")
+PLACE_NAME_BACKEND_TIMEOUT = 5  # Seconds to wait for the place name backend
+PLACE_NAME_USER_AGENT = "logbook-manager"  # Identifies the server to Nominatim, which requires one
+GAZETTEER_PATH = config("GAZETTEER_PATH", default=str(BASE_DIR / "gazetteer.csv"))
+GAZETTEER_MAX_DISTANCE_METERS = 5000  # Points further than this from every gazetteer entry stay unnamed
+
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24  # Seconds a write request's response is replayed for retries sent with the same key
+
+# Cache shared by every worker and server, e.g. "redis://127.0.0.1:6379/0". Without it each process keeps its own
+# in-memory cache, which group membership changes made through another process cannot clear
+CACHE_REDIS_URL = config("CACHE_REDIS_URL", default="")
+if CACHE_REDIS_URL:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": CACHE_REDIS_URL}}
+
+# Seconds a user's group names stay cached, membership changes clear them sooner. Kept short without a shared
+# cache, as a change only clears the cache of the process that made it
+USER_GROUPS_CACHE_TIMEOUT = 60 * 60 if CACHE_REDIS_URL else 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -17,4 +17,9 @@ urlpatterns = [
     path(
         "get-available-carrier-drivers/", views.get_available_carrier_drivers, name="get_available_carrier_drivers"
     ),  # Route to fetch available drivers for a carrier, handled by get_available_carrier_drivers view function
+    path(
+        "get-carrier-drivers-available-hours/",
+        views.get_carrier_drivers_available_hours,
+        name="get_carrier_drivers_available_hours",
+    ),  # Route to fetch the remaining hours of every driver of a carrier, handled by get_carrier_drivers_available_hours
 ]
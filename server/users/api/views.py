@@ -12,23 +12,25 @@ from rest_framework.decorators import api_view, permission_classes
 
 from users.api.serializers import UserSerializer, UserViewSerializer
 from core.exceptions import MissingItemError, RequestFailedError
+from core.middleware import get_serializer_data
 from core.utils import get_object_or_none
+from users.groups import user_member_groups
 from users.models import User
 from logbook.models import Truck
-
-
-def user_member_groups(user):
-    current_users_groups = []  # Initialize an empty list to store the group names the user belongs to
-    # Get all active groups and prefetch the related user set for efficient querying
-    user_groups = Group.objects.prefetch_related("user_set").filter(is_active=True)
-
-    # Iterate through each active group to check if the user is a member of the group
-    for group in user_groups:
-        if user in group.user_set.all():  # Check if the user is in the current group
-            current_users_groups.append(group.name)  # Add the group name to the list if the user is a member
-
-    # Return the list of group names the user belongs to
-    return current_users_groups
+from logbook.duty import (
+    CYCLE_LIMIT,
+    DRIVING_LIMIT,
+    DUTY_WINDOW_LIMIT,
+    get_available_hours,
+    seconds_to_hours,
+)
+
+# Remaining hours of a driver without any recent logbook activity
+FULLY_AVAILABLE_HOURS = {
+    "driving": DRIVING_LIMIT.total_seconds(),
+    "duty_window": DUTY_WINDOW_LIMIT.total_seconds(),
+    "cycle": CYCLE_LIMIT.total_seconds(),
+}
 
 
 class UserLogin(APIView):
@@ -47,7 +49,7 @@ class UserLogin(APIView):
         login(request, user)
 
         # Serialize user data using the UserViewSerializer
-        user_data = UserViewSerializer(user).data
+        user_data = get_serializer_data(UserViewSerializer(user))
         # Add additional user group information to the user data
         user_data = {**user_data, "user_groups": user_member_groups(request.user)}
 
@@ -89,7 +91,7 @@ class MaintainUser(APIView):
 
     def get(self, request):
         # Serialize the current authenticated user's data
-        user_data = UserViewSerializer(request.user).data
+        user_data = get_serializer_data(UserViewSerializer(request.user))
         # Add the groups the current user is a member of to the user data
         user_data = {**user_data, "user_groups": user_member_groups(request.user)}
 
@@ -139,7 +141,7 @@ class MaintainDrivers(APIView):
         driver_group.user_set.add(new_driver)
 
         # Serialize the new driver data for the response
-        new_driver_data = UserViewSerializer(new_driver).data
+        new_driver_data = get_serializer_data(UserViewSerializer(new_driver))
 
         # Return a success response with the new driver's data
         return Response({"message": "Driver added successfully", "new_driver_data": new_driver_data}, status=201)
@@ -159,7 +161,7 @@ class MaintainDrivers(APIView):
         updated_driver = serializer.save()
 
         # Serialize the updated driver data for the response
-        updated_driver_data = UserViewSerializer(updated_driver).data
+        updated_driver_data = get_serializer_data(UserViewSerializer(updated_driver))
 
         # Return a success response with the updated driver's data
         return Response(
@@ -170,7 +172,7 @@ class MaintainDrivers(APIView):
         # Retrieve the list of drivers associated with the logged-in user's carrier
         drivers = User.objects.filter(carrier=request.user.carrier, carrier__isnull=False, is_driver=True)
         # Serialize the list of drivers for the response
-        drivers_data = UserViewSerializer(drivers, many=True).data
+        drivers_data = get_serializer_data(UserViewSerializer(drivers, many=True))
 
         # Return the list of drivers
         return Response({"message": "success", "drivers_data": drivers_data}, status=200)
@@ -182,7 +184,7 @@ def get_available_carrier_drivers(request):
     # Retrieve the list of available drivers who belong to the current user's carrier and are not assigned to any trips
     available_drivers = User.objects.filter(carrier=request.user.carrier, is_driver=True, driver_assigned=False)
     # Serialize the list of available drivers for the response
-    available_drivers_data = UserViewSerializer(available_drivers, many=True).data
+    available_drivers_data = get_serializer_data(UserViewSerializer(available_drivers, many=True))
 
     # Retrieve the list of available trucks that belong to the current user's carrier and are not assigned to any trips
     available_trucks_data = Truck.objects.filter(carrier=request.user.carrier, truck_assigned=False).values(
@@ -198,3 +200,45 @@ def get_available_carrier_drivers(request):
         },
         status=200,  # HTTP status code for successful request
     )
+
+
+@api_view(["GET"])  # This view responds to GET requests
+@permission_classes([IsAuthenticated])  # Ensures that the user must be authenticated to access this view
+def get_carrier_drivers_available_hours(request):
+    # All drivers of the current user's carrier, used both for the listing and as a subquery for the hours
+    drivers = User.objects.filter(carrier=request.user.carrier, carrier__isnull=False, is_driver=True)
+    # Remaining driving, duty window and cycle time of every driver, computed with a fixed number of queries
+    available_hours = get_available_hours(drivers)
+
+    # Return a compact table, one row per driver with the hours in the same order as the columns
+    rows = []
+    for driver_id, driver_number, first_name, last_name in drivers.order_by("id").values_list(
+        "id", "driver_number", "first_name", "last_name"
+    ):
+        driver_hours = available_hours.get(driver_id, FULLY_AVAILABLE_HOURS)
+        rows.append(
+            [
+                driver_id,
+                driver_number,
+                f"{first_name} {last_name}",
+                seconds_to_hours(driver_hours["driving"]),
+                seconds_to_hours(driver_hours["duty_window"]),
+                seconds_to_hours(driver_hours["cycle"]),
+            ]
+        )
+
+    return Response(
+        {
+            "message": "success",
+            "columns": [
+                "driver_id",
+                "driver_number",
+                "driver_name",
+                "driving_hours_left",
+                "duty_window_hours_left",
+                "cycle_hours_left",
+            ],
+            "rows": rows,
+        },
+        status=200,
+    )
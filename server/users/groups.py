@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from users.models import User
+
+
+def get_user_groups_cache_key(user_id):
+    """Returns the cache key holding the group names of a user."""
+    return f"user-groups-{user_id}"
+
+
+def user_member_groups(user):
+    """
+    Returns the names of the active groups a user is a member of.
+
+    The names are read from the user's own memberships in one indexed query and cached per user,
+    so the cost does not depend on how many users the groups have.
+
+    Args:
+        user (User): The user whose groups are returned.
+
+    Returns:
+        list: The group names.
+    """
+    cache_key = get_user_groups_cache_key(user.id)
+    group_names = cache.get(cache_key)
+    if group_names is None:
+        group_names = list(user.groups.filter(is_active=True).order_by("name").values_list("name", flat=True))
+        cache.set(cache_key, group_names, settings.USER_GROUPS_CACHE_TIMEOUT)
+
+    return group_names
+
+
+def clear_user_member_groups(user_ids):
+    """
+    Drops the cached group names of users once the current transaction commits.
+
+    Called by the signal receivers below whenever group memberships or groups change, waiting for the
+    commit so that a concurrent request cannot cache the memberships from before the change again.
+
+    Args:
+        user_ids (iterable): Ids of the users whose groups changed.
+    """
+    cache_keys = [get_user_groups_cache_key(user_id) for user_id in user_ids]
+    if cache_keys:
+        transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def clear_changed_memberships(sender, instance, action, reverse, pk_set, **kwargs):
+    """Clears the cached groups of the users whose memberships were added, removed or cleared, from either side."""
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        # user.groups.add/remove/clear()
+        clear_user_member_groups([instance.id])
+    elif action == "pre_clear":
+        # group.user_set.clear(), the members are only known before they are removed
+        clear_user_member_groups(instance.user_set.values_list("id", flat=True))
+    else:
+        # group.user_set.add/remove()
+        clear_user_member_groups(pk_set)
+
+
+@receiver(post_save, sender=Group)
+def clear_group_members(sender, instance, created, **kwargs):
+    """Clears the cached groups of a group's members when it is renamed, activated or deactivated."""
+    if not created:
+        clear_user_member_groups(instance.user_set.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Group)
+def clear_deleted_group_members(sender, instance, **kwargs):
+    """Clears the cached groups of a deleted group's members, whose memberships are deleted without m2m_changed."""
+    clear_user_member_groups(instance.user_set.values_list("id", flat=True))
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.20 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_alter_user_driver_initials"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["carrier", "is_driver", "driver_assigned"],
+                name="user_carrier_driver_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.20 on 2026-10-18 11:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logbook", "0015_drop_redundant_fk_indexes"),
+        ("users", "0003_user_carrier_driver_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="carrier",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="logbook.carrier",
+            ),
+        ),
+    ]
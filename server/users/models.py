@@ -1,4 +1,14 @@
-from django.db.models import Model, AutoField, EmailField, CharField, BooleanField, DateTimeField, ForeignKey, CASCADE
+from django.db.models import (
+    Model,
+    AutoField,
+    EmailField,
+    CharField,
+    BooleanField,
+    DateTimeField,
+    ForeignKey,
+    CASCADE,
+    Index,
+)
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, Group
 
@@ -51,10 +61,17 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_staff = BooleanField(default=False)  # Flag if user has staff access (admin panel)
     created_at = DateTimeField(auto_now_add=True)  # Date when user was created
     last_login = DateTimeField(verbose_name="last login", auto_now=True)  # Last login timestamp
-    carrier = ForeignKey("logbook.Carrier", on_delete=CASCADE, null=True, blank=True)  # Link to carrier (if applicable)
+    # Link to carrier (if applicable), indexed by user_carrier_driver_idx, which starts with it
+    carrier = ForeignKey("logbook.Carrier", on_delete=CASCADE, null=True, blank=True, db_index=False)
 
     USERNAME_FIELD = "email"  # Use email as the unique identifier for authentication
 
+    class Meta:
+        indexes = [
+            # Drivers of a carrier, and the ones available for a trip
+            Index(fields=["carrier", "is_driver", "driver_assigned"], name="user_carrier_driver_idx"),
+        ]
+
     # Attach the custom user manager
     objects = UserManager()
 
@@ -1,3 +1,194 @@
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.utils import close_logbook_item
+from users.groups import user_member_groups
+from users.models import User
+from logbook.duty import get_available_hours
+from logbook.models import Carrier, DailyDutyTotal, DriverLogbook, LogbookItem
+
+
+class CarrierDriversAvailableHoursTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", password="password123")
+        self.carrier = Carrier.objects.create(name="Carrier 1", admin=self.admin)
+        self.admin.carrier = self.carrier
+        self.admin.save()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def create_driver(self, email):
+        driver = User.objects.create_user(email=email, password="password123")
+        driver.carrier = self.carrier
+        driver.is_driver = True
+        driver.save()
+        return driver
+
+    def get_board(self):
+        response = self.client.get("/api/v1/users/get-carrier-drivers-available-hours/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {row[0]: dict(zip(response.data["columns"], row)) for row in response.data["rows"]}
+
+    def test_hours_left_after_driving(self):
+        driver = self.create_driver("driver@example.com")
+        rested_driver = self.create_driver("rested@example.com")
+        shift_start = now() - timedelta(hours=5)
+        driver_logbook = DriverLogbook.objects.create(driver=driver, logbook_date=shift_start.date())
+        logbook_item = LogbookItem.objects.create(
+            driver_logbook=driver_logbook, item_type="driving", start_time=shift_start
+        )
+        close_logbook_item(logbook_item, shift_start + timedelta(hours=3))
+        LogbookItem.objects.create(
+            driver_logbook=driver_logbook,
+            item_type="on-duty-not-driving",
+            start_time=shift_start + timedelta(hours=3),
+            is_current=True,
+        )
+
+        board = self.get_board()
+
+        self.assertEqual(board[driver.id]["driving_hours_left"], 8)
+        self.assertEqual(board[driver.id]["duty_window_hours_left"], 9)
+        self.assertEqual(board[driver.id]["cycle_hours_left"], 65)
+        self.assertEqual(board[rested_driver.id]["driving_hours_left"], 11)
+        self.assertEqual(board[rested_driver.id]["cycle_hours_left"], 70)
+
+    def test_shift_started_before_the_lookback(self):
+        driver = self.create_driver("driver@example.com")
+        as_of = now()
+        # Never off duty for 10 hours since 52 hours ago, so the shift started before the 48 hour lookback
+        for item_type, start_hours, end_hours in (
+            ("driving", 52, 47),
+            ("on-duty-not-driving", 42, 38),
+            ("on-duty-not-driving", 30, 25),
+            ("on-duty-not-driving", 16, 14),
+            ("driving", 5, None),
+        ):
+            start_time = as_of - timedelta(hours=start_hours)
+            driver_logbook, _ = DriverLogbook.objects.get_or_create(driver=driver, logbook_date=start_time.date())
+            LogbookItem.objects.create(
+                driver_logbook=driver_logbook,
+                item_type=item_type,
+                start_time=start_time,
+                end_time=as_of - timedelta(hours=end_hours) if end_hours else None,
+                is_current=end_hours is None,
+            )
+
+        board = self.get_board()
+
+        self.assertEqual(board[driver.id]["driving_hours_left"], 1)
+        self.assertEqual(board[driver.id]["duty_window_hours_left"], 0)
+
+    def test_cycle_is_made_of_utc_logbook_days(self):
+        driver = self.create_driver("driver@example.com")
+        # 22:00 UTC is already the next day in local time
+        as_of = datetime(2025, 4, 10, 22, tzinfo=timezone.utc)
+        for duty_date, hours in ((as_of.date() - timedelta(days=7), 10), (as_of.date(), 5)):
+            DailyDutyTotal.objects.create(driver=driver, duty_date=duty_date, driving_seconds=hours * 3600)
+
+        available_hours = get_available_hours(User.objects.filter(id=driver.id), as_of=as_of)
+
+        self.assertEqual(available_hours[driver.id]["cycle"], 55 * 3600)
+
+    def test_query_count_does_not_grow_with_drivers(self):
+        for driver_number in range(20):
+            driver = self.create_driver(f"driver{driver_number}@example.com")
+            driver_logbook = DriverLogbook.objects.create(driver=driver, logbook_date=now().date())
+            LogbookItem.objects.create(
+                driver_logbook=driver_logbook,
+                item_type="driving",
+                start_time=now() - timedelta(hours=1),
+                is_current=True,
+            )
+
+        with self.assertNumQueries(3):
+            board = self.get_board()
+        self.assertEqual(len(board), 20)
+
+
+class UserMemberGroupsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.carrier_admin_group = Group.objects.create(name=settings.CARRIER_ADMIN_GROUP)
+        Group.objects.create(name=settings.DRIVER_GROUP)
+        Group.objects.create(name="Inactive", is_active=False).user_set.add(
+            User.objects.create_user(email="other@example.com", password="password123")
+        )
+        self.admin = User.objects.create_user(email="admin@example.com", password="password123")
+        self.carrier = Carrier.objects.create(name="Carrier 1", admin=self.admin)
+        self.admin.carrier = self.carrier
+        self.admin.save()
+        self.carrier_admin_group.user_set.add(self.admin)
+
+    def test_groups_are_read_once_and_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(user_member_groups(self.admin), [settings.CARRIER_ADMIN_GROUP])
+        with self.assertNumQueries(0):
+            self.assertEqual(user_member_groups(self.admin), [settings.CARRIER_ADMIN_GROUP])
+
+        # Membership changes clear the cached names, once the change is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            Group.objects.get(name=settings.DRIVER_GROUP).user_set.add(self.admin)
+            self.assertEqual(user_member_groups(self.admin), [settings.CARRIER_ADMIN_GROUP])
+        self.assertEqual(user_member_groups(self.admin), [settings.CARRIER_ADMIN_GROUP, settings.DRIVER_GROUP])
+
+    def test_membership_and_group_changes_clear_cached_groups(self):
+        self.assertEqual(user_member_groups(self.admin), [settings.CARRIER_ADMIN_GROUP])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.groups.remove(self.carrier_admin_group)
+        self.assertEqual(user_member_groups(self.admin), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.groups.add(self.carrier_admin_group)
+        self.assertEqual(user_member_groups(self.admin), [settings.CARRIER_ADMIN_GROUP])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.carrier_admin_group.is_active = False
+            self.carrier_admin_group.save()
+        self.assertEqual(user_member_groups(self.admin), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.carrier_admin_group.is_active = True
+            self.carrier_admin_group.save()
+        self.assertEqual(user_member_groups(self.admin), [settings.CARRIER_ADMIN_GROUP])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.carrier_admin_group.user_set.clear()
+        self.assertEqual(user_member_groups(self.admin), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.groups.add(self.carrier_admin_group)
+        self.assertEqual(user_member_groups(self.admin), [settings.CARRIER_ADMIN_GROUP])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.carrier_admin_group.delete()
+        self.assertEqual(user_member_groups(self.admin), [])
+
+    def test_adding_a_driver_clears_their_cached_groups(self):
+        client = APIClient()
+        client.force_authenticate(user=self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                "/api/v1/users/maintain-drivers/",
+                {
+                    "first_name": "Jane",
+                    "last_name": "Doe",
+                    "email": "driver@example.com",
+                    "password": "password123",
+                    "driver_number": "DRV-1",
+                    "driver_initials": "JD",
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
-# tests wll come here
+        driver = User.objects.get(email="driver@example.com")
+        self.assertEqual(user_member_groups(driver), [settings.DRIVER_GROUP])